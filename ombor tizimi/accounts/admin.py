@@ -1,14 +1,15 @@
 """Django admin configuration for accounts"""
 from django.contrib import admin
 from django.contrib.auth.models import User
-from accounts.models import UserProfile
+from accounts.models import Tenant, UserProfile
 
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
     can_delete = False
     verbose_name_plural = 'Profile'
-    fields = ('role', 'department', 'phone', 'is_active')
+    fields = ('role', 'department', 'phone', 'is_active', 'tenant')
+    readonly_fields = ('tenant',)
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -34,6 +35,15 @@ class UserAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(Tenant)
+class TenantAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'domain', 'is_default', 'is_active', 'created_at']
+    list_filter = ['is_active']
+    search_fields = ['name', 'slug', 'domain']
+    prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ['is_default']
+
+
 # Re-register UserAdmin with updated inlines
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
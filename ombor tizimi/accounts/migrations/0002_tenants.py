@@ -0,0 +1,46 @@
+# Generated by Django 4.2.8 on 2026-10-19 17:26
+
+import config.tenancy
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_default_tenant(apps, schema_editor):
+    """Existing data (and everything created outside a tenant) belongs to it."""
+    Tenant = apps.get_model('accounts', 'Tenant')
+    Tenant.objects.get_or_create(is_default=True, defaults={'name': 'Default', 'slug': 'default'})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(unique=True)),
+                ('domain', models.CharField(blank=True, help_text='Host name this company is served on (optional)', max_length=255, null=True, unique=True)),
+                ('is_default', models.BooleanField(default=False, help_text='Owns rows created outside any tenant')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tenant',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('is_default',), name='one_default_tenant'),
+        ),
+        migrations.RunPython(create_default_tenant, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='userprofile',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+    ]
@@ -2,8 +2,133 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from config.cache import get_or_compute, namespaced_key
+from config.tenancy import CURRENT, current_tenant_id, tenant_for_new_rows
 
-class UserProfile(models.Model):
+TENANTS_NAMESPACE = 'tenants'
+
+
+class TenantManager(models.Manager):
+    def get_default(self):
+        return self.get(is_default=True)
+
+    def for_host(self, host):
+        """Active tenant served on ``host``, or ``None`` (cached per host)."""
+        def compute():
+            return self.filter(domain=host, is_active=True).first()
+
+        return get_or_compute(
+            namespaced_key(TENANTS_NAMESPACE, host, tenant=None), compute, namespace=TENANTS_NAMESPACE,
+        )
+
+
+class Tenant(models.Model):
+    """A company with its own catalog, stock, users and caches."""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=50, unique=True)
+    domain = models.CharField(
+        max_length=255, unique=True, null=True, blank=True,
+        help_text="Host name this company is served on (optional)"
+    )
+    is_default = models.BooleanField(default=False, help_text="Owns rows created outside any tenant")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TenantManager()
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['is_default'], condition=models.Q(is_default=True), name='one_default_tenant'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class TenantQuerySet(models.QuerySet):
+    """QuerySet that limits itself to the current tenant.
+
+    The filter is added when the default manager hands out a queryset and
+    again whenever ``all()`` copies one made earlier, e.g. the querysets of
+    form fields, which are built at import time and copied per form.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tenant_id = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._tenant_id = self._tenant_id
+        return clone
+
+    def scoped(self, tenant_id=CURRENT):
+        """This queryset limited to ``tenant_id`` (default: the current tenant)."""
+        if tenant_id is CURRENT:
+            tenant_id = current_tenant_id()
+        if tenant_id is None or self._tenant_id == tenant_id:
+            return self
+        clone = self.filter(tenant_id=tenant_id)
+        clone._tenant_id = tenant_id
+        return clone
+
+    def all(self):
+        return super().all().scoped()
+
+    @classmethod
+    def as_manager(cls):
+        manager = ScopedManager.from_queryset(cls)()
+        manager._built_with_as_manager = True
+        return manager
+    as_manager.queryset_only = True
+
+
+class ScopedManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().scoped()
+
+
+class TenantModel(models.Model):
+    """Base of every model whose rows belong to a tenant.
+
+    ``tenant_parent`` names a foreign key whose tenant new rows inherit
+    (e.g. a ledger row takes its product's), so rows written outside a
+    request still land in the right tenant.
+    """
+    tenant = models.ForeignKey(
+        Tenant, on_delete=models.PROTECT, default=tenant_for_new_rows, editable=False, related_name='+'
+    )
+
+    tenant_parent = None
+
+    objects = TenantQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.tenant_parent:
+            parent = getattr(self, self.tenant_parent)
+            if parent is not None:
+                self.tenant_id = parent.tenant_id
+        super().save(*args, **kwargs)
+
+    def validate_constraints(self, exclude=None):
+        # ``tenant`` is never on a form, but the per-tenant unique
+        # constraints still have to be checked against it
+        if exclude:
+            exclude = set(exclude) - {'tenant'}
+        super().validate_constraints(exclude=exclude)
+
+    def unique_error_message(self, model_class, unique_check):
+        # "Product with this SKU already exists", without the tenant
+        if 'tenant' in unique_check and len(unique_check) > 1:
+            unique_check = tuple(field for field in unique_check if field != 'tenant')
+        return super().unique_error_message(model_class, unique_check)
+
+
+class UserProfile(TenantModel):
     """Extended user profile."""
     
     ROLE_CHOICES = [
@@ -24,5 +149,22 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.get_role_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
+    def has_changed(self):
+        """Whether any field differs from what was last loaded or saved."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return True
+        return any(getattr(self, name) != value for name, value in loaded.items())
+
     class Meta:
         ordering = ['user__first_name']
@@ -0,0 +1,13 @@
+"""Role checks shared by the views and by background jobs."""
+
+
+def is_admin(user):
+    """Check if user is admin."""
+    return user.is_staff or (hasattr(user, 'profile') and user.profile.role == 'admin')
+
+
+def is_staff_or_admin(user):
+    """Check if user is staff or admin."""
+    if hasattr(user, 'profile'):
+        return user.profile.role in ['admin', 'staff']
+    return user.is_staff
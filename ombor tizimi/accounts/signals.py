@@ -1,8 +1,10 @@
 """Signals for Accounts app."""
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+
+from config.cache import invalidate_namespace
+from .models import TENANTS_NAMESPACE, Tenant, UserProfile
 
 
 @receiver(post_save, sender=User)
@@ -13,10 +15,23 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save user profile when user is saved."""
-    if hasattr(instance, 'profile'):
+def save_user_profile(sender, instance, created, **kwargs):
+    """Save the user's profile along with the user if it was changed.
+
+    A profile that was never loaded cannot have changed, so e.g. the
+    ``last_login`` update of every login costs no profile query or write.
+    """
+    if created or not User.profile.is_cached(instance):
+        return
+    if instance.profile.has_changed():
         instance.profile.save()
 
 
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_hosts(sender, **kwargs):
+    """Forget cached host lookups when a tenant changes."""
+    invalidate_namespace(TENANTS_NAMESPACE, tenant=None)
+
+
 __all__ = []
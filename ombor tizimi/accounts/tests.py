@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+@override_settings(LOGIN_THROTTLE_IP_FAILURES=4, LOGIN_THROTTLE_USER_FAILURES=2, LOGIN_THROTTLE_WINDOW=60)
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        User.objects.create_user('alice', password='right-horse')
+        User.objects.create_user('bob', password='battery-staple')
+
+    def login(self, username, password, address='10.0.0.1'):
+        response = self.client.post(
+            reverse('login'), {'username': username, 'password': password}, REMOTE_ADDR=address,
+        )
+        signed_in = '_auth_user_id' in self.client.session
+        self.client.logout()
+        return response.status_code, signed_in
+
+    def test_username_locked_after_failures_without_checking_password(self):
+        self.assertEqual(self.login('alice', 'wrong'), (200, False))
+        self.assertEqual(self.login('ALICE', 'wrong', address='10.0.0.2'), (200, False))
+
+        with mock.patch('accounts.views.authenticate', wraps=authenticate) as check:
+            self.assertEqual(self.login('alice', 'right-horse', address='10.0.0.3'), (429, False))
+        check.assert_not_called()
+        # Other accounts are unaffected
+        self.assertEqual(self.login('bob', 'battery-staple', address='10.0.0.3'), (302, True))
+
+    def test_address_locked_after_failures_across_usernames(self):
+        for username in ('alice', 'bob', 'carol', 'dave'):
+            self.login(username, 'wrong')
+
+        self.assertEqual(self.login('bob', 'battery-staple'), (429, False))
+        self.assertEqual(self.login('bob', 'battery-staple', address='10.0.0.9'), (302, True))
+
+    def test_success_clears_username_but_not_address(self):
+        self.login('alice', 'wrong')
+        self.assertEqual(self.login('alice', 'right-horse'), (302, True))
+        self.login('alice', 'wrong')
+        # One failure since the reset: still under the username limit
+        self.assertEqual(self.login('alice', 'right-horse'), (302, True))
+
+        self.login('bob', 'wrong')
+        self.login('carol', 'wrong')
+        # The address has now failed 4 times in all
+        self.assertEqual(self.login('carol', 'anything'), (429, False))
+
+    def test_successful_logins_are_never_throttled(self):
+        for _ in range(10):
+            self.assertEqual(self.login('alice', 'right-horse'), (302, True))
@@ -0,0 +1,56 @@
+"""Login throttling.
+
+Failed sign-ins are counted in the cache per client address and per
+username. Once either count reaches its limit, further attempts are turned
+away until ``LOGIN_THROTTLE_WINDOW`` seconds after the first failure, before
+any password is hashed, so a guessing burst costs a cache lookup per request
+instead of a hash. Successful logins are not counted: a whole shift signing
+in from one warehouse address is never slowed down.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+FAILURES_KEY = 'login-failures:{}:{}'
+
+
+def client_address(request):
+    """Client IP from ``LOGIN_THROTTLE_IP_HEADER`` (the last hop, if a list)."""
+    value = request.META.get(settings.LOGIN_THROTTLE_IP_HEADER) or request.META.get('REMOTE_ADDR', '')
+    return value.split(',')[-1].strip()
+
+
+def _counters(request, username):
+    """``[(cache key, limit)]`` for the client address and the username."""
+    user_digest = hashlib.sha1(username.lower().encode()).hexdigest()
+    return [
+        (FAILURES_KEY.format('ip', client_address(request)), settings.LOGIN_THROTTLE_IP_FAILURES),
+        (FAILURES_KEY.format('user', user_digest), settings.LOGIN_THROTTLE_USER_FAILURES),
+    ]
+
+
+def is_throttled(request, username):
+    """Whether the address or the username has used up its failed attempts."""
+    counters = [(key, limit) for key, limit in _counters(request, username) if limit]
+    counts = cache.get_many([key for key, _ in counters])
+    return any(counts.get(key, 0) >= limit for key, limit in counters)
+
+
+def record_failure(request, username):
+    for key, _ in _counters(request, username):
+        # add() starts the window; incr() keeps its expiry
+        cache.add(key, 0, settings.LOGIN_THROTTLE_WINDOW)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, settings.LOGIN_THROTTLE_WINDOW)
+
+
+def reset(request, username):
+    """Forget a username's failures after it signs in.
+
+    The address count is kept, so one valid account cannot be used to clear
+    the way for guesses at others.
+    """
+    cache.delete(_counters(request, username)[1][0])
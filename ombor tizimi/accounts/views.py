@@ -5,37 +5,47 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
+from config.tenancy import current_tenant_id
+from . import throttle
 from .forms import LoginForm, UserCreationForm, UserProfileForm
-
-
-def is_admin(user):
-    """Check if user is admin."""
-    return user.is_staff or (hasattr(user, 'profile') and user.profile.role == 'admin')
+from .permissions import is_admin
 
 
 @require_http_methods(["GET", "POST"])
 def login_view(request):
-    """User login view."""
+    """User login view.
+
+    Repeated failures from one address or for one username are throttled
+    (see ``accounts.throttle``) without checking the password.
+    """
     if request.user.is_authenticated:
         return redirect('dashboard')
 
+    status = 200
     if request.method == 'POST':
         form = LoginForm(request.POST)
         if form.is_valid():
             username = form.cleaned_data['username']
             password = form.cleaned_data['password']
-            user = authenticate(request, username=username, password=password)
-            
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Welcome back, {user.first_name or user.username}!')
-                return redirect('dashboard')
+
+            if throttle.is_throttled(request, username):
+                form.add_error(None, 'Too many failed sign-in attempts. Please try again later.')
+                status = 429
             else:
-                messages.error(request, 'Invalid username or password.')
+                user = authenticate(request, username=username, password=password)
+
+                if user is not None:
+                    throttle.reset(request, username)
+                    login(request, user)
+                    messages.success(request, f'Welcome back, {user.first_name or user.username}!')
+                    return redirect('dashboard')
+                else:
+                    throttle.record_failure(request, username)
+                    messages.error(request, 'Invalid username or password.')
     else:
         form = LoginForm()
 
-    return render(request, 'accounts/login.html', {'form': form})
+    return render(request, 'accounts/login.html', {'form': form}, status=status)
 
 
 @login_required
@@ -53,6 +63,8 @@ def logout_view(request):
 def user_management(request):
     """User management view (admin only)."""
     users = User.objects.all().select_related('profile')
+    if current_tenant_id():
+        users = users.filter(profile__tenant_id=current_tenant_id())
 
     if request.method == 'POST':
         user_id = request.POST.get('user_id')
@@ -60,7 +72,7 @@ def user_management(request):
 
         if action == 'delete' and user_id:
             if int(user_id) != request.user.id:
-                user = User.objects.get(id=user_id)
+                user = users.get(id=user_id)
                 user.delete()
                 messages.success(request, f'User {user.username} deleted successfully.')
             else:
@@ -6,6 +6,12 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from config.warmup import warm_up_if_enabled
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Import views, build the URL resolver and compile templates before the
+# server accepts traffic (WARMUP_ON_START)
+warm_up_if_enabled()
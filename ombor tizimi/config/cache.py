@@ -0,0 +1,335 @@
+"""Project-wide cache helpers.
+
+* ``FailoverCache`` - Redis backend that switches to a local cache (locmem
+  or file) while the Redis server is unreachable, and retries it later.
+* ``get_or_compute()`` - read-through helper with single-flight stampede
+  protection and jittered TTLs.
+* Namespaced invalidation: keys built with ``namespaced_key()`` embed the
+  current version of their namespace, so ``invalidate_namespace()`` retires
+  every key in it with a single counter bump. Nothing has to be found or
+  deleted; superseded entries simply age out of the cache. In multi-tenant
+  mode each tenant has its own copy of every namespace (see
+  ``config.tenancy``), so one company's writes never evict another's
+  entries.
+* ``metrics`` - hit/miss/latency counters, shared between workers through
+  the cache and shown by ``manage.py cache_stats``.
+"""
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from config.tenancy import CURRENT, cache_prefix
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'ns:{}:version'
+METRICS_KEY = 'cache-metrics:{}:{}'
+METRICS_NAMESPACES_KEY = 'cache-metrics:namespaces'
+METRICS_FLUSH_SECONDS = 10
+LOCK_SUFFIX = ':lock'
+LOCK_STRIPES = 64
+
+_MISSING = object()
+
+
+class FailoverCache(BaseCache):
+    """Redis cache that degrades to a local cache instead of failing.
+
+    Writes made while Redis is down (namespace version bumps, deletes, new
+    values) only reach the fallback, so Redis still holds what they
+    replaced. The keys written are remembered and deleted from Redis when it
+    answers again; after ``clear()`` or more than ``RECONCILE_KEYS`` writes
+    Redis is flushed instead. The fallback is emptied on every failover, so
+    it never serves entries left over from an earlier outage.
+
+    ``OPTIONS``: ``FALLBACK`` (``locmem`` or ``file``), ``FALLBACK_LOCATION``
+    (directory for ``file``), ``RETRY_SECONDS`` before Redis is tried again
+    after an error, ``RECONCILE_KEYS`` (default 10000) and ``REDIS``
+    (connection options for the Redis client).
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        import redis
+        from django.core.cache.backends.redis import RedisCache
+
+        options = params.get('OPTIONS', {})
+        common = {key: value for key, value in params.items() if key not in ('OPTIONS', 'BACKEND', 'LOCATION')}
+        self._errors = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+        self._retry_seconds = options.get('RETRY_SECONDS', 30)
+        self._reconcile_keys = options.get('RECONCILE_KEYS', 10000)
+        self._down_until = 0.0
+        self._in_outage = False
+        self._lock = threading.Lock()
+        # (key, version) pairs written to the fallback only; None: flush Redis
+        self._written = set()
+
+        self._primary = RedisCache(server, {**common, 'OPTIONS': options.get('REDIS', {})})
+        if options.get('FALLBACK') == 'file':
+            self._fallback = FileBasedCache(options['FALLBACK_LOCATION'], common)
+        else:
+            self._fallback = LocMemCache('failover-fallback', common)
+
+    @property
+    def using_fallback(self):
+        return time.monotonic() < self._down_until
+
+    def _call(self, method, *args, written=(), version=None):
+        """Run ``method`` on Redis, or on the fallback while Redis is down.
+
+        ``written`` lists the keys the call writes (stored under ``version``);
+        ``None`` stands for every key.
+        """
+        if not self.using_fallback:
+            try:
+                if self._written != set():
+                    self._reconcile()
+                result = getattr(self._primary, method)(*args)
+                self._in_outage = False
+                return result
+            except self._errors:
+                self._fail_over()
+        if written is None or written:
+            self._remember(written, version)
+        return getattr(self._fallback, method)(*args)
+
+    def _fail_over(self):
+        logger.warning("Cache server unreachable, using local fallback for %ss", self._retry_seconds, exc_info=True)
+        with self._lock:
+            if not self._in_outage:
+                self._in_outage = True
+                self._fallback.clear()
+            self._down_until = time.monotonic() + self._retry_seconds
+
+    def _remember(self, keys, version):
+        with self._lock:
+            if keys is None or self._written is None:
+                self._written = None
+                return
+            self._written.update((key, version) for key in keys)
+            if len(self._written) > self._reconcile_keys:
+                self._written = None
+
+    def _reconcile(self):
+        """Delete from Redis what was replaced in the fallback while it was down.
+
+        Raises the connection error (and keeps the keys) if Redis is still down.
+        """
+        with self._lock:
+            written = self._written
+        if written is None:
+            self._primary.clear()
+        else:
+            by_version = {}
+            for key, version in written:
+                by_version.setdefault(version, []).append(key)
+            for version, keys in by_version.items():
+                self._primary.delete_many(keys, version)
+        with self._lock:
+            if written is None:
+                self._written = set()
+            elif self._written is not None:
+                self._written -= written
+        logger.info(
+            "Cache server reachable again; dropped %s keys changed during the outage",
+            'all' if written is None else len(written)
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('add', key, value, timeout, version, written=[key], version=version)
+
+    def get(self, key, default=None, version=None):
+        return self._call('get', key, default, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set', key, value, timeout, version, written=[key], version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('touch', key, timeout, version, written=[key], version=version)
+
+    def delete(self, key, version=None):
+        return self._call('delete', key, version, written=[key], version=version)
+
+    def get_many(self, keys, version=None):
+        return self._call('get_many', keys, version)
+
+    def has_key(self, key, version=None):
+        return self._call('has_key', key, version)
+
+    def incr(self, key, delta=1, version=None):
+        return self._call('incr', key, delta, version, written=[key], version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._call('set_many', data, timeout, version, written=list(data), version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        return self._call('delete_many', keys, version, written=keys, version=version)
+
+    def clear(self):
+        return self._call('clear', written=None)
+
+    def close(self, **kwargs):
+        self._primary.close(**kwargs)
+        self._fallback.close(**kwargs)
+
+
+class CacheMetrics:
+    """Per-namespace hit/miss/latency counters.
+
+    Counts are kept in process and added to shared counters in the cache
+    every ``METRICS_FLUSH_SECONDS``, so totals cover every worker.
+    """
+    FIELDS = ('hits', 'misses', 'computes', 'waits', 'get_micros', 'compute_micros')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._flushed_at = time.monotonic()
+
+    def record(self, namespace, **deltas):
+        with self._lock:
+            for field, delta in deltas.items():
+                self._pending[(namespace, field)] += delta
+            due = time.monotonic() - self._flushed_at >= METRICS_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            namespaces = cache.get(METRICS_NAMESPACES_KEY) or []
+            missing = sorted({namespace for namespace, _ in pending} - set(namespaces))
+            if missing:
+                cache.set(METRICS_NAMESPACES_KEY, namespaces + missing, None)
+            for (namespace, field), delta in pending.items():
+                key = METRICS_KEY.format(namespace, field)
+                cache.add(key, 0, None)
+                cache.incr(key, delta)
+        except Exception:
+            # Metrics must never break a request
+            logger.debug("Could not flush cache metrics", exc_info=True)
+
+    def totals(self):
+        """Shared counters per namespace, with derived hit ratio and latencies."""
+        self.flush()
+        report = {}
+        for namespace in cache.get(METRICS_NAMESPACES_KEY) or []:
+            values = cache.get_many([METRICS_KEY.format(namespace, field) for field in self.FIELDS])
+            stats = {field: values.get(METRICS_KEY.format(namespace, field), 0) for field in self.FIELDS}
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+            stats['avg_get_ms'] = stats['get_micros'] / lookups / 1000 if lookups else 0.0
+            stats['avg_compute_ms'] = stats['compute_micros'] / stats['computes'] / 1000 if stats['computes'] else 0.0
+            report[namespace] = stats
+        return report
+
+
+metrics = CacheMetrics()
+
+_stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+def jittered(timeout):
+    """Spread expiry by +/- ``CACHE_TTL_JITTER`` so keys set together do not expire together."""
+    jitter = getattr(settings, 'CACHE_TTL_JITTER', 0.1)
+    return max(1, int(timeout * random.uniform(1 - jitter, 1 + jitter)))
+
+
+def get_or_compute(key, compute, timeout=None, namespace='default'):
+    """Return the cached value of ``key``, computing and storing it on a miss.
+
+    Only one caller computes a missing value: threads of this process queue
+    on a local lock, and other processes see a short-lived lock key in the
+    cache and poll for the value instead of hitting the database too. If the
+    computing process dies, waiters compute it themselves once the lock
+    expires. ``None`` is a valid cached value.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'CACHE_DEFAULT_TTL', 300)
+
+    started = time.perf_counter()
+    value = cache.get(key, _MISSING)
+    elapsed = int((time.perf_counter() - started) * 1_000_000)
+    if value is not _MISSING:
+        metrics.record(namespace, hits=1, get_micros=elapsed)
+        return value
+    metrics.record(namespace, misses=1, get_micros=elapsed)
+
+    lock_timeout = getattr(settings, 'CACHE_LOCK_SECONDS', 30)
+    with _stripes[hash(key) % LOCK_STRIPES]:
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            # Another thread of this process filled it while we queued
+            metrics.record(namespace, waits=1)
+            return value
+
+        lock_key = key + LOCK_SUFFIX
+        owns_lock = cache.add(lock_key, 1, lock_timeout)
+        if not owns_lock:
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    metrics.record(namespace, waits=1)
+                    return value
+
+        try:
+            started = time.perf_counter()
+            value = compute()
+            metrics.record(namespace, computes=1, compute_micros=int((time.perf_counter() - started) * 1_000_000))
+            cache.set(key, value, jittered(timeout))
+        finally:
+            if owns_lock:
+                cache.delete(lock_key)
+    return value
+
+
+def _fresh_version():
+    # Counters start from the clock, so a counter lost to eviction or a
+    # restart never hands out a version that old entries were stored under
+    return int(time.time() * 1000)
+
+
+def namespace_version(namespace, tenant=CURRENT):
+    """Current version number of ``namespace``.
+
+    ``tenant`` (an id, or ``None`` for the shared namespace) defaults to the
+    current tenant; the same applies to the functions below.
+    """
+    key = VERSION_KEY.format(cache_prefix(tenant) + namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_namespace(namespace, tenant=CURRENT):
+    """Retire every key in ``namespace``."""
+    key = VERSION_KEY.format(cache_prefix(tenant) + namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+def namespaced_key(namespace, *parts, tenant=CURRENT):
+    """Cache key for ``parts`` (any JSON-able values) under the current version."""
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{cache_prefix(tenant)}{namespace}:{namespace_version(namespace, tenant)}:{digest}"
@@ -0,0 +1,179 @@
+"""Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to ``default`` unless the code runs
+inside ``use_replica()`` (or a view wrapped with ``replica_reads``), in which
+case a random configured replica is used. ``ReplicaPinningMiddleware`` pins a
+client to the primary for ``REPLICA_PIN_SECONDS`` after any write so that
+read-after-write flows (e.g. redirect to ``product_detail`` after a save)
+never see replication lag.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+PIN_COOKIE = 'db_pin_primary'
+OVERRIDE_PARAM = 'db'
+OVERRIDE_HEADER = 'HTTP_X_DB_ROUTE'
+
+_route = ContextVar('db_route', default=None)
+
+
+def get_replicas():
+    """Aliases of the configured read replicas."""
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def current_read_database():
+    """Alias the router would pick for a read right now."""
+    replicas = get_replicas()
+    if _route.get() == REPLICA and replicas:
+        return random.choice(replicas)
+    return 'default'
+
+
+@contextmanager
+def _routed(route):
+    token = _route.set(route)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+def use_primary():
+    """Context manager forcing reads onto the primary database."""
+    return _routed(PRIMARY)
+
+
+def use_replica():
+    """Context manager sending reads to a replica (primary if none configured).
+
+    Does not override an enclosing ``use_primary()`` block.
+    """
+    if _route.get() == PRIMARY:
+        return _routed(PRIMARY)
+    return _routed(REPLICA)
+
+
+def _route_for(request):
+    if getattr(request, 'db_pinned_to_primary', False):
+        return use_primary()
+    return use_replica()
+
+
+def replica_reads(view_func):
+    """Run a read-only view (sync or async) against a replica unless pinned."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            with _route_for(request):
+                return await view_func(request, *args, **kwargs)
+        return _wrapped_async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        with _route_for(request):
+            return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def routed_stream(request, iterable):
+    """Iterate ``iterable`` under the request's read route.
+
+    A ``StreamingHttpResponse`` is consumed after the view (and its
+    ``replica_reads`` block) has returned, so its queries would otherwise go
+    to the primary. The route is entered around each step rather than held
+    across yields, as the server may resume the iterator in another context.
+    """
+    iterator = iter(iterable)
+    while True:
+        with _route_for(request):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+class PrimaryReplicaRouter:
+    """Route reads according to the current context; writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return current_read_database()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        return db not in get_replicas()
+
+
+class ReplicaPinningMiddleware:
+    """Pin requests to the primary after writes or when explicitly asked.
+
+    A request is pinned when it is a write (non-safe method), when the client
+    wrote within the last ``REPLICA_PIN_SECONDS`` (tracked with a cookie), or
+    when it carries ``?db=primary`` or an ``X-DB-Route: primary`` header.
+    Works in both WSGI and ASGI middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        is_write = self._pin(request)
+        if request.db_pinned_to_primary:
+            with use_primary():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        return self._remember_write(is_write, response)
+
+    async def __acall__(self, request):
+        is_write = self._pin(request)
+        if request.db_pinned_to_primary:
+            with use_primary():
+                response = await self.get_response(request)
+        else:
+            response = await self.get_response(request)
+        return self._remember_write(is_write, response)
+
+    @staticmethod
+    def _pin(request):
+        is_write = request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+        override = request.GET.get(OVERRIDE_PARAM) or request.META.get(OVERRIDE_HEADER)
+        request.db_pinned_to_primary = (
+            is_write
+            or PIN_COOKIE in request.COOKIES
+            or (override or '').lower() == PRIMARY
+        )
+        return is_write
+
+    @staticmethod
+    def _remember_write(is_write, response):
+        if is_write and get_replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,298 @@
+"""Non-blocking structured logging.
+
+Records are handed to a bounded in-memory queue by ``QueueLogHandler`` and
+written by a ``QueueListener`` thread, so request latency never depends on
+disk speed. The file output is one JSON object per line. With rotation
+``size`` it is rotated by size and gzip-compressed on rotation (also on the
+listener thread); that is only safe while one process writes the file. With
+``external`` every process appends to it and reopens it when logrotate has
+moved it away, and nothing in the app rotates it.
+
+``RequestLogMiddleware`` gives every request an id (taken from an incoming
+``X-Request-ID`` header when present), stamps it together with the user and
+view name on every record logged while the request runs, and writes one
+access line with the status and duration. ``LOG_SAMPLING`` keeps only a
+fraction of the DEBUG/INFO records of noisy loggers; warnings and errors are
+never sampled away.
+"""
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import shutil
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+CONTEXT_FIELDS = ('request_id', 'user', 'view', 'method', 'path')
+
+access_logger = logging.getLogger('config.access')
+
+_request_context = ContextVar('log_request_context', default=None)
+
+
+def current_request_id():
+    """Id of the request being handled, or ``None`` outside a request."""
+    context = _request_context.get()
+    return context['request_id'] if context else None
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the current request context onto each record.
+
+    Must run in the thread that logs (i.e. on the queue handler), because the
+    listener thread has no request context.
+    """
+
+    def filter(self, record):
+        context = _request_context.get() or {}
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of DEBUG/INFO records from noisy loggers.
+
+    ``rates`` maps a logger name to the share of records kept (0.0-1.0); it
+    applies to that logger and its children, the most specific name winning.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single JSON line."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS + ('status', 'duration_ms'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """``RotatingFileHandler`` that gzips rotated files (``app.log.1.gz``)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = self._gz_name
+        self.rotator = self._gz_rotate
+
+    @staticmethod
+    def _gz_name(name):
+        return name + '.gz'
+
+    @staticmethod
+    def _gz_rotate(source, dest):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """Queue records for a background listener writing JSON lines and console.
+
+    Built from ``LOGGING`` (``dictConfig`` passes the extra keys as keyword
+    arguments). The queue is bounded: when the disk cannot keep up, records
+    are dropped and counted instead of blocking the request. The listener is
+    restarted in forked children (e.g. gunicorn workers with ``preload_app``)
+    since threads do not survive ``fork()``; a forked child never rotates the
+    file, whatever ``rotation`` says, because its siblings write it too.
+    """
+
+    def __init__(self, filename, rotation='size', max_bytes=10 * 1024 * 1024, backup_count=10,
+                 console=True, sampling=None, queue_size=10000):
+        self.queue_size = queue_size
+        super().__init__(queue.Queue(queue_size))
+        self.dropped = 0
+
+        os.makedirs(os.path.dirname(os.fspath(filename)), exist_ok=True)
+        if rotation == 'external':
+            file_handler = self._shared_file_handler(filename)
+        else:
+            file_handler = CompressingRotatingFileHandler(
+                filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True,
+            )
+            file_handler.setFormatter(JsonFormatter())
+        self.targets = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setFormatter(logging.Formatter('%(levelname)s %(name)s [%(request_id)s] %(message)s'))
+            self.targets.append(console_handler)
+
+        self.addFilter(RequestContextFilter())
+        if sampling:
+            self.addFilter(SamplingFilter(sampling))
+
+        self.listener = None
+        self._start()
+        os.register_at_fork(after_in_child=self._restart_in_child)
+        atexit.register(self.stop)
+
+    def _start(self):
+        self.listener = logging.handlers.QueueListener(self.queue, *self.targets, respect_handler_level=True)
+        self.listener.start()
+
+    @staticmethod
+    def _shared_file_handler(filename):
+        """Append-only handler that reopens the file after external rotation."""
+        handler = logging.handlers.WatchedFileHandler(filename, encoding='utf-8', delay=True)
+        handler.setFormatter(JsonFormatter())
+        return handler
+
+    def _restart_in_child(self):
+        # The parent's listener thread is gone; records it had not written
+        # yet belong to the parent, so start over with an empty queue.
+        if self.listener is None:
+            return
+        self.targets = [
+            self._shared_file_handler(target.baseFilename)
+            if isinstance(target, CompressingRotatingFileHandler) else target
+            for target in self.targets
+        ]
+        self.queue = queue.Queue(self.queue_size)
+        self._start()
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        if self.listener is not None:
+            listener, self.listener = self.listener, None
+            listener.stop()
+            for target in self.targets:
+                target.close()
+
+    def prepare(self, record):
+        # Render the message and traceback here (args may not be safe to use
+        # from another thread) but keep the extra fields for the formatter.
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+class RequestLogMiddleware:
+    """Tag log records with request id, user and view; log one access line.
+
+    Place it after ``AuthenticationMiddleware`` so the user is known. Works in
+    both WSGI and ASGI middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        context, token, started = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_context.reset(token)
+        return self._finish(request, response, context, started)
+
+    async def __acall__(self, request):
+        context, token, started = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_context.reset(token)
+        return self._finish(request, response, context, started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # The context dict is shared, so this update is visible to the view
+        # even when Django runs this hook in another thread under ASGI.
+        context = getattr(request, 'log_context', None)
+        if context is not None:
+            match = request.resolver_match
+            context['view'] = match.view_name if match else view_func.__name__
+            context['user'] = self._username(request)
+        return None
+
+    @staticmethod
+    def _username(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.get_username()
+        return None
+
+    def _begin(self, request):
+        request_id = (request.headers.get(REQUEST_ID_HEADER) or '')[:64] or uuid.uuid4().hex
+        context = {
+            'request_id': request_id,
+            'user': None,
+            'view': None,
+            'method': request.method,
+            'path': request.path,
+        }
+        request.log_context = context
+        request.request_id = request_id
+        return context, _request_context.set(context), time.perf_counter()
+
+    def _finish(self, request, response, context, started):
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        response[REQUEST_ID_HEADER] = context['request_id']
+        status = response.status_code
+        access_logger.info(
+            '%s %s %s %.2fms', context['method'], context['path'], status, duration_ms,
+            extra={**context, 'status': status, 'duration_ms': duration_ms},
+        )
+        return response
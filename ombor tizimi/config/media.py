@@ -0,0 +1,99 @@
+"""Content-addressed media storage.
+
+``HashingUploadHandler`` streams every upload to a temporary file in chunks
+and hashes it on the way, so no upload is held in memory whatever its size.
+``ContentAddressedStorage`` files each file under its SHA-256
+(``products/3f/3fa4...e1.jpg``) and writes content it already holds only
+once; a stored name never changes content, so it can be cached for good.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+# Directory (inside the storage) for files being hashed before they are filed
+TEMP_DIR = 'tmp'
+# Content-addressed names: <upload_to>/<first two hex digits>/<sha256><ext>
+CONTENT_NAME = re.compile(r'^(?:.+/)?(?P<shard>[0-9a-f]{2})/(?P<digest>[0-9a-f]{64})(?:\.[a-z0-9]+)?$')
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Write each upload to a temporary file chunk by chunk, hashing as it goes.
+
+    The digest is left on the uploaded file as ``content_hash`` so the
+    storage can file it without reading it again.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.content_hash = self.hasher.hexdigest()
+        return uploaded
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage keeping one copy of each distinct file.
+
+    The name passed to ``save()`` only contributes its directory and
+    extension; the stored name is derived from the content.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Identical content gets the identical name; nothing to avoid
+        return name
+
+    def _save(self, name, content):
+        digest = getattr(content, 'content_hash', None)
+        if digest and hasattr(content, 'temporary_file_path'):
+            # Hashed while uploading; Django removes the file if it stays put
+            source, spooled = content.temporary_file_path(), False
+        else:
+            digest, source = self._spool(content)
+            spooled = True
+
+        directory, filename = posixpath.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = posixpath.join(directory, digest[:2], digest + extension)
+        full_path = self.path(name)
+
+        if os.path.exists(full_path):
+            # Already stored; refresh its age so pruning leaves it alone
+            # until the product referencing it has been saved
+            os.utime(full_path)
+            if spooled:
+                os.remove(source)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            # A concurrent upload of the same content may win the race;
+            # overwriting it with identical bytes is harmless
+            file_move_safe(source, full_path, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def _spool(self, content):
+        """Copy ``content`` to a temporary file in the storage, hashing it."""
+        temp_dir = self.path(TEMP_DIR)
+        os.makedirs(temp_dir, exist_ok=True)
+        hasher = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+            for chunk in content.chunks():
+                hasher.update(chunk)
+                temp.write(chunk)
+        return hasher.hexdigest(), temp.name
+
+
+def is_content_addressed(name):
+    return bool(name) and CONTENT_NAME.match(name) is not None
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -35,11 +35,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'config.static.StaticFilesMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'config.db_router.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.tenancy.TenantMiddleware',
+    'config.log.RequestLogMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,6 +67,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
+
+# Serve read-only inventory pages with async views (use with an ASGI server)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 # Database
 DATABASES = {
@@ -72,6 +80,23 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma-separated database names (SQLite files relative to
+# BASE_DIR). They get their schema and data from the primary and are never
+# migrated themselves.
+DATABASE_REPLICAS = []
+for index, replica_name in enumerate(config('DB_REPLICAS', default='', cast=Csv()), start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / replica_name,
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['config.db_router.PrimaryReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -80,6 +105,31 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+# Password hashing: PASSWORD_HASHER hashes new passwords; hashes made by the
+# others still verify and are rehashed with it on the user's next login.
+# scrypt costs ~5x less CPU per login than PBKDF2 and is memory-hard;
+# argon2 needs the argon2-cffi package.
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='scrypt')  # scrypt | argon2 | pbkdf2
+_PASSWORD_HASHERS = {
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Login throttling: failed attempts allowed per client address and per
+# username within LOGIN_THROTTLE_WINDOW seconds (0 = no limit). Behind a
+# proxy, name the header carrying the client address (e.g. HTTP_X_REAL_IP).
+LOGIN_THROTTLE_IP_FAILURES = config('LOGIN_THROTTLE_IP_FAILURES', default=30, cast=int)
+LOGIN_THROTTLE_USER_FAILURES = config('LOGIN_THROTTLE_USER_FAILURES', default=5, cast=int)
+LOGIN_THROTTLE_WINDOW = config('LOGIN_THROTTLE_WINDOW', default=900, cast=int)
+LOGIN_THROTTLE_IP_HEADER = config('LOGIN_THROTTLE_IP_HEADER', default='REMOTE_ADDR')
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -91,10 +141,42 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# With STATIC_MANIFEST, collectstatic writes content-hashed copies plus
+# .gz/.br variants (brotli if installed) and {% static %} links to the hashed
+# names, so pages only render once collectstatic has run. It is on in the
+# production profile (gunicorn.conf.py) and off by default, so tests and local
+# runs need no collectstatic. With STATIC_SERVE the app serves the files
+# itself: hashed names are cached by browsers for a year, others for
+# STATIC_MAX_AGE seconds.
+STATIC_MANIFEST = config('STATIC_MANIFEST', default=False, cast=bool)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'config.static.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+    # One copy per distinct image, named by its hash (see config/media.py)
+    'product_images': {
+        'BACKEND': 'config.media.ContentAddressedStorage',
+    },
+}
+STATIC_SERVE = config('STATIC_SERVE', default=not DEBUG, cast=bool)
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=60, cast=int)
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are streamed to disk in chunks and hashed on the way, never held
+# in memory. A FILE_UPLOAD_TEMP_DIR on the same file system as MEDIA_ROOT
+# lets stored images be renamed into place instead of copied.
+FILE_UPLOAD_HANDLERS = ['config.media.HashingUploadHandler']
+FILE_UPLOAD_TEMP_DIR = config('FILE_UPLOAD_TEMP_DIR', default=None)
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -126,22 +208,156 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 
-# Logging
+# Live dashboard/alert push (server-sent events, requires ASGI)
+LIVE_EVENTS_ENABLED = config('LIVE_EVENTS_ENABLED', default=True, cast=bool)
+LIVE_EVENTS_BACKEND = config('LIVE_EVENTS_BACKEND', default='memory')  # memory | redis
+LIVE_EVENTS_REDIS_URL = config('LIVE_EVENTS_REDIS_URL', default='redis://localhost:6379/1')
+# Seconds before a stream is closed and the browser reconnects; bounds how
+# long the subscription of a closed tab lingers
+LIVE_EVENTS_STREAM_SECONDS = config('LIVE_EVENTS_STREAM_SECONDS', default=300, cast=int)
+
+# Cache: Redis when CACHE_REDIS_URL is set (switching to the local cache
+# while the server is unreachable), otherwise the local cache only.
+CACHE_REDIS_URL = config('CACHE_REDIS_URL', default='')
+CACHE_FALLBACK = config('CACHE_FALLBACK', default='locmem')  # locmem | file
+CACHE_DEFAULT_TTL = config('CACHE_DEFAULT_TTL', default=300, cast=int)
+CACHE_TTL_JITTER = config('CACHE_TTL_JITTER', default=0.1, cast=float)
+CACHE_LOCK_SECONDS = config('CACHE_LOCK_SECONDS', default=30, cast=int)
+
+if CACHE_FALLBACK == 'file':
+    LOCAL_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+else:
+    LOCAL_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'config.cache.FailoverCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'TIMEOUT': CACHE_DEFAULT_TTL,
+            'KEY_PREFIX': 'ombor',
+            'OPTIONS': {
+                'FALLBACK': CACHE_FALLBACK,
+                'FALLBACK_LOCATION': str(BASE_DIR / 'cache'),
+                'RETRY_SECONDS': config('CACHE_RETRY_SECONDS', default=30, cast=int),
+                'REDIS': {'socket_connect_timeout': 0.5, 'socket_timeout': 0.5},
+            },
+        }
+    }
+else:
+    CACHES = {'default': {**LOCAL_CACHE, 'TIMEOUT': CACHE_DEFAULT_TTL, 'KEY_PREFIX': 'ombor'}}
+
+# With a shared (Redis) cache, sessions are read from the cache and written
+# through to the database; per-process caches would let a logged-out session
+# live on in other workers, so without Redis they stay in the database.
+# django.contrib.sessions.backends.cache skips the database entirely
+# (sessions are lost if Redis is flushed).
+SESSION_ENGINE = config(
+    'SESSION_ENGINE',
+    default='django.contrib.sessions.backends.cached_db' if CACHE_REDIS_URL else 'django.contrib.sessions.backends.db',
+)
+
+# Scan endpoint: in-process SKU -> product id LRU, and how often (seconds)
+# each worker checks the shared cache for invalidations from other workers.
+SKU_CACHE_SIZE = config('SKU_CACHE_SIZE', default=10000, cast=int)
+SKU_CACHE_CHECK_SECONDS = config('SKU_CACHE_CHECK_SECONDS', default=1.0, cast=float)
+
+# Delta sync feed: default/maximum rows per page, and how long fresh rows
+# are held back so slow commits cannot land behind a client's cursor.
+SYNC_PAGE_SIZE = config('SYNC_PAGE_SIZE', default=500, cast=int)
+SYNC_MAX_PAGE_SIZE = config('SYNC_MAX_PAGE_SIZE', default=5000, cast=int)
+SYNC_SAFETY_SECONDS = config('SYNC_SAFETY_SECONDS', default=2, cast=int)
+
+# Movement reports are cached until the ledger changes, at most this long
+REPORT_CACHE_SECONDS = config('REPORT_CACHE_SECONDS', default=3600, cast=int)
+
+# AuditLog retention: days to keep per action (None = forever). Expired rows
+# are archived to AUDIT_LOG_ARCHIVE_DIR by `manage.py prune_audit_log`.
+AUDIT_LOG_RETENTION_DAYS = {
+    'view': config('AUDIT_RETENTION_VIEW_DAYS', default=90, cast=int),
+    'export': config('AUDIT_RETENTION_EXPORT_DAYS', default=365, cast=int),
+    'login': config('AUDIT_RETENTION_LOGIN_DAYS', default=365, cast=int),
+    'logout': config('AUDIT_RETENTION_LOGIN_DAYS', default=365, cast=int),
+}
+AUDIT_LOG_ARCHIVE_DIR = BASE_DIR / 'archives' / 'audit'
+
+# Host several companies on one deployment: each request is scoped to the
+# tenant of its host name or of the signed-in user (see config/tenancy.py)
+MULTI_TENANT = config('MULTI_TENANT', default=False, cast=bool)
+
+# Admin changelists of large tables count at most this many rows; beyond it
+# they show the database's row estimate and stop paging at the cap.
+ADMIN_COUNT_CAP = config('ADMIN_COUNT_CAP', default=10000, cast=int)
+
+# Low-stock digests (`manage.py send_notifications`, run from cron). The
+# collection window lags the clock so in-flight transactions are not missed;
+# failed deliveries are retried after RETRY_SECONDS, doubling each time.
+NOTIFICATION_CHANNELS = {
+    'email': 'inventory.notifications.EmailChannel',
+    'webhook': 'inventory.notifications.WebhookChannel',
+}
+NOTIFICATION_SAFETY_SECONDS = config('NOTIFICATION_SAFETY_SECONDS', default=30, cast=int)
+NOTIFICATION_MAX_ATTEMPTS = config('NOTIFICATION_MAX_ATTEMPTS', default=5, cast=int)
+NOTIFICATION_RETRY_SECONDS = config('NOTIFICATION_RETRY_SECONDS', default=60, cast=int)
+NOTIFICATION_WEBHOOK_TIMEOUT = config('NOTIFICATION_WEBHOOK_TIMEOUT', default=5, cast=int)
+NOTIFICATION_WEBHOOK_SECRET = config('NOTIFICATION_WEBHOOK_SECRET', default='')
+
+# Outgoing email (digests)
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='inventory@localhost')
+
+# Import views, resolve URLs and compile templates when the WSGI/ASGI
+# application loads, so the first request after a deploy is not slow
+WARMUP_ON_START = config('WARMUP_ON_START', default=not DEBUG, cast=bool)
+
+# Logging: records are queued and written by a background thread as JSON
+# lines to LOG_FILE (rotated at LOG_MAX_BYTES, old files gzipped), plus the
+# console. LOG_SAMPLING keeps only this share of DEBUG/INFO records from noisy
+# loggers; warnings and errors are always kept. With several processes
+# writing LOG_FILE (gunicorn/uvicorn workers) set LOG_ROTATION=external and
+# rotate it with logrotate; gunicorn.conf.py does so by default.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_FILE = config('LOG_FILE', default=str(BASE_DIR / 'logs' / 'app.log'))
+LOG_ROTATION = config('LOG_ROTATION', default='size')  # size | external
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=10, cast=int)
+LOG_QUEUE_SIZE = config('LOG_QUEUE_SIZE', default=10000, cast=int)
+LOG_SAMPLING = {
+    'django.db.backends': config('LOG_SAMPLE_DB', default=0.01, cast=float),
+    'config.access': config('LOG_SAMPLE_ACCESS', default=1.0, cast=float),
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'handlers': {
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'debug.log',
+        'queue': {
+            'class': 'config.log.QueueLogHandler',
+            'filename': LOG_FILE,
+            'rotation': LOG_ROTATION,
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'queue_size': LOG_QUEUE_SIZE,
+            'sampling': LOG_SAMPLING,
+            'console': config('LOG_CONSOLE', default=True, cast=bool),
         },
-        'console': {
-            'class': 'logging.StreamHandler',
+    },
+    'loggers': {
+        # DEBUG logs every SQL query (when DEBUG is on), sampled as above
+        'django.db.backends': {
+            'level': config('LOG_DB_LEVEL', default='INFO'),
         },
     },
     'root': {
-        'handlers': ['console', 'file'],
-        'level': 'INFO',
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
     },
 }
@@ -0,0 +1,33 @@
+"""Settings for the test suite.
+
+``manage.py test`` uses these; other runners need
+``DJANGO_SETTINGS_MODULE=config.settings_test``.
+"""
+import tempfile
+from pathlib import Path
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, LOGGING
+
+# A replica database of its own, so the routing tests can tell which
+# connection served a read. It is not in DATABASE_REPLICAS, so it is migrated
+# like the primary; the routing tests turn it on with
+# override_settings(DATABASE_REPLICAS=['replica1']).
+DATABASES = {
+    'default': DATABASES['default'],
+    'replica1': {**DATABASES['default'], 'NAME': BASE_DIR / 'db_replica.sqlite3'},
+}
+DATABASE_REPLICAS = []
+
+# Logs go to the temporary directory rather than logs/ in the source tree,
+# and not to the console, where they would be mixed into the test output
+LOGGING = {
+    **LOGGING,
+    'handlers': {
+        'queue': {
+            **LOGGING['handlers']['queue'],
+            'filename': str(Path(tempfile.gettempdir()) / 'ombor-tests' / 'app.log'),
+            'console': False,
+        },
+    },
+}
@@ -0,0 +1,218 @@
+"""Hashed, pre-compressed static files served by the application.
+
+``CompressedManifestStaticFilesStorage`` extends Django's manifest storage:
+after ``collectstatic`` has written the content-hashed copies it stores gzip
+(and, when the optional ``brotli`` package is installed, brotli) variants
+next to every text asset, so nothing is compressed per request.
+
+``StaticFilesMiddleware`` serves ``STATIC_URL`` straight from
+``STATIC_ROOT`` before the rest of the middleware stack runs. Hashed names
+never change content and are sent with a one-year ``immutable`` cache
+header; other names get a short ``max-age`` plus ``ETag``/``Last-Modified``
+revalidation. The smallest variant the client accepts is picked from
+``Accept-Encoding``.
+"""
+import gzip
+import json
+import mimetypes
+import os
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotAllowed, HttpResponseNotFound
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt', '.xml', '.ico', '.eot', '.ttf', '.otf',
+}
+MIN_COMPRESS_SIZE = 256
+# Keep a variant only if it saves at least this share of the original
+MIN_SAVING = 0.05
+# (suffix, Content-Encoding), best first
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Files up to this size are read into memory instead of streamed
+INLINE_MAX_BYTES = 512 * 1024
+
+
+def compress_file(path):
+    """Write ``path.gz`` (and ``path.br``) when it pays off; return suffixes."""
+    data = Path(path).read_bytes()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda d: brotli.compress(d, quality=11)))
+
+    written = []
+    for suffix, compress in variants:
+        compressed = compress(data)
+        target = Path(f'{path}{suffix}')
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            target.write_bytes(compressed)
+            written.append(suffix)
+        elif target.exists():
+            target.unlink()
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also pre-compresses text assets."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                compress_file(self.path(name))
+
+
+def accepted_encodings(header):
+    """Content codings in an ``Accept-Encoding`` header, minus ``q=0`` ones."""
+    accepted = set()
+    for token in header.split(','):
+        coding, _, params = token.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFile:
+    """A collected file and its pre-compressed variants."""
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.immutable = immutable
+        stat = os.stat(path)
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.etag = f'"{self.mtime:x}-{self.size:x}"'
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type in ('application/javascript', 'image/svg+xml'):
+            self.content_type += '; charset=utf-8'
+        self.variants = {
+            encoding: f'{path}{suffix}' for suffix, encoding in ENCODINGS if os.path.exists(f'{path}{suffix}')
+        }
+
+    def pick(self, accept_encoding):
+        """Return ``(path, encoding)`` of the best variant the client accepts."""
+        accepted = accepted_encodings(accept_encoding)
+        for _, encoding in ENCODINGS:
+            if encoding in self.variants and encoding in accepted:
+                return self.variants[encoding], encoding
+        return self.path, None
+
+
+def build_index(root, hashed_names):
+    """Map URL paths (relative to ``STATIC_URL``) to ``StaticFile`` entries."""
+    index = {}
+    variant_suffixes = tuple(suffix for suffix, _ in ENCODINGS)
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if name.endswith(variant_suffixes) and os.path.exists(path[:-3]):
+                continue
+            index[name] = StaticFile(path, name in hashed_names)
+    return index
+
+
+def load_hashed_names(root):
+    """Hashed file names listed in the ``collectstatic`` manifest."""
+    manifest = Path(root) / ManifestStaticFilesStorage.manifest_name
+    try:
+        return set(json.loads(manifest.read_text(encoding='utf-8')).get('paths', {}).values())
+    except (OSError, ValueError):
+        return set()
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files with long-lived cache headers.
+
+    Enabled by ``STATIC_SERVE``; the file list is read once at start-up, so
+    run ``collectstatic`` before starting the server. Place it right after
+    ``SecurityMiddleware``. Works in both WSGI and ASGI middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        static_url = settings.STATIC_URL or ''
+        if not getattr(settings, 'STATIC_SERVE', False) or not static_url.startswith('/') or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = static_url
+        self.max_age = getattr(settings, 'STATIC_MAX_AGE', 60)
+        root = os.fspath(settings.STATIC_ROOT)
+        self.files = build_index(root, load_hashed_names(root)) if os.path.isdir(root) else {}
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path_info.startswith(self.prefix):
+            return self.serve(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path_info.startswith(self.prefix):
+            return self.serve(request)
+        return await self.get_response(request)
+
+    def serve(self, request):
+        static_file = self.files.get(request.path_info[len(self.prefix):])
+        if static_file is None:
+            return HttpResponseNotFound()
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+        path, encoding = static_file.pick(request.headers.get('Accept-Encoding', ''))
+        etag = static_file.etag if encoding is None else f'{static_file.etag[:-1]}-{encoding}"'
+
+        if self._not_modified(request, static_file, etag):
+            response = HttpResponse(status=304)
+        elif os.path.getsize(path) <= INLINE_MAX_BYTES or request.method == 'HEAD':
+            with open(path, 'rb') as f:
+                body = f.read() if request.method == 'GET' else b''
+            response = HttpResponse(body, content_type=static_file.content_type)
+            response['Content-Length'] = os.path.getsize(path)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+            del response['Content-Disposition']
+
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if static_file.variants:
+            response['Vary'] = 'Accept-Encoding'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(static_file.mtime)
+        response['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if static_file.immutable else f'public, max-age={self.max_age}'
+        )
+        return response
+
+    @staticmethod
+    def _not_modified(request, static_file, etag):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return since is not None and static_file.mtime <= since
@@ -0,0 +1,128 @@
+"""Multi-tenant mode.
+
+With ``MULTI_TENANT`` on, several companies share one deployment. Every
+inventory and accounts row carries a ``tenant`` and ``TenantMiddleware``
+resolves the tenant of each request: from the host name (``Tenant.domain``)
+when it matches one, otherwise from the signed-in user's profile. Inside a
+request (or a ``tenant_context()`` block) the default managers of tenant
+models only return that tenant's rows, new rows are stamped with it, and
+cache namespaces (see ``config.cache``) are kept per tenant.
+
+In single-tenant mode requests are scoped to the default tenant, which owns
+every row, so queries still match the tenant-leading indexes. Outside any
+tenant (management commands, cron) queries are not scoped and new rows
+belong to the default tenant.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+
+CURRENT = object()
+
+_tenant = ContextVar('tenant_id', default=None)
+_default_tenant_id = None
+
+
+def is_enabled():
+    return getattr(settings, 'MULTI_TENANT', False)
+
+
+def current_tenant_id():
+    """Id of the tenant queries are scoped to, or ``None``."""
+    return _tenant.get()
+
+
+def default_tenant_id():
+    """Id of the tenant that owns rows created outside any tenant."""
+    global _default_tenant_id
+    if _default_tenant_id is None:
+        Tenant = apps.get_model('accounts', 'Tenant')
+        _default_tenant_id = Tenant.objects.get_default().pk
+    return _default_tenant_id
+
+
+def tenant_for_new_rows():
+    """Default of every ``tenant`` foreign key."""
+    return current_tenant_id() or default_tenant_id()
+
+
+@contextmanager
+def tenant_context(tenant):
+    """Scope queries, new rows and cache namespaces to ``tenant`` (instance, id or ``None``)."""
+    token = _tenant.set(getattr(tenant, 'pk', tenant))
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def cache_prefix(tenant_id=CURRENT):
+    """Prefix of a tenant's cache namespaces; empty in single-tenant mode."""
+    if not is_enabled():
+        return ''
+    if tenant_id is CURRENT:
+        tenant_id = current_tenant_id()
+    return f't{tenant_id}:' if tenant_id else ''
+
+
+def resolve_tenant(request):
+    """Tenant of a request: by host first, then by the user's profile.
+
+    Raises ``PermissionDenied`` when a signed-in user belongs to a different
+    tenant than the host they are using, or to no active tenant at all: their
+    queries would otherwise run unscoped, across every tenant.
+    """
+    Tenant = apps.get_model('accounts', 'Tenant')
+    tenant = Tenant.objects.for_host(request.get_host().split(':')[0].lower())
+    user = request.user
+    if not user.is_authenticated:
+        return tenant
+    profile = getattr(user, 'profile', None)
+    user_tenant_id = profile.tenant_id if profile else None
+    if tenant is None:
+        tenant = Tenant.objects.filter(pk=user_tenant_id, is_active=True).first() if user_tenant_id else None
+        if tenant is None:
+            raise PermissionDenied("This account does not belong to an active company.")
+        return tenant
+    if user_tenant_id != tenant.pk and not user.is_superuser:
+        raise PermissionDenied("This account belongs to another company.")
+    return tenant
+
+
+class TenantMiddleware:
+    """Resolve the tenant and scope the rest of the request to it.
+
+    Sets ``request.tenant`` (``None`` when no tenant applies, i.e. for
+    anonymous requests on a shared host, and in single-tenant mode, where requests
+    are scoped to the default tenant). Must come after
+    ``AuthenticationMiddleware``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if is_enabled():
+            request.tenant = scope = resolve_tenant(request)
+        else:
+            request.tenant, scope = None, default_tenant_id()
+        with tenant_context(scope):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if is_enabled():
+            request.tenant = scope = await sync_to_async(resolve_tenant)(request)
+        else:
+            request.tenant, scope = None, _default_tenant_id or await sync_to_async(default_tenant_id)()
+        with tenant_context(scope):
+            return await self.get_response(request)
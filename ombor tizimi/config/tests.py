@@ -0,0 +1,159 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Tenant
+from config.tenancy import tenant_context
+from inventory.models import Product
+
+from config.db_router import (
+    PIN_COOKIE, PrimaryReplicaRouter, ReplicaPinningMiddleware, current_read_database, replica_reads,
+    routed_stream, use_primary, use_replica,
+)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=5)
+class PrimaryReplicaRouterTests(TestCase):
+    """Routing against a replica that is a separate database from the primary."""
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        # Only the primary has this user, only the replica has the other one
+        User.objects.create(username='on-primary')
+        # bulk_create: no profile signal, which would write to the primary
+        User.objects.using('replica1').bulk_create([User(username='on-replica')])
+
+    def visible_users(self):
+        return set(User.objects.values_list('username', flat=True))
+
+    def test_reads_use_primary_by_default(self):
+        self.assertEqual(current_read_database(), 'default')
+        self.assertEqual(self.visible_users(), {'on-primary'})
+
+    def test_use_replica_reads_from_replica_connection(self):
+        with use_replica():
+            self.assertEqual(current_read_database(), 'replica1')
+            self.assertEqual(self.visible_users(), {'on-replica'})
+
+    def test_use_primary_is_not_overridden_by_nested_replica(self):
+        with use_primary(), use_replica():
+            self.assertEqual(self.visible_users(), {'on-primary'})
+
+    def test_writes_go_to_primary_inside_replica_block(self):
+        with use_replica():
+            User.objects.create(username='written')
+        self.assertTrue(User.objects.using('default').filter(username='written').exists())
+        self.assertFalse(User.objects.using('replica1').filter(username='written').exists())
+
+    def test_allow_relation_between_primary_and_replica_objects(self):
+        router = PrimaryReplicaRouter()
+        primary_user = User.objects.using('default').get(username='on-primary')
+        replica_user = User.objects.using('replica1').get(username='on-replica')
+        self.assertTrue(router.allow_relation(primary_user, replica_user))
+        self.assertEqual(router.db_for_write(User, instance=replica_user), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        router = PrimaryReplicaRouter()
+        self.assertTrue(router.allow_migrate('default', 'inventory'))
+        self.assertFalse(router.allow_migrate('replica1', 'inventory'))
+
+    def run_middleware(self, request):
+        """Response of a replica_reads view behind the pinning middleware."""
+        @replica_reads
+        def view(request):
+            return HttpResponse(','.join(sorted(self.visible_users())))
+        return ReplicaPinningMiddleware(view)(request)
+
+    def test_read_only_view_reads_replica_without_pin(self):
+        response = self.run_middleware(self.factory.get('/products/'))
+        self.assertEqual(response.content, b'on-replica')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_write_pins_client_to_primary(self):
+        response = self.run_middleware(self.factory.post('/products/create/'))
+        self.assertEqual(response.content, b'on-primary')
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        self.assertTrue(cookie['httponly'])
+
+        # The redirect that follows the write reads its own write
+        request = self.factory.get('/products/1/')
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        response = self.run_middleware(request)
+        self.assertEqual(response.content, b'on-primary')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(REPLICA_PIN_SECONDS=1)
+    def test_pin_expires_with_cookie(self):
+        response = self.run_middleware(self.factory.post('/stock/transaction/'))
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 1)
+
+        # Once the browser drops the expired cookie, reads go back to the replica
+        response = self.run_middleware(self.factory.get('/products/'))
+        self.assertEqual(response.content, b'on-replica')
+
+    def test_override_forces_primary(self):
+        response = self.run_middleware(self.factory.get('/products/', {'db': 'primary'}))
+        self.assertEqual(response.content, b'on-primary')
+        response = self.run_middleware(self.factory.get('/products/', HTTP_X_DB_ROUTE='primary'))
+        self.assertEqual(response.content, b'on-primary')
+
+    def test_streamed_response_reads_replica(self):
+        @replica_reads
+        def view(request):
+            rows = (username for username in User.objects.values_list('username', flat=True))
+            return StreamingHttpResponse(routed_stream(request, rows))
+
+        # Consumed after the view has returned, as the server does
+        response = ReplicaPinningMiddleware(view)(self.factory.get('/transactions/export/'))
+        self.assertEqual(b''.join(response.streaming_content), b'on-replica')
+        response = ReplicaPinningMiddleware(view)(self.factory.get('/transactions/export/', {'db': 'primary'}))
+        self.assertEqual(b''.join(response.streaming_content), b'on-primary')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        response = self.run_middleware(self.factory.post('/products/create/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        with use_replica():
+            self.assertEqual(current_read_database(), 'default')
+
+
+@override_settings(MULTI_TENANT=True, ALLOWED_HOSTS=['testserver', 'b.example.com'])
+class TenantScopingTests(TestCase):
+
+    def setUp(self):
+        self.a = Tenant.objects.create(name='A', slug='a')
+        self.b = Tenant.objects.create(name='B', slug='b', domain='b.example.com')
+        for tenant, sku in ((self.a, 'A1'), (self.b, 'B1')):
+            with tenant_context(tenant):
+                Product.objects.create(sku=sku, name=f'secret {tenant.name}')
+        self.user = User.objects.create_user('alice', password='x')
+        self.user.profile.tenant = self.a
+        self.user.profile.save()
+
+    def autocomplete(self, **extra):
+        response = self.client.get(reverse('product_autocomplete'), {'q': 'secret'}, **extra)
+        return response.status_code, [row['text'] for row in response.json()['results']] if response.status_code == 200 else []
+
+    def test_user_sees_only_own_tenant(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.autocomplete(), (200, ['secret A (A1)']))
+        with tenant_context(self.a):
+            self.assertEqual(list(Product.objects.values_list('sku', flat=True)), ['A1'])
+
+    def test_other_tenants_host_is_refused(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.autocomplete(HTTP_HOST='b.example.com'), (403, []))
+
+    def test_inactive_tenant_is_refused_not_unscoped(self):
+        Tenant.objects.filter(pk=self.a.pk).update(is_active=False)
+        self.client.force_login(self.user)
+        self.assertEqual(self.autocomplete(), (403, []))
+        self.assertEqual(self.client.get(reverse('products_list')).status_code, 403)
+
+    def test_user_without_profile_is_refused(self):
+        self.user.profile.delete()
+        self.client.force_login(User.objects.get(pk=self.user.pk))
+        self.assertEqual(self.autocomplete(), (403, []))
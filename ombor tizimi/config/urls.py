@@ -1,13 +1,19 @@
 """Main URL Configuration for Inventory Management System."""
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from inventory.images import serve_image
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
     path('', include('inventory.urls')),
+    # Content-addressed product images, cached by browsers for good
+    re_path(
+        rf'^{settings.MEDIA_URL.lstrip("/")}(?P<name>products/[0-9a-f]{{2}}/[0-9a-f]{{64}}\.[a-z0-9]+)$', serve_image
+    ),
 ]
 
 if settings.DEBUG:
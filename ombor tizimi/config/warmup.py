@@ -0,0 +1,118 @@
+"""Warm a freshly started process before it accepts traffic.
+
+The first request to a new worker normally pays for importing every view
+module, building the URL resolver and compiling each template it renders.
+``warm_up()`` does that work up front: it imports the views of every
+installed app, walks the URLconf (resolving each pattern's callback) and
+compiles all templates through the engine's cached loader.
+
+``config.wsgi`` and ``config.asgi`` call it when ``WARMUP_ON_START`` is set.
+With gunicorn's ``preload_app`` it runs once in the master and the forked
+workers inherit the warm state.
+"""
+import logging
+import time
+from importlib import import_module
+from importlib.util import find_spec
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def import_views():
+    """Import ``<app>.views`` (and ``async_views``) of every installed app."""
+    count = 0
+    for app_config in apps.get_app_configs():
+        for module in ('views', 'async_views'):
+            name = f'{app_config.name}.{module}'
+            if find_spec(name) is not None:
+                import_module(name)
+                count += 1
+    return count
+
+
+def _walk(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield pattern
+
+
+def resolve_urls():
+    """Build the resolver's lookup tables and import every view callback."""
+    resolver = get_resolver()
+    count = 0
+    for pattern in _walk(resolver.url_patterns):
+        pattern.callback  # resolves and caches the view
+        count += 1
+    # Populates the reverse and namespace maps used by reverse()/{% url %}
+    resolver.reverse_dict
+    resolver.namespace_dict
+    return count
+
+
+def template_names(engine):
+    """Names of all templates in the backend's directories (incl. app dirs)."""
+    names = set()
+    for directory in engine.template_dirs:
+        directory = Path(directory)
+        for path in directory.rglob('*'):
+            if path.is_file() and path.suffix in ('.html', '.txt', '.xml'):
+                names.add(path.relative_to(directory).as_posix())
+    return sorted(names)
+
+
+def compile_templates():
+    """Compile every template so the cached loader holds them all."""
+    count = 0
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except Exception:
+                # Partial templates or ones for other engines; not our concern
+                logger.debug("Skipped template %s during warm-up", name, exc_info=True)
+            else:
+                count += 1
+    return count
+
+
+def warm_up():
+    """Run all warm-up steps and return ``{step: (items, seconds)}``."""
+    timings = {}
+    for step, func in (
+        ('views', import_views),
+        ('urls', resolve_urls),
+        ('templates', compile_templates),
+    ):
+        started = time.perf_counter()
+        items = func()
+        timings[step] = (items, time.perf_counter() - started)
+
+    # Load the translation catalog once instead of on the first request
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.deactivate()
+
+    # Nothing above should need the database, but never hand an open
+    # connection to forked workers.
+    connections.close_all()
+
+    logger.info(
+        "Warm-up done: %s",
+        ', '.join(f'{step} {items} in {seconds * 1000:.0f}ms' for step, (items, seconds) in timings.items()),
+    )
+    return timings
+
+
+def warm_up_if_enabled():
+    """Call ``warm_up()`` when ``WARMUP_ON_START`` is set."""
+    if getattr(settings, 'WARMUP_ON_START', False):
+        warm_up()
@@ -0,0 +1,50 @@
+"""Gunicorn production profile.
+
+    gunicorn -c gunicorn.conf.py
+
+Every value can be overridden with the environment variables below. The app
+is preloaded in the master (``config.wsgi`` runs the warm-up there), so
+workers fork with views imported, URLs resolved and templates compiled.
+
+Graceful reloads: ``kill -HUP <master>`` replaces the workers gracefully
+but, because the app is preloaded, keeps the old code. To deploy new code
+without dropping requests send ``USR2`` (starts a new master next to the old
+one), then ``WINCH`` and ``TERM`` to the old master once the new one is up.
+"""
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+wsgi_app = os.environ.get('GUNICORN_APP', 'config.wsgi:application')
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Sizing: processes for CPU, threads to overlap database/cache waits.
+# Use GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker together with
+# GUNICORN_APP=config.asgi:application for the async views.
+workers = env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+threads = env_int('GUNICORN_THREADS', 4)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+os.environ.setdefault('WARMUP_ON_START', 'True')
+# Every worker appends to the log file; logrotate rotates it (see README)
+os.environ.setdefault('LOG_ROTATION', 'external')
+# Hashed, pre-compressed static files; run collectstatic before starting
+os.environ.setdefault('STATIC_MANIFEST', 'True')
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# Recycle workers now and then (staggered) to bound memory growth
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+# The application logs requests itself (config.log.RequestLogMiddleware)
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
@@ -1,20 +1,196 @@
-"""Django Admin Configuration for Inventory Management System."""
+"""Django Admin Configuration for Inventory Management System.
+
+The Product, StockTransaction and AuditLog changelists are built to stay
+fast on large tables: stock is annotated in the changelist query, counts
+stop at ``ADMIN_COUNT_CAP`` rows (falling back to the database's row
+estimate, or a cached per-tenant count in multi-tenant mode), and searches resolve products/users first and then filter the
+big table by indexed id columns instead of ``icontains`` across joins.
+"""
+import math
+
+from django.apps import apps
+from django.conf import settings
 from django.contrib import admin
-from .models import Category, Product, StockTransaction, AuditLog, LowStockAlert
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from config.cache import get_or_compute, namespaced_key
+from config.tenancy import is_enabled as multi_tenant
+from .models import (
+    Category, Product, StockTransaction, AuditLog, LowStockAlert, Location, StockBalance, StockTake,
+    NotificationSubscription, NotificationDelivery, ImageBlob,
+)
 from accounts.models import UserProfile
 
+# Products matched by a ledger search; more than this is not a useful search
+SEARCH_PRODUCT_LIMIT = 500
+# Seconds a tenant's row count past the cap is reused for the changelist total
+TENANT_COUNT_SECONDS = 3600
+
+
+def estimated_row_count(model):
+    """Row count from the database statistics, or ``None`` if unavailable."""
+    connection = connections[router.db_for_read(model)]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table]),
+        'mysql': (
+            "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+            [table],
+        ),
+        # Filled in by ANALYZE; each row starts with an index's entry count
+        'sqlite': ("SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s", [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    sql, params = queries[connection.vendor]
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never counts more than ``ADMIN_COUNT_CAP`` rows.
+
+    Up to the cap the count is exact. Past it an unfiltered list (one only
+    scoped to the tenant) shows the database's row estimate, or in
+    multi-tenant mode the tenant's row count, counted at most once per
+    ``TENANT_COUNT_SECONDS``; a filtered list shows the cap. Navigation stops
+    at the cap so no page needs a deep ``OFFSET``.
+    """
+
+    @cached_property
+    def count_cap(self):
+        return getattr(settings, 'ADMIN_COUNT_CAP', 10000)
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        counted = queryset.order_by()[:self.count_cap + 1].count()
+        if counted <= self.count_cap:
+            return counted
+        if self.is_unfiltered(queryset):
+            estimate = self.estimate(queryset)
+            if estimate and estimate > self.count_cap:
+                return estimate
+        return self.count_cap
+
+    @staticmethod
+    def is_unfiltered(queryset):
+        """Whether ``queryset`` has no filter besides the tenant scope."""
+        where = queryset.query.where
+        return not where or where == queryset.model._default_manager.all().query.where
+
+    @staticmethod
+    def estimate(queryset):
+        model = queryset.model
+        tenant_id = getattr(queryset, '_tenant_id', None)
+        if tenant_id is None or not multi_tenant():
+            # Every row is the (single) tenant's; the table estimate is free
+            return estimated_row_count(model)
+        return get_or_compute(
+            namespaced_key('admin-counts', model._meta.label, tenant=tenant_id),
+            queryset.order_by().count, timeout=TENANT_COUNT_SECONDS, namespace='admin-counts',
+        )
+
+    @cached_property
+    def num_pages(self):
+        return min(super().num_pages, max(1, math.ceil(self.count_cap / self.per_page)))
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow without bound."""
+    paginator = EstimatedCountPaginator
+    # The "N total" link would run an exact COUNT(*) over the whole table
+    show_full_result_count = False
+
+
+class StockStatusFilter(admin.SimpleListFilter):
+    title = 'stock status'
+    parameter_name = 'stock'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('low_stock', 'Low stock'),
+            ('out_of_stock', 'Out of stock'),
+            ('in_stock', 'In stock'),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.with_stock_status(self.value())
+        return queryset
+
+
+class ModelNameFilter(admin.SimpleListFilter):
+    """``model_name`` choices from the installed models, not a DISTINCT scan."""
+    title = 'model name'
+    parameter_name = 'model_name'
+
+    def lookups(self, request, model_admin):
+        names = sorted({model.__name__ for model in apps.get_app_config('inventory').get_models()})
+        return [(name, name) for name in names]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(model_name=self.value())
+        return queryset
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'created_at', 'updated_at']
+    list_display = ['name', 'parent', 'depth', 'created_at', 'updated_at']
+    list_select_related = ['parent']
     search_fields = ['name']
+    autocomplete_fields = ['parent']
+    readonly_fields = ['path', 'depth', 'created_at', 'updated_at']
+
+
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'is_default', 'is_active', 'created_at']
+    list_filter = ['is_default', 'is_active']
+    search_fields = ['code', 'name']
     readonly_fields = ['created_at', 'updated_at']
 
 
+@admin.register(StockBalance)
+class StockBalanceAdmin(admin.ModelAdmin):
+    list_display = ['product', 'location', 'quantity', 'updated_at']
+    list_filter = ['location']
+    search_fields = ['product__name', 'product__sku']
+    list_select_related = ['product', 'location']
+    readonly_fields = ['product', 'location', 'quantity', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(StockTake)
+class StockTakeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'location', 'category', 'status', 'created_by', 'created_at', 'posted_at']
+    list_filter = ['status', 'location']
+    list_select_related = ['location', 'category', 'created_by']
+    readonly_fields = ['status', 'created_by', 'created_at', 'posted_by', 'posted_at']
+
+    # Lines are listed on the stock take page; an inline would render every
+    # product in scope on one admin form.
+
+
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ['sku', 'name', 'category', 'current_stock', 'minimum_stock', 'is_active', 'created_at']
-    list_filter = ['category', 'is_active', 'created_at']
+class ProductAdmin(LargeTableAdmin):
+    list_display = ['sku', 'name', 'category', 'stock', 'minimum_stock', 'is_active', 'created_at']
+    list_filter = [StockStatusFilter, 'category', 'is_active', 'created_at']
+    list_select_related = ['category']
     search_fields = ['sku', 'name']
     readonly_fields = ['created_by', 'created_at', 'updated_at', 'current_stock']
     
@@ -37,6 +213,14 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # One subquery for the whole page instead of an aggregate per row
+        return super().get_queryset(request).with_stock()
+
+    @admin.display(description='Stock', ordering='stock_level')
+    def stock(self, obj):
+        return obj.stock_level
+
     def save_model(self, request, obj, form, change):
         if not change:
             obj.created_by = request.user
@@ -44,25 +228,39 @@ class ProductAdmin(admin.ModelAdmin):
 
 
 @admin.register(StockTransaction)
-class StockTransactionAdmin(admin.ModelAdmin):
-    list_display = ['product', 'transaction_type', 'quantity', 'reason', 'created_by', 'created_at']
-    list_filter = ['transaction_type', 'reason', 'created_at']
+class StockTransactionAdmin(LargeTableAdmin):
+    list_display = [
+        'product', 'location', 'transaction_type', 'quantity', 'balance_after', 'reason', 'created_by', 'created_at',
+    ]
+    list_filter = ['transaction_type', 'reason', 'location', 'created_at']
+    list_select_related = ['product', 'location', 'created_by']
     search_fields = ['product__name', 'product__sku', 'reference_no']
-    readonly_fields = ['created_by', 'created_at']
+    search_help_text = 'Exact SKU or reference number, or the start of a product name'
+    readonly_fields = ['created_by', 'created_at', 'transfer_group', 'balance_after']
 
     fieldsets = (
         ('Transaction Details', {
-            'fields': ('product', 'transaction_type', 'quantity', 'reason')
+            'fields': ('product', 'location', 'transaction_type', 'quantity', 'reason')
         }),
         ('Additional Info', {
             'fields': ('reference_no', 'notes')
         }),
         ('System Information', {
-            'fields': ('created_by', 'created_at'),
+            'fields': ('created_by', 'created_at', 'transfer_group', 'balance_after'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        product_ids = list(
+            Product.objects.filter(Q(sku__iexact=term) | Q(name__istartswith=term))
+            .values_list('id', flat=True)[:SEARCH_PRODUCT_LIMIT]
+        )
+        return queryset.filter(Q(product_id__in=product_ids) | Q(reference_no=term)), False
+
     def save_model(self, request, obj, form, change):
         obj.created_by = request.user
         super().save_model(request, obj, form, change)
@@ -76,13 +274,55 @@ class LowStockAlertAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'resolved_at', 'current_stock', 'minimum_stock']
 
 
+@admin.register(NotificationSubscription)
+class NotificationSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'channel', 'target', 'include_resolved', 'is_active', 'last_digest_at']
+    list_filter = ['channel', 'is_active']
+    search_fields = ['user__username', 'target']
+    list_select_related = ['user']
+    filter_horizontal = ['categories']
+    readonly_fields = ['last_digest_at', 'created_at']
+
+
+@admin.register(NotificationDelivery)
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subscription', 'status', 'attempts', 'window_end', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    list_select_related = ['subscription__user']
+    readonly_fields = [
+        'subscription', 'window_start', 'window_end', 'payload', 'attempts', 'last_error', 'created_at', 'sent_at',
+    ]
+
+
+@admin.register(ImageBlob)
+class ImageBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'references', 'created_at']
+    search_fields = ['name']
+    readonly_fields = ['name', 'size', 'references', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
+class AuditLogAdmin(LargeTableAdmin):
     list_display = ['user', 'action', 'model_name', 'timestamp']
-    list_filter = ['action', 'model_name', 'timestamp']
+    list_filter = ['action', ModelNameFilter, 'timestamp']
+    list_select_related = ['user']
     search_fields = ['user__username', 'model_name']
+    search_help_text = 'Exact username, model name or object id'
     readonly_fields = ['user', 'action', 'model_name', 'timestamp', 'old_values', 'new_values']
 
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        user_ids = list(User.objects.filter(username__iexact=term).values_list('id', flat=True))
+        condition = Q(user_id__in=user_ids) | Q(model_name__iexact=term)
+        if term.isdigit():
+            condition |= Q(object_id=int(term))
+        return queryset.filter(condition), False
+
     def has_add_permission(self, request):
         return False
 
@@ -0,0 +1,222 @@
+"""Async views for Inventory app (served under ASGI).
+
+The read-only pages here mirror their counterparts in ``views.py`` but run
+their queries through Django's async ORM, so under ASGI a request waiting on
+the database does not hold a worker thread. They replace the sync views in
+the URLconf when ``ASYNC_VIEWS`` is enabled.
+"""
+import asyncio
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.shortcuts import render
+
+from accounts.permissions import is_admin
+from config.db_router import replica_reads
+from config.tenancy import current_tenant_id
+from .events import get_broker
+from .forms import ProductFilterForm, TransactionFilterForm
+from .reports import dashboard_stats
+from .models import Product, StockTransaction, LowStockAlert, Location
+from .views import get_page_bounds, filter_products, filter_transactions
+
+KEEPALIVE_SECONDS = 15
+
+
+def async_login_required(view_func):
+    """``login_required`` for coroutine views."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def async_require_GET(view_func):
+    """``require_GET`` for coroutine views."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(['GET'])
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+async def _alist(queryset):
+    """Evaluate a queryset asynchronously into a list."""
+    return [obj async for obj in queryset]
+
+
+async def _arender(request, template_name, context):
+    # Context processors and base.html touch the session and user profile,
+    # which are sync-only; all page data is already evaluated at this point.
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@async_login_required
+@async_require_GET
+@replica_reads
+async def dashboard(request):
+    """Main dashboard view; independent queries run concurrently."""
+    stats, low_stock_alerts, recent_transactions = await asyncio.gather(
+        # Cached aggregates; a miss is computed once across all workers
+        sync_to_async(dashboard_stats)(),
+        _alist(LowStockAlert.objects.filter(status='active').select_related('product')[:5]),
+        _alist(StockTransaction.objects.select_related('product', 'created_by').order_by('-created_at')[:10]),
+    )
+
+    context = {
+        'page_title': 'Dashboard',
+        **stats,
+        'low_stock_alerts': low_stock_alerts,
+        'recent_transactions': recent_transactions,
+    }
+    return await _arender(request, 'inventory/dashboard.html', context)
+
+
+@async_login_required
+@async_require_GET
+@replica_reads
+async def products_list(request):
+    """List all products."""
+    form = ProductFilterForm(request.GET)
+    is_valid = await sync_to_async(form.is_valid)()
+    products, location = filter_products(form, is_valid)
+
+    products, can_edit = await asyncio.gather(
+        _alist(products),
+        sync_to_async(is_admin)(request.user),
+    )
+
+    context = {
+        'page_title': 'Products',
+        'products': products,
+        'form': form,
+        'location': location,
+        'can_edit': can_edit,
+    }
+    return await _arender(request, 'inventory/products_list.html', context)
+
+
+@async_login_required
+@async_require_GET
+@replica_reads
+async def product_detail(request, pk):
+    """Product detail view."""
+    try:
+        product = await Product.objects.select_related('category', 'created_by').with_stock().aget(id=pk)
+    except Product.DoesNotExist:
+        raise Http404("No Product matches the given query.")
+
+    transactions, balances, can_edit = await asyncio.gather(
+        _alist(product.transactions.select_related('created_by', 'location').order_by('-created_at')),
+        _alist(product.balances.select_related('location').order_by('location__name')),
+        sync_to_async(is_admin)(request.user),
+    )
+
+    context = {
+        'page_title': f'Product: {product.name}',
+        'product': product,
+        'transactions': transactions,
+        'balances': balances,
+        'can_edit': can_edit,
+    }
+    return await _arender(request, 'inventory/product_detail.html', context)
+
+
+@async_login_required
+@async_require_GET
+@replica_reads
+async def transactions_list(request):
+    """List all transactions."""
+    form = TransactionFilterForm(request.GET)
+    is_valid = await sync_to_async(form.is_valid)()
+    transactions = filter_transactions(form, is_valid)
+    paginator_from, paginator_to = get_page_bounds(request)
+
+    page, total_transactions = await asyncio.gather(
+        _alist(transactions[paginator_from:paginator_to]),
+        transactions.acount(),
+    )
+
+    context = {
+        'page_title': 'Stock Transactions',
+        'transactions': page,
+        'total_transactions': total_transactions,
+        'form': form,
+    }
+    return await _arender(request, 'inventory/transactions_list.html', context)
+
+
+@async_login_required
+@async_require_GET
+@replica_reads
+async def low_stock_alerts(request):
+    """View low stock alerts."""
+    alerts = LowStockAlert.objects.select_related('product', 'resolved_by').filter(
+        status='active'
+    ).order_by('-created_at')
+    locations = Location.objects.filter(is_active=True)
+
+    location = None
+    location_id = request.GET.get('location', '')
+    if location_id.isdigit():
+        location = await locations.filter(pk=location_id).afirst()
+    if location:
+        alerts = alerts.filter(product__balances__location=location)
+
+    alerts, locations = await asyncio.gather(_alist(alerts), _alist(locations))
+
+    context = {
+        'page_title': 'Low Stock Alerts',
+        'alerts': alerts,
+        'locations': locations,
+        'location': location,
+    }
+    return await _arender(request, 'inventory/low_stock_alerts.html', context)
+
+
+async def _event_stream(tenant_id=None):
+    """Format the tenant's broker events as SSE frames, with keep-alive comments.
+
+    Django 4.2 does not listen for ``http.disconnect`` while a response
+    streams and servers drop writes to a closed connection silently, so a
+    stream cannot tell that its client is gone. It ends after
+    ``LIVE_EVENTS_STREAM_SECONDS`` instead (EventSource reconnects after the
+    ``retry`` delay) and always gives its broker subscription back.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.LIVE_EVENTS_STREAM_SECONDS
+    subscription = get_broker().subscribe(timeout=KEEPALIVE_SECONDS)
+    try:
+        yield 'retry: 5000\n\n'
+        async for event in subscription:
+            if event is None:
+                yield ': keep-alive\n\n'
+            elif event.get('tenant') == tenant_id:
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+            if loop.time() >= deadline:
+                break
+    finally:
+        await subscription.aclose()
+
+
+@async_login_required
+@async_require_GET
+async def live_events(request):
+    """Server-sent event stream of stock changes, alerts and transactions."""
+    if not hasattr(request, 'scope'):
+        # A WSGI worker would hold a thread for the whole stream; 204 tells
+        # EventSource clients not to reconnect so pages fall back to reloads.
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(_event_stream(current_tenant_id()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
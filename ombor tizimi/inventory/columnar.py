@@ -0,0 +1,216 @@
+"""Columnar (Parquet / Arrow IPC) export of the transaction ledger.
+
+Rows are read from a server-side cursor (on PostgreSQL; chunked fetches
+elsewhere) ``chunk_rows`` at a time, turned into one Arrow record batch per
+chunk and written out as a Parquet row group or an Arrow IPC stream message,
+so memory stays flat however long the ledger is. Values keep their types:
+timestamps stay timestamps, reasons are stored as their codes, and
+low-cardinality text columns are dictionary-encoded (pandas reads them as
+categoricals).
+
+Requires the ``pyarrow`` package, which is imported on the first export
+rather than with this module: it adds ~23 ms to the start-up of every worker.
+"""
+import importlib.util
+from datetime import datetime, time as dt_time, timedelta
+from functools import cache
+
+from django.utils import timezone
+
+from .models import StockTransaction
+
+FORMATS = {
+    # name: (content type, file extension)
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+DEFAULT_CHUNK_ROWS = 65536
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+# name: (lookup, arrow type name, dictionary-encoded, converter)
+COLUMNS = {
+    'id': ('id', 'int64', False, None),
+    'created_at': ('created_at', 'timestamp', False, None),
+    'transaction_type': ('transaction_type', 'string', True, None),
+    'quantity': ('quantity', 'int32', False, None),
+    'balance_after': ('balance_after', 'int64', False, None),
+    'reason': ('reason', 'string', True, None),
+    'reference_no': ('reference_no', 'string', False, None),
+    'notes': ('notes', 'string', False, None),
+    'transfer_group': ('transfer_group', 'string', False, _text),
+    'product_id': ('product_id', 'int64', False, None),
+    'sku': ('product__sku', 'string', False, None),
+    'product_name': ('product__name', 'string', False, None),
+    'unit': ('product__unit', 'string', True, None),
+    'category': ('product__category__name', 'string', True, None),
+    'location': ('location__code', 'string', True, None),
+    'created_by': ('created_by__username', 'string', True, None),
+}
+DEFAULT_COLUMNS = [
+    'id', 'created_at', 'transaction_type', 'quantity', 'balance_after', 'reason', 'reference_no',
+    'product_id', 'sku', 'product_name', 'category', 'location', 'created_by',
+]
+
+
+def is_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+@cache
+def _pyarrow():
+    """``(pyarrow, pyarrow.parquet)``, imported on first use."""
+    import pyarrow
+    import pyarrow.parquet
+    return pyarrow, pyarrow.parquet
+
+
+def parse_columns(value):
+    """Column names from a comma-separated list; raises ``ValueError`` on unknown names."""
+    if not value:
+        return list(DEFAULT_COLUMNS)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}. Available: {', '.join(COLUMNS)}")
+    return names
+
+
+def _arrow_type(name):
+    pa, _ = _pyarrow()
+    _, type_name, dictionary, _ = COLUMNS[name]
+    if type_name == 'timestamp':
+        return pa.timestamp('us', tz='UTC')
+    value_type = getattr(pa, type_name)()
+    return pa.dictionary(pa.int32(), value_type) if dictionary else value_type
+
+
+def schema(columns):
+    pa, _ = _pyarrow()
+    return pa.schema([pa.field(name, _arrow_type(name)) for name in columns])
+
+
+def ledger_rows(start_date=None, end_date=None, location=None):
+    """Ledger queryset filtered by an inclusive date range (as index-friendly ranges)."""
+    transactions = StockTransaction.objects.all()
+    tz = timezone.get_current_timezone()
+    if start_date:
+        start = datetime.combine(start_date, dt_time.min)
+        transactions = transactions.filter(created_at__gte=timezone.make_aware(start, tz))
+    if end_date:
+        end = datetime.combine(end_date + timedelta(days=1), dt_time.min)
+        transactions = transactions.filter(created_at__lt=timezone.make_aware(end, tz))
+    if location is not None:
+        transactions = transactions.filter(location=location)
+    return transactions
+
+
+def record_batches(queryset, columns, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield one ``RecordBatch`` per ``chunk_rows`` rows of ``queryset``."""
+    pa, _ = _pyarrow()
+    batch_schema = schema(columns)
+    lookups = [COLUMNS[name][0] for name in columns]
+    rows = queryset.order_by('id').values_list(*lookups).iterator(chunk_size=chunk_rows)
+
+    def build(chunk):
+        arrays = []
+        for index, values in enumerate(zip(*chunk)):
+            name = columns[index]
+            _, _, dictionary, convert = COLUMNS[name]
+            if convert is not None:
+                values = [convert(value) for value in values]
+            field_type = batch_schema.field(index).type
+            if dictionary:
+                arrays.append(pa.array(values, type=field_type.value_type).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field_type))
+        return pa.RecordBatch.from_arrays(arrays, schema=batch_schema)
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield build(chunk)
+            chunk = []
+    if chunk:
+        yield build(chunk)
+
+
+class _Sink:
+    """Write-only file object that hands its buffered bytes out on ``drain()``."""
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _writer(sink, fmt, columns, compression):
+    pa, pq = _pyarrow()
+    if fmt == 'parquet':
+        return pq.ParquetWriter(sink, schema(columns), compression=compression)
+    # The IPC stream format (unlike the file format) allows each batch its
+    # own dictionaries
+    return pa.ipc.new_stream(sink, schema(columns))
+
+
+def _write_batch(writer, fmt, batch):
+    if fmt == 'parquet':
+        # One row group per batch
+        writer.write_batch(batch, row_group_size=batch.num_rows)
+    else:
+        writer.write_batch(batch)
+
+
+def stream_export(queryset, fmt='parquet', columns=None, chunk_rows=DEFAULT_CHUNK_ROWS, compression='zstd'):
+    """Yield the export as byte chunks, one per row group / batch.
+
+    Suitable for a ``StreamingHttpResponse``; the first bytes go out before
+    the whole ledger has been read.
+    """
+    columns = columns or list(DEFAULT_COLUMNS)
+    sink = _Sink()
+    writer = _writer(sink, fmt, columns, compression)
+    try:
+        for batch in record_batches(queryset, columns, chunk_rows):
+            _write_batch(writer, fmt, batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def write_export(output, queryset, fmt='parquet', columns=None, chunk_rows=DEFAULT_CHUNK_ROWS, compression='zstd'):
+    """Write the export to a binary file object; return the row count."""
+    columns = columns or list(DEFAULT_COLUMNS)
+    rows = 0
+    with _writer(output, fmt, columns, compression) as writer:
+        for batch in record_batches(queryset, columns, chunk_rows):
+            _write_batch(writer, fmt, batch)
+            rows += batch.num_rows
+    return rows
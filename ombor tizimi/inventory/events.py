@@ -0,0 +1,128 @@
+"""Live inventory events pushed to browsers over server-sent events.
+
+Signals publish small JSON deltas (stock changes, alerts, new transactions)
+once the surrounding database transaction commits. Subscribers are the SSE
+connections served by ``inventory.async_views.live_events``.
+
+Two brokers are available, selected by ``LIVE_EVENTS_BACKEND``:
+
+* ``memory`` (default) - in-process pub/sub; only clients connected to the
+  same server process receive events.
+* ``redis`` - Redis pub/sub on ``LIVE_EVENTS_REDIS_URL`` so every worker
+  process sees every event.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'inventory-events'
+QUEUE_SIZE = 100
+
+
+class InMemoryBroker:
+    """Fan events out to asyncio queues living in this process."""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Event loop already closed; the subscriber is going away
+                pass
+
+    @staticmethod
+    def _deliver(queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop the event rather than buffer without bound
+            pass
+
+    async def subscribe(self, timeout):
+        """Yield events, or ``None`` after ``timeout`` idle seconds."""
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+class RedisBroker:
+    """Redis pub/sub broker shared by all worker processes."""
+
+    def __init__(self, url):
+        import redis
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, event):
+        try:
+            self._client.publish(CHANNEL, json.dumps(event))
+        except Exception:
+            logger.warning("Could not publish live event to Redis", exc_info=True)
+
+    async def subscribe(self, timeout):
+        """Yield events, or ``None`` after ``timeout`` idle seconds."""
+        import redis.asyncio as aioredis
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(CHANNEL)
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+                yield json.loads(message['data']) if message else None
+        finally:
+            await pubsub.unsubscribe(CHANNEL)
+            await pubsub.close()
+            await client.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured in settings."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = getattr(settings, 'LIVE_EVENTS_BACKEND', 'memory')
+                if backend == 'redis':
+                    _broker = RedisBroker(settings.LIVE_EVENTS_REDIS_URL)
+                else:
+                    _broker = InMemoryBroker()
+    return _broker
+
+
+def publish(event_type, data, tenant_id):
+    """Publish an event after the current database transaction commits.
+
+    Events carry the tenant of the object they describe (not the tenant of
+    the request, which signals fired from commands or ``on_commit`` do not
+    have); subscribers only see their own tenant's events.
+    """
+    if not getattr(settings, 'LIVE_EVENTS_ENABLED', True):
+        return
+    event = {'type': event_type, 'data': data, 'tenant': tenant_id}
+    transaction.on_commit(lambda: get_broker().publish(event))
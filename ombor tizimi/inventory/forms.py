@@ -1,13 +1,29 @@
 """Forms for Inventory app."""
 from django import forms
-from .models import Product, StockTransaction, Category
+from django.core.validators import URLValidator, validate_email
+from .models import Product, StockTransaction, Category, Location, StockTake, NotificationSubscription
+from .widgets import AutocompleteSelect
+
+
+class CategoryChoiceField(forms.ModelChoiceField):
+    """Categories in tree order, indented by depth."""
+
+    def label_from_instance(self, obj):
+        return '\u2014 ' * obj.depth + obj.name
 
 
 class CategoryForm(forms.ModelForm):
     """Category creation/edit form."""
+    parent = CategoryChoiceField(
+        queryset=Category.objects.order_by('path'),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        empty_label="None (top level)"
+    )
+
     class Meta:
         model = Category
-        fields = ['name', 'description']
+        fields = ['name', 'parent', 'description']
         widgets = {
             'name': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -73,9 +89,10 @@ class StockTransactionForm(forms.ModelForm):
     """Stock transaction form."""
     class Meta:
         model = StockTransaction
-        fields = ['product', 'transaction_type', 'quantity', 'reason', 'reference_no', 'notes']
+        fields = ['product', 'location', 'transaction_type', 'quantity', 'reason', 'reference_no', 'notes']
         widgets = {
-            'product': forms.Select(attrs={'class': 'form-select'}),
+            'product': AutocompleteSelect('product_autocomplete', attrs={'class': 'form-select'}),
+            'location': forms.Select(attrs={'class': 'form-select'}),
             'transaction_type': forms.Select(attrs={'class': 'form-select'}),
             'quantity': forms.NumberInput(attrs={
                 'class': 'form-control',
@@ -95,6 +112,11 @@ class StockTransactionForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['location'].queryset = Location.objects.filter(is_active=True)
+        self.fields['location'].empty_label = "Default location"
+
     def clean(self):
         cleaned_data = super().clean()
         quantity = cleaned_data.get('quantity')
@@ -105,14 +127,158 @@ class StockTransactionForm(forms.ModelForm):
         return cleaned_data
 
 
+class StockTransferForm(forms.Form):
+    """Move stock between two locations."""
+    product = forms.ModelChoiceField(
+        queryset=Product.objects.filter(is_active=True),
+        widget=AutocompleteSelect('product_autocomplete', params={'active': 1}, attrs={'class': 'form-select'})
+    )
+    from_location = forms.ModelChoiceField(
+        queryset=Location.objects.filter(is_active=True),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    to_location = forms.ModelChoiceField(
+        queryset=Location.objects.filter(is_active=True),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    quantity = forms.IntegerField(
+        min_value=1,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'min': '1',
+            'placeholder': 'Enter quantity'
+        })
+    )
+    reference_no = forms.CharField(
+        max_length=100,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Transfer document number (optional)'
+        })
+    )
+    notes = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'rows': 3,
+            'placeholder': 'Additional notes (optional)'
+        })
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        from_location = cleaned_data.get('from_location')
+        to_location = cleaned_data.get('to_location')
+
+        if from_location and to_location and from_location == to_location:
+            self.add_error('to_location', 'Destination must differ from the source location.')
+
+        return cleaned_data
+
+
+class StockTakeForm(forms.ModelForm):
+    """Start a stock take."""
+    class Meta:
+        model = StockTake
+        fields = ['location', 'category', 'notes']
+        widgets = {
+            'location': forms.Select(attrs={'class': 'form-select'}),
+            'category': forms.Select(attrs={'class': 'form-select'}),
+            'notes': forms.Textarea(attrs={
+                'class': 'form-control',
+                'rows': 2,
+                'placeholder': 'Notes (optional)'
+            }),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['location'].queryset = Location.objects.filter(is_active=True)
+        self.fields['category'].empty_label = "All Categories"
+
+
+class NotificationSubscriptionForm(forms.ModelForm):
+    """Subscribe to low-stock digests."""
+    class Meta:
+        model = NotificationSubscription
+        fields = ['channel', 'target', 'categories', 'include_resolved']
+        widgets = {
+            'channel': forms.Select(attrs={'class': 'form-select'}),
+            'target': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'name@example.com or https://...'
+            }),
+            'categories': forms.SelectMultiple(attrs={'class': 'form-select', 'size': 6}),
+            'include_resolved': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        }
+
+    def __init__(self, *args, allow_webhooks=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not allow_webhooks:
+            # The server POSTs to webhook URLs; only admins may choose them
+            self.fields['channel'].choices = [
+                choice for choice in self.fields['channel'].choices if choice[0] != 'webhook'
+            ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        channel = cleaned_data.get('channel')
+        target = (cleaned_data.get('target') or '').strip()
+
+        try:
+            if channel == 'webhook':
+                if not target:
+                    raise forms.ValidationError('A webhook needs a URL.')
+                URLValidator(schemes=['http', 'https'])(target)
+            elif target:
+                validate_email(target)
+        except forms.ValidationError as error:
+            self.add_error('target', error)
+
+        cleaned_data['target'] = target
+        return cleaned_data
+
+
+class StockCountForm(forms.Form):
+    """Record the counted quantity of one SKU."""
+    sku = forms.CharField(
+        max_length=50,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Scan or type SKU',
+            'autofocus': True
+        })
+    )
+    quantity = forms.IntegerField(
+        min_value=0,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'min': '0',
+            'placeholder': 'Counted quantity'
+        })
+    )
+    add = forms.BooleanField(
+        required=False,
+        label='Add to existing count',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+
 class ProductFilterForm(forms.Form):
-    """Filter products form."""
+    """Filter products form. A category also matches its subcategories."""
     category = forms.ModelChoiceField(
         queryset=Category.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'class': 'form-select'}),
+        widget=AutocompleteSelect('category_autocomplete', attrs={'class': 'form-select'}),
         empty_label="All Categories"
     )
+    location = forms.ModelChoiceField(
+        queryset=Location.objects.filter(is_active=True),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        empty_label="All Locations"
+    )
     status = forms.ChoiceField(
         choices=[
             ('', 'All Stock Status'),
@@ -137,9 +303,15 @@ class TransactionFilterForm(forms.Form):
     product = forms.ModelChoiceField(
         queryset=Product.objects.all(),
         required=False,
-        widget=forms.Select(attrs={'class': 'form-select'}),
+        widget=AutocompleteSelect('product_autocomplete', attrs={'class': 'form-select'}),
         empty_label="All Products"
     )
+    location = forms.ModelChoiceField(
+        queryset=Location.objects.filter(is_active=True),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        empty_label="All Locations"
+    )
     transaction_type = forms.ChoiceField(
         choices=[('', 'All Types'), ('IN', 'Stock In'), ('OUT', 'Stock Out')],
         required=False,
@@ -159,3 +331,61 @@ class TransactionFilterForm(forms.Form):
             'type': 'date'
         })
     )
+
+
+class MovementReportForm(forms.Form):
+    """Parameters of the stock movement report."""
+    group_by = forms.ChoiceField(
+        choices=[
+            ('', 'No grouping'),
+            ('category', 'Category'),
+            ('reason', 'Reason'),
+            ('user', 'User'),
+            ('location', 'Location'),
+            ('product', 'Product'),
+        ],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    period = forms.ChoiceField(
+        choices=[('', 'Whole range'), ('day', 'Day'), ('week', 'Week'), ('month', 'Month')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    location = forms.ModelChoiceField(
+        queryset=Location.objects.filter(is_active=True),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        empty_label="All Locations"
+    )
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.all(),
+        required=False,
+        widget=AutocompleteSelect('category_autocomplete', attrs={'class': 'form-select'}),
+        empty_label="All Categories"
+    )
+    start_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={
+            'class': 'form-control',
+            'type': 'date'
+        })
+    )
+    end_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={
+            'class': 'form-control',
+            'type': 'date'
+        })
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+
+        if start_date and end_date and start_date > end_date:
+            self.add_error('end_date', 'End date must be on or after the start date.')
+
+        return cleaned_data
+
@@ -0,0 +1,134 @@
+"""Product images: reference counting, pruning and serving.
+
+Images are kept once per distinct content by ``config.media`` (the
+``product_images`` storage). ``ImageBlob`` counts the products that
+reference each stored image, kept up to date by signals on ``Product``.
+``prune_unreferenced`` deletes images no product references any more once
+they are older than a grace period that covers uploads still being saved,
+and ``serve_image`` sends them with a one-year ``immutable`` cache header.
+"""
+import mimetypes
+import os
+import time
+
+from django.db.models import F
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.views.decorators.http import require_http_methods
+
+from config.media import CONTENT_NAME, is_content_addressed
+from config.static import IMMUTABLE_CACHE_CONTROL
+from .models import ImageBlob, Product, product_image_storage
+
+
+def retain(name):
+    """Count one more product referencing the stored image ``name``."""
+    if not is_content_addressed(name):
+        return
+    blob, created = ImageBlob.objects.get_or_create(
+        name=name, defaults={'size': product_image_storage().size(name), 'references': 1}
+    )
+    if not created:
+        ImageBlob.objects.filter(pk=blob.pk).update(references=F('references') + 1)
+
+
+def release(name):
+    """Count one product fewer referencing ``name``; pruning removes it at zero."""
+    if is_content_addressed(name):
+        ImageBlob.objects.filter(name=name, references__gt=0).update(references=F('references') - 1)
+
+
+def stored_images(storage=None):
+    """``(name, size, mtime)`` of every content-addressed file in the storage."""
+    storage = storage or product_image_storage()
+    root = storage.path('')
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            if is_content_addressed(name):
+                stat = os.stat(path)
+                yield name, stat.st_size, stat.st_mtime
+
+
+def usage():
+    """Disk bytes actually stored vs. bytes the products' images add up to."""
+    stored = sum(size for _, size, _ in stored_images())
+    referenced = sum(blob.size * blob.references for blob in ImageBlob.objects.filter(references__gt=0))
+    return {'stored_bytes': stored, 'referenced_bytes': referenced}
+
+
+def prune_unreferenced(grace_seconds=3600, dry_run=False):
+    """Delete stored images no product references; return ``(count, bytes)``.
+
+    Files younger than ``grace_seconds`` are kept: they may belong to a
+    product that is being saved right now.
+    """
+    storage = product_image_storage()
+    referenced = set(ImageBlob.objects.filter(references__gt=0).values_list('name', flat=True))
+    cutoff = time.time() - grace_seconds
+    count = freed = 0
+    for name, size, mtime in stored_images(storage):
+        if name in referenced or mtime > cutoff:
+            continue
+        if not dry_run:
+            storage.delete(name)
+            ImageBlob.objects.filter(name=name, references=0).delete()
+        count += 1
+        freed += size
+    return count, freed
+
+
+def adopt_existing(dry_run=False):
+    """Move images stored under their upload names into the content store.
+
+    Every product image that is not content-addressed yet is filed by its
+    hash (identical files collapse into one) and the product is pointed at
+    it. Returns ``(products moved, original files removed)``.
+    """
+    storage = product_image_storage()
+    moved, old_names = 0, set()
+    products = Product._base_manager.exclude(image='').exclude(image__isnull=True).order_by('pk')
+    for product in products.iterator():
+        old_name = product.image.name
+        if is_content_addressed(old_name) or not storage.exists(old_name):
+            continue
+        moved += 1
+        if dry_run:
+            continue
+        with storage.open(old_name) as source:
+            new_name = storage.save(old_name, source)
+        # update() skips the signals; count the reference here
+        Product._base_manager.filter(pk=product.pk).update(image=new_name)
+        retain(new_name)
+        old_names.add(old_name)
+
+    still_used = set(
+        Product._base_manager.filter(image__in=old_names).values_list('image', flat=True)
+    )
+    removed = 0
+    for old_name in old_names - still_used:
+        storage.delete(old_name)
+        removed += 1
+    return moved, removed
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_image(request, name):
+    """Serve a content-addressed image with a long-lived ``immutable`` header."""
+    match = CONTENT_NAME.match(name)
+    if match is None:
+        raise Http404
+    etag = f'"{match.group("digest")}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            image = product_image_storage().open(name)
+        except FileNotFoundError:
+            raise Http404
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        response = FileResponse(image, content_type=content_type)
+        del response['Content-Disposition']
+    response['ETag'] = etag
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,59 @@
+"""Fill in ``StockTransaction.balance_after`` for existing ledger rows."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from inventory.models import Product, StockBalance, StockTransaction
+
+
+class Command(BaseCommand):
+    help = "Compute the running balance of every product's ledger in one ordered pass per product."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sku', action='append', default=[], help='Only these products (repeatable)')
+        parser.add_argument('--all', action='store_true',
+                            help='Recheck every product, not just those with rows missing a balance')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--products-per-transaction', type=int, default=100,
+                            help='Products locked and committed together')
+
+    def handle(self, *args, **options):
+        products = Product.objects.order_by('pk')
+        if options['sku']:
+            products = products.filter(sku__in=options['sku'])
+            missing = set(options['sku']) - set(products.values_list('sku', flat=True))
+            if missing:
+                raise CommandError(f"Unknown SKU(s): {', '.join(sorted(missing))}")
+        elif not options['all']:
+            products = products.filter(
+                pk__in=StockTransaction.objects.filter(balance_after__isnull=True).values('product_id')
+            )
+
+        updated = mismatched = 0
+        product_ids = list(products.values_list('pk', flat=True))
+        step = max(1, options['products_per_transaction'])
+        for start in range(0, len(product_ids), step):
+            batch = product_ids[start:start + step]
+            # Small groups keep locks short on a live system
+            with transaction.atomic():
+                Product.objects.filter(pk__in=batch).lock()
+                for product_id in batch:
+                    updated += StockTransaction.rebuild_balances(product_id, batch_size=options['batch_size'])
+                stocks = dict(
+                    StockBalance.objects.filter(product_id__in=batch).values('product_id')
+                    .annotate(total=Sum('quantity')).values_list('product_id', 'total')
+                )
+                for product_id in batch:
+                    last = (
+                        StockTransaction.objects.filter(product_id=product_id)
+                        .order_by('-created_at', '-id').values_list('balance_after', flat=True).first()
+                    ) or 0
+                    if last != stocks.get(product_id, 0):
+                        mismatched += 1
+                        self.stderr.write(
+                            f"Product {product_id}: ledger ends at {last} but balances hold {stocks.get(product_id, 0)}"
+                        )
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} row(s) across {len(product_ids)} product(s)."))
+        if mismatched:
+            self.stdout.write(self.style.WARNING(f"{mismatched} product(s) disagree with their stock balances."))
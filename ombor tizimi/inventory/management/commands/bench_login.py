@@ -0,0 +1,131 @@
+"""Benchmark concurrent logins, as at a shift change.
+
+Temporary users sign in through the login view on a thread pool, each with
+a fresh client. With ``--compare`` the configured login path is measured
+against Django's stock one (PBKDF2 hashing, database sessions) and against
+the first login after switching hashers, which verifies the old hash and
+rehashes the password once.
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+USERNAME_PREFIX = 'bench-login-'
+STOCK_HASHER = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+STOCK_SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+
+def stock_hashers():
+    return [STOCK_HASHER] + [hasher for hasher in settings.PASSWORD_HASHERS if hasher != STOCK_HASHER]
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent logins through the login view."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Logins per mode (one temporary user each)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Logins in flight at once')
+        parser.add_argument('--compare', action='store_true',
+                            help="Also measure Django's stock login path and the first login after a hasher switch")
+
+    def handle(self, *args, **options):
+        total = options['users']
+        concurrency = options['concurrency']
+        # (label, settings the users are created under, settings the logins run under)
+        modes = [('configured', {}, {})]
+        if options['compare']:
+            stock = {'PASSWORD_HASHERS': stock_hashers(), 'SESSION_ENGINE': STOCK_SESSION_ENGINE}
+            modes = [('stock', stock, stock), ('rehash', stock, {})] + modes
+
+        self.stdout.write(f"{total} logins per mode, concurrency {concurrency}\n")
+        self.stdout.write(
+            f"{'mode':<12}{'hasher':<16}{'sessions':<12}{'logins/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'cpu ms':>9}{'queries':>9}{'errors':>8}"
+        )
+        for label, create_settings, run_settings in modes:
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            try:
+                with override_settings(**create_settings):
+                    self._create_users(total)
+                with override_settings(**run_settings):
+                    queries = self._count_queries()
+                    elapsed, cpu, latencies, errors = self._run(total, concurrency)
+                    hasher = get_hasher().algorithm
+                    sessions = settings.SESSION_ENGINE.rsplit('.', 1)[-1]
+            finally:
+                User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            self.stdout.write(
+                f"{label:<12}{hasher:<16}{sessions:<12}{total / elapsed:>10.1f}"
+                f"{statistics.median(latencies) * 1000:>9.1f}{self._percentile(latencies, 95) * 1000:>9.1f}"
+                f"{cpu / max(total - errors, 1) * 1000:>9.1f}{queries:>9}{errors:>8}"
+            )
+        self.stdout.write("\ncpu ms: CPU time per login; queries: database queries of one login")
+
+    @staticmethod
+    def _password(index):
+        return f'bench-password-{index}'
+
+    def _create_users(self, total):
+        # One hash per user, as real accounts have; index 0 is the query probe
+        for index in range(total + 1):
+            User.objects.create(
+                username=f'{USERNAME_PREFIX}{index}', password=make_password(self._password(index))
+            )
+
+    def _login(self, index):
+        """``(seconds, CPU seconds, succeeded)`` of one login; signs out afterwards."""
+        client = Client(HTTP_HOST='localhost')
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        response = client.post(reverse('login'), {
+            'username': f'{USERNAME_PREFIX}{index}', 'password': self._password(index),
+        })
+        timings = time.perf_counter() - start, time.thread_time() - cpu_start
+        if response.status_code != 302:
+            return (*timings, False)
+        client.get(reverse('logout'))
+        return (*timings, True)
+
+    def _count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            client = Client(HTTP_HOST='localhost')
+            client.post(reverse('login'), {'username': f'{USERNAME_PREFIX}0', 'password': self._password(0)})
+        # Read before the next request resets the query log
+        count = len(queries)
+        client.get(reverse('logout'))
+        return count
+
+    def _run(self, total, concurrency):
+        def call(index):
+            try:
+                return self._login(index)
+            except Exception:
+                return 0.0, 0.0, False
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(call, range(1, total + 1)))
+        elapsed = time.perf_counter() - started
+        succeeded = [(latency, cpu) for latency, cpu, ok in results if ok]
+        return (
+            elapsed,
+            sum(cpu for _, cpu in succeeded),
+            [latency for latency, _ in succeeded] or [0.0],
+            len(results) - len(succeeded),
+        )
+
+    @staticmethod
+    def _percentile(values, percent):
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
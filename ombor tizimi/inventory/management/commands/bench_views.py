@@ -0,0 +1,99 @@
+"""Compare concurrent throughput of the sync (WSGI) and async (ASGI) read views."""
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+
+from inventory import views, async_views
+
+VIEW_NAMES = ['dashboard', 'products_list', 'transactions_list', 'low_stock_alerts']
+
+
+class Command(BaseCommand):
+    help = "Benchmark read-only views: sync views on a thread pool vs async views on one event loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per view and mode')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument('--user', default=None, help='Username to run as (default: first superuser)')
+        parser.add_argument('--views', default=','.join(VIEW_NAMES), help='Comma-separated view names')
+
+    def handle(self, *args, **options):
+        user = self._get_user(options['user'])
+        total = options['requests']
+        concurrency = options['concurrency']
+        factory = RequestFactory()
+
+        self.stdout.write(f"{total} requests per view, concurrency {concurrency}\n")
+        self.stdout.write(f"{'view':<20}{'mode':<7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+
+        for name in options['views'].split(','):
+            name = name.strip()
+            if not hasattr(async_views, name):
+                raise CommandError(f"No async version of view '{name}'")
+
+            def make_request():
+                request = factory.get('/')
+                request.user = user
+                return request
+
+            sync_result = self._run_sync(getattr(views, name), make_request, total, concurrency)
+            async_result = asyncio.run(
+                self._run_async(getattr(async_views, name), make_request, total, concurrency)
+            )
+            for mode, (elapsed, latencies) in (('wsgi', sync_result), ('asgi', async_result)):
+                self.stdout.write(
+                    f"{name:<20}{mode:<7}{total / elapsed:>9.1f}"
+                    f"{statistics.median(latencies) * 1000:>9.1f}"
+                    f"{self._percentile(latencies, 95) * 1000:>9.1f}"
+                )
+
+    def _get_user(self, username):
+        users = User.objects.select_related('profile')
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to run the benchmark as; pass --user")
+        return user
+
+    @staticmethod
+    def _percentile(values, percent):
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @staticmethod
+    def _run_sync(view, make_request, total, concurrency):
+        def call(_):
+            start = time.perf_counter()
+            try:
+                view(make_request())
+            finally:
+                connections.close_all()
+            return time.perf_counter() - start
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(call, range(total)))
+        return time.perf_counter() - started, latencies
+
+    @staticmethod
+    async def _run_async(view, make_request, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                start = time.perf_counter()
+                await view(make_request())
+                return time.perf_counter() - start
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(call() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        await sync_to_async(connections.close_all)()
+        return elapsed, latencies
@@ -0,0 +1,31 @@
+"""Show cache backend status and read-through hit/miss/latency metrics."""
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from config.cache import metrics
+
+
+class Command(BaseCommand):
+    help = "Print cache hit ratio and latency per namespace, summed over all workers."
+
+    def handle(self, *args, **options):
+        backend = caches['default']
+        status = ''
+        if getattr(backend, 'using_fallback', False):
+            status = ' (Redis unreachable, using local fallback)'
+        self.stdout.write(f"Backend: {type(backend).__name__}{status}")
+
+        totals = metrics.totals()
+        if not totals:
+            self.stdout.write("No cache activity recorded yet.")
+            return
+
+        self.stdout.write(
+            f"{'namespace':<16}{'hits':>10}{'misses':>10}{'hit %':>8}{'waits':>8}"
+            f"{'get ms':>10}{'computes':>10}{'compute ms':>12}"
+        )
+        for namespace, stats in sorted(totals.items()):
+            self.stdout.write(
+                f"{namespace:<16}{stats['hits']:>10}{stats['misses']:>10}{stats['hit_ratio'] * 100:>7.1f}%"
+                f"{stats['waits']:>8}{stats['avg_get_ms']:>10.2f}{stats['computes']:>10}{stats['avg_compute_ms']:>12.1f}"
+            )
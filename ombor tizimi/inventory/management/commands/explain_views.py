@@ -0,0 +1,194 @@
+"""Run EXPLAIN on every query the GET views issue and flag full scans.
+
+Each argument-free GET route (plus detail pages, using the first product and
+stock take as sample objects) is requested as a superuser. The SELECTs it
+runs are captured, explained on the database they ran against and checked
+for full table scans and sorts that could not use an index. Everything runs
+in a transaction that is rolled back, so views that log access leave no
+trace. Supports SQLite and PostgreSQL.
+"""
+import json
+import re
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from inventory.models import Product, StockTake
+
+# Streaming or state-changing routes that must not be requested
+SKIP_ROUTES = {'live_events', 'logout', 'scan'}
+# Routes taking a ``pk``: model supplying a sample object
+SAMPLE_MODELS = {
+    'product_detail': Product,
+    'edit_product': Product,
+    'product_history': Product,
+    'product_stock_history': Product,
+    'stock_take_detail': StockTake,
+}
+
+
+def view_urls():
+    """``(name, url)`` for every GET route that can be requested here."""
+    def walk(patterns, namespace=''):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                ns = f'{namespace}{pattern.namespace}:' if pattern.namespace else namespace
+                yield from walk(pattern.url_patterns, ns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield namespace + pattern.name, pattern
+
+    for name, pattern in walk(get_resolver().url_patterns):
+        if name in SKIP_ROUTES or name.startswith('admin:'):
+            continue
+        params = pattern.pattern.converters
+        if not params:
+            yield name, reverse(name)
+        elif set(params) == {'pk'} and name in SAMPLE_MODELS:
+            pk = SAMPLE_MODELS[name].objects.order_by('pk').values_list('pk', flat=True).first()
+            if pk is not None:
+                yield name, reverse(name, kwargs={'pk': pk})
+
+
+class QueryCapture:
+    """``execute_wrapper`` recording SELECT statements per connection."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((self.alias, sql, params))
+        return execute(sql, params, many, context)
+
+
+def explain_sqlite(cursor, sql, params):
+    """Problems in an SQLite ``EXPLAIN QUERY PLAN``: ``[(kind, table, detail)]``."""
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    problems = []
+    for row in cursor.fetchall():
+        detail = row[-1]
+        match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+        if match and 'CONSTANT ROW' not in detail and ' USING ' not in detail:
+            # Subqueries are reported by alias (``SCAN U0``); find the table
+            name = match.group(1)
+            aliased = re.search(rf'"(\w+)" (?:AS )?"?{name}"?[\s)]', sql)
+            problems.append(('full scan', aliased.group(1) if aliased else name, detail))
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(('sort', '', detail))
+    return problems
+
+
+def explain_postgresql(cursor, sql, params):
+    """Problems in a PostgreSQL ``EXPLAIN (FORMAT JSON)``."""
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    problems = []
+
+    def walk(node):
+        if node.get('Node Type') == 'Seq Scan':
+            table = node.get('Relation Name', '')
+            problems.append(('full scan', table, f"Seq Scan on {table} (~{node.get('Plan Rows')} rows)"))
+        elif node.get('Node Type') == 'Sort':
+            problems.append(('sort', '', f"Sort on {', '.join(node.get('Sort Key', []))}"))
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return problems
+
+
+EXPLAINERS = {
+    'sqlite': explain_sqlite,
+    'postgresql': explain_postgresql,
+}
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the queries of every GET view and flag full table scans and unindexed sorts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help='Ignore full scans of tables with fewer rows than this')
+        parser.add_argument('--sorts', action='store_true', help='Also report sorts that use a temporary structure')
+        parser.add_argument('--verbose-sql', action='store_true', help='Print the SQL of each flagged query')
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Exit with an error if any full scan is found (for CI)')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("A superuser is needed to request the views.")
+        for alias in connections:
+            if connections[alias].vendor not in EXPLAINERS:
+                raise CommandError(f"EXPLAIN parsing is not implemented for {connections[alias].vendor}.")
+
+        client = Client(HTTP_HOST='localhost')
+        client.force_login(user)
+        table_rows = {}
+        findings = defaultdict(list)
+
+        with transaction.atomic():
+            for name, url in view_urls():
+                captures = [QueryCapture(alias) for alias in connections]
+                with ExitStack() as stack:
+                    for capture in captures:
+                        stack.enter_context(connections[capture.alias].execute_wrapper(capture))
+                    response = client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                if response.status_code >= 400:
+                    self.stderr.write(f"{name}: HTTP {response.status_code}, skipped")
+                    continue
+
+                seen = set()
+                queries = [q for capture in captures for q in capture.queries]
+                for alias, sql, params in queries:
+                    if sql in seen:
+                        continue
+                    seen.add(sql)
+                    connection = connections[alias]
+                    with connection.cursor() as cursor:
+                        problems = EXPLAINERS[connection.vendor](cursor, sql, params)
+                    for kind, table, detail in problems:
+                        if kind == 'sort' and not options['sorts']:
+                            continue
+                        if kind == 'full scan':
+                            rows = table_rows.get((alias, table))
+                            if rows is None:
+                                rows = table_rows[(alias, table)] = self._count(connection, table)
+                            if rows < options['min_rows']:
+                                continue
+                            detail = f'{detail} [{rows} rows]'
+                        findings[name].append((kind, detail, sql))
+                self.stdout.write(f"{name:<28}{url:<32}{len(queries):>4} queries, {len(findings[name])} flagged")
+            transaction.set_rollback(True)
+
+        scans = 0
+        for name, problems in findings.items():
+            if not problems:
+                continue
+            self.stdout.write(f"\n{name}")
+            for kind, detail, sql in problems:
+                scans += kind == 'full scan'
+                self.stdout.write(f"  {kind}: {detail}")
+                if options['verbose_sql']:
+                    self.stdout.write(f"    {sql}")
+
+        if not scans:
+            self.stdout.write(self.style.SUCCESS("\nNo full scans of large tables."))
+        elif options['fail_on_scan']:
+            raise CommandError(f"{scans} full scan(s) found.")
+
+    @staticmethod
+    def _count(connection, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            return cursor.fetchone()[0]
@@ -0,0 +1,77 @@
+"""Report how much import time each installed app adds to process start-up."""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter so nothing is imported yet; loading the URLconf
+# pulls in every view module, as serving the first request would.
+STARTUP_SCRIPT = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+def parse_importtime(output):
+    """Yield ``(module, self_us)`` from ``python -X importtime`` output."""
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        yield parts[2].strip(), int(parts[0])
+
+
+def owner(module, app_modules):
+    """Installed app owning ``module``, else its top-level package."""
+    for app in app_modules:
+        if module == app or module.startswith(app + '.'):
+            return app
+    return module.split('.')[0]
+
+
+class Command(BaseCommand):
+    help = "Measure import time per installed app (and other top packages) in a fresh interpreter."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Also list this many non-app packages')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Start-up failed:\n{result.stderr[-2000:]}")
+
+        # Most specific app first, so django.contrib.admin wins over django
+        app_modules = sorted(
+            (app.split('.apps.')[0] for app in settings.INSTALLED_APPS),
+            key=len, reverse=True,
+        )
+        self_us = defaultdict(int)
+        modules = defaultdict(int)
+        for module, us in parse_importtime(result.stderr):
+            name = owner(module, app_modules)
+            self_us[name] += us
+            modules[name] += 1
+        total = sum(self_us.values())
+
+        self.stdout.write(f"Total import time: {total / 1000:.0f}ms for {sum(modules.values())} modules\n")
+        self.stdout.write(f"{'installed app':<32}{'modules':>9}{'ms':>9}{'share':>8}")
+        for app in sorted(app_modules, key=lambda a: -self_us[a]):
+            self._row(app, modules[app], self_us[app], total)
+
+        others = sorted((name for name in self_us if name not in app_modules), key=lambda n: -self_us[n])
+        self.stdout.write(f"\n{'other packages':<32}{'modules':>9}{'ms':>9}{'share':>8}")
+        for name in others[:options['top']]:
+            self._row(name, modules[name], self_us[name], total)
+
+    def _row(self, name, count, us, total):
+        share = us / total * 100 if total else 0
+        self.stdout.write(f"{name:<32}{count:>9}{us / 1000:>9.1f}{share:>7.1f}%")
@@ -0,0 +1,342 @@
+"""Concurrent write load test for the stock transaction path.
+
+Simulates ``--users`` clerks, each on its own thread, performing a weighted
+mix of barcode scans, stock IN/OUT form posts, ledger list views and
+exports against a small pool of products (so writers contend for the same
+rows). Requests go through the Django test client in this process, or, with
+``--url``, over HTTP to a running server. Reports throughput, latency
+percentiles per operation, lock errors, and then checks that the ledger,
+the stock balances and ``balance_after`` still agree.
+
+Writes real transactions: run it against a copy of the database.
+"""
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from http.cookiejar import CookieJar
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Q, Sum
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Product, StockBalance, StockTransaction
+
+DEFAULT_MIX = 'scan=40,in=20,out=20,list=15,export=5'
+# Fragments of database errors caused by lock contention
+LOCK_ERRORS = ('database is locked', 'deadlock detected', 'lock timeout', 'could not serialize', 'could not obtain lock')
+
+
+def parse_mix(value):
+    """``"scan=40,in=20"`` -> ``{'scan': 40, 'in': 20}``."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(f"Unknown operation '{name}'; choose from {', '.join(OPERATIONS)}")
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise CommandError(f"Weight for '{name}' must be an integer")
+    if not any(mix.values()):
+        raise CommandError("The operation mix needs at least one positive weight")
+    return mix
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class TestClientSession:
+    """Requests through the Django test client; server errors surface as exceptions."""
+
+    def __init__(self, user):
+        self.client = Client(HTTP_HOST='localhost')
+        self.client.force_login(user)
+
+    def get(self, path, params=None):
+        return self.client.get(path, params or {}).status_code
+
+    def post_form(self, path, data):
+        return self.client.post(path, data).status_code
+
+    def post_json(self, path, payload):
+        return self.client.post(path, json.dumps(payload), content_type='application/json').status_code
+
+    def close(self):
+        connections.close_all()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """Requests over HTTP with a logged-in session cookie and CSRF token."""
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+        login = reverse('login')
+        self.get(login)
+        status = self._send('POST', login, urllib.parse.urlencode({
+            'username': username, 'password': password, 'csrfmiddlewaretoken': self.csrf_token,
+        }).encode(), 'application/x-www-form-urlencoded')
+        if status != 302:
+            raise CommandError(f"Login as '{username}' failed (HTTP {status})")
+
+    @property
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def _send(self, method, path, body=None, content_type=None):
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        request.add_header('Referer', self.base_url + path)
+        if body is not None:
+            request.add_header('Content-Type', content_type)
+            request.add_header('X-CSRFToken', self.csrf_token)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code
+
+    def get(self, path, params=None):
+        return self._send('GET', f"{path}?{urllib.parse.urlencode(params)}" if params else path)
+
+    def post_form(self, path, data):
+        data = {**data, 'csrfmiddlewaretoken': self.csrf_token}
+        return self._send('POST', path, urllib.parse.urlencode(data).encode(), 'application/x-www-form-urlencoded')
+
+    def post_json(self, path, payload):
+        return self._send('POST', path, json.dumps(payload).encode(), 'application/json')
+
+    def close(self):
+        pass
+
+
+def op_scan(session, product, rng):
+    transaction_type = rng.choice(['IN', 'OUT'])
+    status = session.post_json(reverse('scan'), {'sku': product.sku, 'quantity': 1, 'type': transaction_type})
+    return status, (1 if transaction_type == 'IN' else -1) if status == 201 else 0
+
+
+def _op_form(transaction_type, reason):
+    def op(session, product, rng):
+        quantity = rng.randint(1, 5)
+        status = session.post_form(reverse('stock_transaction'), {
+            'product': product.pk, 'transaction_type': transaction_type, 'quantity': quantity, 'reason': reason,
+        })
+        # The view redirects after a successful save
+        return status, (quantity if transaction_type == 'IN' else -quantity) if status == 302 else 0
+    return op
+
+
+def op_list(session, product, rng):
+    return session.get(reverse('transactions_list'), {'product': product.pk}), 0
+
+
+def op_export(session, product, rng):
+    return session.get(reverse('export_transactions'), {'start_date': timezone.localdate().isoformat()}), 0
+
+
+OPERATIONS = {
+    'scan': op_scan,
+    'in': _op_form('IN', 'purchase'),
+    'out': _op_form('OUT', 'sale'),
+    'list': op_list,
+    'export': op_export,
+}
+
+
+class Command(BaseCommand):
+    help = "Load-test the stock transaction path with concurrent simulated users and check ledger consistency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Concurrent simulated users')
+        parser.add_argument('--operations', type=int, default=50, help='Operations per user')
+        parser.add_argument('--duration', type=float, default=None,
+                            help='Run for this many seconds instead of a fixed number of operations')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Weighted operation mix (default: {DEFAULT_MIX})')
+        parser.add_argument('--products', type=int, default=20,
+                            help='Size of the product pool; smaller means more contention')
+        parser.add_argument('--url', default=None, help='Send HTTP requests to a running server at this base URL')
+        parser.add_argument('--username', default=None, help='User to act as (default: first superuser)')
+        parser.add_argument('--password', default=None, help='Password for --url mode')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        user = self._get_user(options['username'])
+        if options['url'] and not options['password']:
+            raise CommandError("--url needs --password to log in")
+
+        products = list(Product.objects.filter(is_active=True).order_by('?')[:options['products']])
+        if not products:
+            raise CommandError("No active products to load-test with.")
+        product_ids = [product.pk for product in products]
+        start_id = StockTransaction.objects.aggregate(last=Max('id'))['last'] or 0
+        stock_before = self._stock(product_ids)
+
+        def make_session():
+            if options['url']:
+                return HttpSession(options['url'], user.username, options['password'])
+            return TestClientSession(user)
+
+        names, weights = zip(*mix.items())
+        results = defaultdict(list)          # operation -> latencies of successes
+        errors = defaultdict(lambda: defaultdict(int))  # operation -> error kind -> count
+        expected = defaultdict(int)          # product id -> net quantity written
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration'] if options['duration'] else None
+        seed = options['seed'] if options['seed'] is not None else random.randrange(1 << 30)
+
+        def worker(index):
+            rng = random.Random(seed + index)
+            session = make_session()
+            try:
+                done = 0
+                while (time.perf_counter() < deadline) if deadline else done < options['operations']:
+                    done += 1
+                    name = rng.choices(names, weights)[0]
+                    product = rng.choice(products)
+                    started = time.perf_counter()
+                    try:
+                        status, delta = OPERATIONS[name](session, product, rng)
+                    except Exception as exc:
+                        message = str(exc).lower()
+                        kind = 'lock' if any(fragment in message for fragment in LOCK_ERRORS) else type(exc).__name__
+                        with lock:
+                            errors[name][kind] += 1
+                        continue
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        if status >= 400:
+                            errors[name][f'HTTP {status}'] += 1
+                        else:
+                            results[name].append(elapsed)
+                            if delta:
+                                expected[product.pk] += delta
+            finally:
+                session.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['users'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self._report(options, results, errors, elapsed)
+        self._check(product_ids, start_id, stock_before, expected)
+
+    def _get_user(self, username):
+        users = User.objects.all()
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to run the load test as; pass --username")
+        return user
+
+    @staticmethod
+    def _stock(product_ids):
+        return dict(
+            StockBalance.objects.filter(product_id__in=product_ids).values('product_id')
+            .annotate(total=Sum('quantity')).values_list('product_id', 'total')
+        )
+
+    def _report(self, options, results, errors, elapsed):
+        target = options['url'] or 'test client'
+        self.stdout.write(f"{options['users']} users against {target}, {elapsed:.1f}s\n")
+        self.stdout.write(f"{'operation':<10}{'ok':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        all_latencies = []
+        for name in OPERATIONS:
+            latencies = results.get(name, [])
+            failed = sum(errors[name].values()) if name in errors else 0
+            if not latencies and not failed:
+                continue
+            all_latencies.extend(latencies)
+            row = f"{name:<10}{len(latencies):>7}{failed:>8}{len(latencies) / elapsed:>9.1f}"
+            if latencies:
+                row += ''.join(f"{percentile(latencies, p) * 1000:>9.1f}" for p in (50, 95, 99))
+            self.stdout.write(row)
+        if all_latencies:
+            self.stdout.write(
+                f"{'total':<10}{len(all_latencies):>7}{sum(sum(kinds.values()) for kinds in errors.values()):>8}"
+                f"{len(all_latencies) / elapsed:>9.1f}"
+                + ''.join(f"{percentile(all_latencies, p) * 1000:>9.1f}" for p in (50, 95, 99))
+            )
+            self.stdout.write(f"mean latency {statistics.mean(all_latencies) * 1000:.1f} ms")
+
+        lock_errors = sum(kinds.get('lock', 0) for kinds in errors.values())
+        for name, kinds in errors.items():
+            for kind, count in kinds.items():
+                self.stdout.write(self.style.WARNING(f"  {name}: {count} x {kind}"))
+        self.stdout.write(f"lock errors: {lock_errors}\n")
+
+    def _check(self, product_ids, start_id, stock_before, expected):
+        """Ledger, balances and ``balance_after`` must agree for the pool."""
+        problems = 0
+        stock_after = self._stock(product_ids)
+
+        # 1. Every acknowledged write landed exactly once
+        for product_id in product_ids:
+            change = stock_after.get(product_id, 0) - stock_before.get(product_id, 0)
+            if change != expected.get(product_id, 0):
+                problems += 1
+                self.stderr.write(
+                    f"product {product_id}: stock moved by {change}, acknowledged writes add up to "
+                    f"{expected.get(product_id, 0)}"
+                )
+
+        # 2. Balances equal the ledger
+        ledger = dict(
+            StockTransaction.objects.filter(product_id__in=product_ids).values('product_id').annotate(
+                total=Sum('quantity', filter=Q(transaction_type='IN'), default=0)
+                - Sum('quantity', filter=Q(transaction_type='OUT'), default=0)
+            ).values_list('product_id', 'total')
+        )
+        for product_id in product_ids:
+            if ledger.get(product_id, 0) != stock_after.get(product_id, 0):
+                problems += 1
+                self.stderr.write(
+                    f"product {product_id}: ledger sums to {ledger.get(product_id, 0)}, "
+                    f"balances hold {stock_after.get(product_id, 0)}"
+                )
+
+        # 3. The running balance of the new rows is an unbroken chain
+        rows = StockTransaction.objects.filter(product_id__in=product_ids, id__gt=start_id).order_by(
+            'product_id', 'created_at', 'id'
+        ).values_list('product_id', 'transaction_type', 'quantity', 'balance_after')
+        previous = {}
+        for product_id, transaction_type, quantity, balance_after in rows.iterator():
+            opening = previous.get(product_id, stock_before.get(product_id, 0))
+            signed = quantity if transaction_type == 'IN' else -quantity
+            if balance_after != opening + signed:
+                problems += 1
+                self.stderr.write(f"product {product_id}: balance_after {balance_after}, expected {opening + signed}")
+            previous[product_id] = balance_after if balance_after is not None else opening + signed
+
+        if problems:
+            self.stdout.write(self.style.ERROR(f"Consistency checks: {problems} problem(s)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Consistency checks passed for {len(product_ids)} products "
+                f"({len(expected)} written to)."
+            ))
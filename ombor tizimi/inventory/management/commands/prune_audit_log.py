@@ -0,0 +1,26 @@
+"""Archive and delete AuditLog entries past their retention period."""
+from django.core.management.base import BaseCommand
+
+from inventory.retention import archive_expired, archive_dir, retention_policy
+
+
+class Command(BaseCommand):
+    help = "Move expired audit log entries to compressed JSONL archives and delete them from the table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be archived')
+
+    def handle(self, *args, **options):
+        policy = retention_policy()
+        results = archive_expired(batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        for action, days in sorted(policy.items()):
+            if days is None:
+                self.stdout.write(f"{action:<8} kept forever")
+            else:
+                self.stdout.write(f"{action:<8} {verb.lower()} {results.get(action, 0)} entries older than {days} days")
+
+        total = sum(results.values())
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} entries to {archive_dir()}"))
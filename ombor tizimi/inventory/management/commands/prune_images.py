@@ -0,0 +1,42 @@
+"""Delete product images no product uses any more (run from cron).
+
+With ``--adopt``, images uploaded before content-addressed storage are
+first moved into it, so identical files shared by many products collapse
+into one copy.
+"""
+from django.core.management.base import BaseCommand
+
+from inventory.images import adopt_existing, prune_unreferenced, usage
+
+
+def megabytes(size):
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = "Delete unreferenced product images and report how much storage deduplication saves."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=1,
+                            help='Keep unreferenced images younger than this (uploads still being saved)')
+        parser.add_argument('--adopt', action='store_true',
+                            help='First move images stored under their upload names into the content store')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be done')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if options['adopt']:
+            moved, removed = adopt_existing(dry_run=dry_run)
+            verb = 'Would move' if dry_run else 'Moved'
+            self.stdout.write(f"{verb} {moved} product images into the content store ({removed} original files removed)")
+
+        count, freed = prune_unreferenced(grace_seconds=options['grace_hours'] * 3600, dry_run=dry_run)
+        verb = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(f"{verb} {count} unreferenced images ({megabytes(freed)})")
+
+        totals = usage()
+        saved = totals['referenced_bytes'] - totals['stored_bytes']
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {megabytes(totals['stored_bytes'])} for {megabytes(totals['referenced_bytes'])} "
+            f"of product images ({megabytes(max(saved, 0))} saved by deduplication)"
+        ))
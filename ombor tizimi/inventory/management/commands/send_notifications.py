@@ -0,0 +1,19 @@
+"""Collect and send batched low-stock digests; run from cron."""
+from django.core.management.base import BaseCommand
+
+from inventory.notifications import collect_digests, send_pending
+
+
+class Command(BaseCommand):
+    help = "Queue low-stock digests for each subscription and send the ones that are due."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-collect', action='store_true', help='Only send/retry queued digests')
+        parser.add_argument('--limit', type=int, default=100, help='Maximum deliveries to attempt this run')
+
+    def handle(self, *args, **options):
+        if not options['no_collect']:
+            queued = collect_digests()
+            self.stdout.write(f"Queued {queued} digest(s).")
+        sent, failed = send_pending(limit=options['limit'])
+        self.stdout.write(f"Sent {sent}, failed {failed} (failures are retried with backoff).")
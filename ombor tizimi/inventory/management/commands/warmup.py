@@ -0,0 +1,16 @@
+"""Run the start-up warm-up steps and show how long each one takes."""
+from django.core.management.base import BaseCommand
+
+from config.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Import views, resolve URLs and compile templates, printing the time per step."
+
+    def handle(self, *args, **options):
+        timings = warm_up()
+        self.stdout.write(f"{'step':<12}{'items':>8}{'ms':>10}")
+        for step, (items, seconds) in timings.items():
+            self.stdout.write(f"{step:<12}{items:>8}{seconds * 1000:>10.1f}")
+        total = sum(seconds for _, seconds in timings.values())
+        self.stdout.write(f"{'total':<12}{'':>8}{total * 1000:>10.1f}")
@@ -0,0 +1,105 @@
+# Generated by Django 4.2.8 on 2026-10-19 16:22
+
+from django.db import migrations, models
+from django.db.models import Q, Sum
+import django.db.models.deletion
+
+
+def backfill_default_location(apps, schema_editor):
+    """Move existing transactions to the default location and build balances."""
+    Location = apps.get_model('inventory', 'Location')
+    StockTransaction = apps.get_model('inventory', 'StockTransaction')
+    StockBalance = apps.get_model('inventory', 'StockBalance')
+
+    if not StockTransaction.objects.exists():
+        return
+
+    location, _ = Location.objects.get_or_create(
+        code='MAIN',
+        defaults={'name': 'Main Warehouse', 'is_default': True}
+    )
+    StockTransaction.objects.filter(location__isnull=True).update(location=location)
+
+    totals = StockTransaction.objects.values('product_id', 'location_id').annotate(
+        stock_in=Sum('quantity', filter=Q(transaction_type='IN')),
+        stock_out=Sum('quantity', filter=Q(transaction_type='OUT')),
+    )
+    StockBalance.objects.bulk_create([
+        StockBalance(
+            product_id=row['product_id'],
+            location_id=row['location_id'],
+            quantity=(row['stock_in'] or 0) - (row['stock_out'] or 0),
+        )
+        for row in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('address', models.TextField(blank=True, null=True)),
+                ('is_default', models.BooleanField(default=False, help_text='Used when a transaction has no location')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='stocktransaction',
+            name='transfer_group',
+            field=models.UUIDField(blank=True, editable=False, help_text='Pairs transfer out/in rows', null=True),
+        ),
+        migrations.AddField(
+            model_name='stocktransaction',
+            name='location',
+            field=models.ForeignKey(blank=True, help_text='Defaults to the default location', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='transactions', to='inventory.location'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['location', 'created_at'], name='inventory_s_locatio_a25597_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['transfer_group'], name='inventory_s_transfe_c556aa_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockbalance',
+            name='location',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='inventory.location'),
+        ),
+        migrations.AddField(
+            model_name='stockbalance',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='inventory.product'),
+        ),
+        migrations.AddIndex(
+            model_name='stockbalance',
+            index=models.Index(fields=['product', 'location'], name='inventory_s_product_51a11c_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockbalance',
+            constraint=models.UniqueConstraint(fields=('location', 'product'), name='unique_balance_per_location'),
+        ),
+        migrations.RunPython(backfill_default_location, migrations.RunPython.noop),
+    ]
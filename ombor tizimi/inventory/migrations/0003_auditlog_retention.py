@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-19 16:30
+
+from django.db import migrations, models
+from django.db.models.functions import Length, Substr
+
+
+def truncate_user_agents(apps, schema_editor):
+    """Shorten stored user agents so they fit the new 255 character column."""
+    AuditLog = apps.get_model('inventory', 'AuditLog')
+    AuditLog.objects.annotate(
+        user_agent_length=Length('user_agent')
+    ).filter(user_agent_length__gt=255).update(user_agent=Substr('user_agent', 1, 255))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_locations_and_balances'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='inventory_a_action_d6359b_idx',
+        ),
+        migrations.RunPython(truncate_user_agents, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='user_agent',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', 'timestamp'], name='inventory_a_action_92f4bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['model_name', 'object_id', 'timestamp'], name='inventory_a_model_n_c4bde3_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.8 on 2026-10-19 16:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0003_auditlog_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockTake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('open', 'Counting'), ('posted', 'Posted'), ('cancelled', 'Cancelled')], default='open', max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('posted_at', models.DateTimeField(blank=True, null=True)),
+                ('category', models.ForeignKey(blank=True, help_text='Limit the count to one category', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_takes', to='inventory.category')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_takes', to=settings.AUTH_USER_MODEL)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_takes', to='inventory.location')),
+                ('posted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posted_stock_takes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockTakeLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('system_quantity', models.IntegerField()),
+                ('counted_quantity', models.IntegerField(blank=True, null=True)),
+                ('counted_at', models.DateTimeField(blank=True, null=True)),
+                ('counted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_take_lines', to='inventory.product')),
+                ('stock_take', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.stocktake')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stocktakeline',
+            constraint=models.UniqueConstraint(fields=('stock_take', 'product'), name='unique_product_per_stock_take'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-19 16:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stock_takes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name'], name='inventory_p_name_f6a6a1_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.8 on 2026-10-19 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_product_name_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['updated_at', 'id'], name='inventory_c_updated_71905d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['updated_at', 'id'], name='inventory_l_updated_10e2aa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at', 'id'], name='inventory_p_updated_af11c4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockbalance',
+            index=models.Index(fields=['updated_at', 'id'], name='inventory_s_updated_0fa095_idx'),
+        ),
+    ]
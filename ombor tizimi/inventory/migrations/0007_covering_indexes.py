@@ -0,0 +1,41 @@
+# Generated by Django 4.2.8 on 2026-10-19 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='inventory_p_is_acti_47a270_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='stocktransaction',
+            name='inventory_s_transac_f888de_idx',
+        ),
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['-created_at'], name='alert_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['product'], name='alert_active_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name'], name='product_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['product', 'transaction_type', 'quantity'], name='txn_product_type_qty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['transaction_type', 'created_at', 'quantity'], name='txn_type_created_qty_idx'),
+        ),
+    ]
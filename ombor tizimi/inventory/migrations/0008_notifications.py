@@ -0,0 +1,82 @@
+# Generated by Django 4.2.8 on 2026-10-19 16:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('inventory', '0007_covering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_start', models.DateTimeField()),
+                ('window_end', models.DateTimeField()),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Notification deliveries',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('webhook', 'Webhook')], default='email', max_length=20)),
+                ('target', models.CharField(blank=True, help_text='Email address or webhook URL (blank = your account email)', max_length=500)),
+                ('include_resolved', models.BooleanField(default=True, help_text='Also report alerts that were resolved')),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_digest_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['user', 'channel'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(fields=['created_at'], name='inventory_l_created_684410_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(fields=['resolved_at'], name='inventory_l_resolve_0a3033_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationsubscription',
+            name='categories',
+            field=models.ManyToManyField(blank=True, help_text='Leave empty to hear about all categories', related_name='notification_subscriptions', to='inventory.category'),
+        ),
+        migrations.AddField(
+            model_name='notificationsubscription',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_subscriptions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='subscription',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='inventory.notificationsubscription'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='inventory_n_status_97eba9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationdelivery',
+            constraint=models.UniqueConstraint(fields=('subscription', 'window_end'), name='unique_delivery_window'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-19 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_notifications'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocktransaction',
+            name='balance_after',
+            field=models.IntegerField(blank=True, editable=False, help_text='Product stock across all locations after this movement', null=True),
+        ),
+    ]
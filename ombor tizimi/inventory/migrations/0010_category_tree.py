@@ -0,0 +1,39 @@
+# Generated by Django 4.2.8 on 2026-10-19 17:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_paths(apps, schema_editor):
+    """Existing categories become roots."""
+    Category = apps.get_model('inventory', 'Category')
+    categories = list(Category.objects.only('id'))
+    for category in categories:
+        category.path = f'{category.id:08d}/'
+    Category.objects.bulk_update(categories, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_stocktransaction_balance_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='inventory.category'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,208 @@
+# Generated by Django 4.2.8 on 2026-10-19 17:36
+
+import config.tenancy
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_tenants'),
+        ('inventory', '0010_category_tree'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='inventory_a_action_92f4bf_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='inventory_a_model_n_c4bde3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='category',
+            name='inventory_c_updated_71905d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='location',
+            name='inventory_l_updated_10e2aa_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='lowstockalert',
+            name='alert_active_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='lowstockalert',
+            name='inventory_l_created_684410_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='lowstockalert',
+            name='inventory_l_resolve_0a3033_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='inventory_p_sku_f85905_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='inventory_p_name_f6a6a1_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='inventory_p_updated_af11c4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_active_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='stockbalance',
+            name='inventory_s_updated_0fa095_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='stocktransaction',
+            name='inventory_s_created_ff5dbb_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='stocktransaction',
+            name='txn_type_created_qty_idx',
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AddField(
+            model_name='lowstockalert',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AddField(
+            model_name='notificationsubscription',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AddField(
+            model_name='stockbalance',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AddField(
+            model_name='stocktake',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AddField(
+            model_name='stocktransaction',
+            name='tenant',
+            field=models.ForeignKey(default=config.tenancy.tenant_for_new_rows, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='location',
+            name='code',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(max_length=50, verbose_name='SKU/Code'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['tenant', 'timestamp'], name='inventory_a_tenant__4e73fc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['tenant', 'action', 'timestamp'], name='inventory_a_tenant__655661_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['tenant', 'model_name', 'object_id', 'timestamp'], name='inventory_a_tenant__8c8e30_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='inventory_c_tenant__393df2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='inventory_l_tenant__988cb7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['tenant', '-created_at'], name='alert_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(fields=['tenant', 'created_at'], name='inventory_l_tenant__bfd4b9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(fields=['tenant', 'resolved_at'], name='inventory_l_tenant__29bfce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tenant', 'name'], name='inventory_p_tenant__6738c2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['tenant', 'name'], name='product_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tenant', 'is_active', 'minimum_stock'], name='product_active_min_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='inventory_p_tenant__204356_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockbalance',
+            index=models.Index(fields=['tenant', 'updated_at', 'id'], name='inventory_s_tenant__afa8d5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['tenant', 'transaction_type', 'created_at', 'quantity'], name='txn_type_created_qty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['tenant', 'product', 'quantity'], name='txn_tenant_product_qty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['tenant', 'created_at'], name='inventory_s_tenant__38fc1a_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(fields=('tenant', 'name'), name='unique_category_name_per_tenant'),
+        ),
+        migrations.AddConstraint(
+            model_name='location',
+            constraint=models.UniqueConstraint(fields=('tenant', 'code'), name='unique_location_code_per_tenant'),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('tenant', 'sku'), name='unique_sku_per_tenant'),
+        ),
+    ]
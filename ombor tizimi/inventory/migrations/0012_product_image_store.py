@@ -0,0 +1,32 @@
+# Generated by Django 4.2.8 on 2026-10-19 17:48
+
+from django.db import migrations, models
+import inventory.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_tenant_scoping'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=inventory.models.product_image_storage, upload_to='products/'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.8 on 2026-10-19 18:12
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_product_image_store'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(models.F('tenant'), django.db.models.functions.text.Lower('name'), name='category_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.F('tenant'), django.db.models.functions.text.Lower('sku'), name='product_sku_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.F('tenant'), django.db.models.functions.text.Lower('name'), name='product_name_prefix_idx'),
+        ),
+    ]
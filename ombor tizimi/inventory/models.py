@@ -1,26 +1,238 @@
 """Models for Inventory Management System."""
-from django.db import models
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
+from django.db import connections, models, router, transaction, IntegrityError
 from django.contrib.auth.models import User
-from django.db.models import Q, Sum
+from django.db.models import Q, Sum, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Concat, Lower, Substr
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
 from django.utils import timezone
 
+from accounts.models import TenantModel, TenantQuerySet
+
+
+def prefix_search(queryset, field, term, limit):
+    """First ``limit`` rows of ``queryset`` whose ``field`` starts with ``term``, ignoring case.
+
+    ``istartswith`` compiles to ``LIKE``/``UPPER(...) LIKE``, which a plain
+    index on the column cannot serve. This is a range on ``Lower(field)``,
+    ordered by it, so an index on ``(tenant, Lower(field))`` (the
+    ``*_prefix_idx`` indexes) reads just the ``limit`` rows it returns. Both
+    sides are lowered in SQL so they fold case the same way.
+    """
+    key = Lower(field)
+    return queryset.filter(
+        GreaterThanOrEqual(key, Lower(models.Value(term))),
+        LessThan(key, Lower(models.Value(term + '\U0010ffff'))),
+    ).order_by(key)[:limit]
+
+
+class CategoryQuerySet(TenantQuerySet):
+    """Tree queries on the materialized ``path``."""
+
+    def subtree(self, category):
+        """``category`` and all of its descendants (a prefix match on the indexed path)."""
+        return self.filter(path__startswith=category.path)
+
+    def descendants(self, category):
+        return self.subtree(category).exclude(pk=category.pk)
+
+    def ancestors(self, category):
+        """Ancestors of ``category``, root first; their ids are read off its path."""
+        return self.filter(pk__in=category.ancestor_ids).order_by('depth')
+
+    def search(self, term, limit):
+        """First ``limit`` categories whose name starts with ``term``, ignoring case."""
+        return list(prefix_search(self, 'name', term, limit))
+
+
+class Category(TenantModel):
+    """Product Category model.
 
-class Category(models.Model):
-    """Product Category model."""
-    name = models.CharField(max_length=100, unique=True)
+    Categories form a tree. Each row stores its materialized ``path``: the
+    zero-padded ids of its ancestors and itself, e.g. ``00000001/00000005/``.
+    Everything under a category is then one prefix match on an indexed
+    column, and the path sorts the tree depth first.
+    """
+    PATH_STEP = 8
+
+    name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='children'
+    )
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'name'], name='unique_category_name_per_tenant'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at', 'id']),
+            models.Index(F('tenant'), Lower('name'), name='category_name_prefix_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def path_segment(cls, pk):
+        return f'{pk:0{cls.PATH_STEP}d}/'
+
+    @property
+    def ancestor_ids(self):
+        return [int(segment) for segment in self.path.split('/')[:-2]]
+
+    def clean(self):
+        if self.parent_id and self.pk and self.parent.path.startswith(self.path or self.path_segment(self.pk)):
+            raise ValidationError({'parent': 'A category cannot be moved under itself or one of its subcategories.'})
+
+    def save(self, *args, **kwargs):
+        """Save and keep the materialized path of this category and its subtree current.
+
+        Moving a category rewrites the paths of everything below it with a
+        single UPDATE.
+        """
+        with transaction.atomic(using=router.db_for_write(Category)):
+            parent = Category.objects.filter(pk=self.parent_id).only('path', 'depth').first() if self.parent_id else None
+            if parent is not None and self.pk and parent.path.startswith(self.path or self.path_segment(self.pk)):
+                raise ValueError("A category cannot be moved under itself or one of its subcategories.")
+            super().save(*args, **kwargs)
+
+            path = (parent.path if parent else '') + self.path_segment(self.pk)
+            depth = parent.depth + 1 if parent else 0
+            old_path, old_depth = Category.objects.filter(pk=self.pk).values_list('path', 'depth').get()
+            if path == old_path:
+                return
+            if old_path:
+                # Descendants keep their own suffix under the new prefix
+                Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                    path=Concat(models.Value(path), Substr('path', len(old_path) + 1)),
+                    depth=F('depth') + (depth - old_depth),
+                )
+            Category.objects.filter(pk=self.pk).update(path=path, depth=depth)
+            self.path, self.depth = path, depth
+
+
+class Location(TenantModel):
+    """Warehouse or other stock-holding location."""
+    code = models.CharField(max_length=20)
+    name = models.CharField(max_length=100)
+    address = models.TextField(blank=True, null=True)
+    is_default = models.BooleanField(default=False, help_text="Used when a transaction has no location")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'code'], name='unique_location_code_per_tenant'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'updated_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.code})"
+
+    @classmethod
+    def get_default(cls, tenant_id=None):
+        """Return the default location of a tenant (default: the current one), creating it on first use."""
+        locations = cls.objects.all()
+        defaults = {'name': 'Main Warehouse', 'is_default': True}
+        if tenant_id:
+            locations = locations.scoped(tenant_id)
+            defaults['tenant_id'] = tenant_id
+        location = locations.filter(is_default=True).first()
+        if location is None:
+            location, _ = locations.get_or_create(code='MAIN', defaults=defaults)
+        return location
+
+
+class ProductQuerySet(TenantQuerySet):
+    """Query helpers for products."""
+
+    def with_stock(self, location=None):
+        """Annotate ``stock_level`` from stock balances in a single subquery.
+
+        When ``location`` is given only that location's balance row is read.
+        """
+        balances = StockBalance.objects.filter(product=OuterRef('pk'))
+        if location is not None:
+            balances = balances.filter(location=location)
+        total = balances.values('product').annotate(total=Sum('quantity')).values('total')
+        return self.annotate(
+            stock_level=Coalesce(Subquery(total, output_field=models.IntegerField()), 0)
+        )
+
+    def at_location(self, location):
+        """Products that have a balance row at the given location."""
+        return self.filter(balances__location=location)
+
+    def search(self, term, limit):
+        """Up to ``limit`` products whose SKU or name starts with ``term``, by name.
+
+        Each column is searched through its own index, ``limit`` rows at
+        most, so the cost does not grow with the catalog.
+        """
+        found = {product.pk: product for product in prefix_search(self, 'sku', term, limit)}
+        found.update((product.pk, product) for product in prefix_search(self, 'name', term, limit))
+        return sorted(found.values(), key=lambda product: (product.name.lower(), product.pk))[:limit]
+
+    def in_category(self, category):
+        """Products in ``category`` or any of its subcategories.
 
-class Product(models.Model):
+        The subtree is an ``IN`` subquery rather than a join so the planner
+        starts from the matching category ids and reads products through
+        the ``category`` index.
+        """
+        return self.filter(category__in=Category.objects.subtree(category).values('pk'))
+
+    def lock(self):
+        """Lock the selected product rows (in id order) until the transaction ends.
+
+        Ledger writers take this lock before touching balances, so rows for
+        one product are written one at a time and ``balance_after`` follows
+        the order they are committed in. Backends without row locks (SQLite)
+        skip it: there the writer's first UPDATE takes the database write
+        lock, and reading first would turn waiting for it into an immediate
+        "database is locked" error.
+        """
+        if not connections[router.db_for_write(self.model)].features.has_select_for_update:
+            return
+        list(self.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+    def with_stock_status(self, status):
+        """Filter an annotated queryset by stock status in SQL."""
+        if status == 'low_stock':
+            return self.filter(stock_level__lt=F('minimum_stock'))
+        if status == 'out_of_stock':
+            return self.filter(stock_level__lte=0)
+        if status == 'in_stock':
+            return self.filter(stock_level__gt=0, stock_level__gte=F('minimum_stock'))
+        return self
+
+
+def product_image_storage():
+    """Storage of product images (``STORAGES['product_images']``, see ``inventory.images``)."""
+    return storages['product_images']
+
+
+class Product(TenantModel):
     """Product model for inventory tracking."""
     
     UNIT_CHOICES = [
@@ -32,7 +244,7 @@ class Product(models.Model):
         ('pack', 'Pack'),
     ]
 
-    sku = models.CharField(max_length=50, unique=True, verbose_name="SKU/Code")
+    sku = models.CharField(max_length=50, verbose_name="SKU/Code")
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
@@ -41,19 +253,32 @@ class Product(models.Model):
     reorder_quantity = models.IntegerField(default=50, help_text="Suggested quantity to reorder")
     
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
-    image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image = models.ImageField(upload_to='products/', storage=product_image_storage, blank=True, null=True)
     
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_products')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ['name']
+        constraints = [
+            # Also the index behind SKU lookups
+            models.UniqueConstraint(fields=['tenant', 'sku'], name='unique_sku_per_tenant'),
+        ]
         indexes = [
-            models.Index(fields=['sku']),
+            models.Index(fields=['tenant', 'name']),
             models.Index(fields=['category']),
-            models.Index(fields=['is_active']),
+            # Lists, pickers and counts only look at active products
+            models.Index(fields=['tenant', 'name'], condition=Q(is_active=True), name='product_active_name_idx'),
+            # Covering: dashboard active and low-stock counts
+            models.Index(fields=['tenant', 'is_active', 'minimum_stock'], name='product_active_min_stock_idx'),
+            models.Index(fields=['tenant', 'updated_at', 'id']),
+            # Autocomplete prefix searches (see ``prefix_search``)
+            models.Index(F('tenant'), Lower('sku'), name='product_sku_prefix_idx'),
+            models.Index(F('tenant'), Lower('name'), name='product_name_prefix_idx'),
         ]
 
     def __str__(self):
@@ -61,18 +286,35 @@ class Product(models.Model):
 
     @property
     def current_stock(self):
-        """Calculate current stock from transactions."""
-        stock_in = StockTransaction.objects.filter(
-            product=self,
-            transaction_type='IN'
-        ).aggregate(total=Sum('quantity'))['total'] or 0
+        """Current stock across all locations.
 
-        stock_out = StockTransaction.objects.filter(
-            product=self,
-            transaction_type='OUT'
-        ).aggregate(total=Sum('quantity'))['total'] or 0
+        Uses the ``stock_level`` annotation from ``with_stock()`` when present,
+        otherwise sums the per-location balances.
+        """
+        annotated = getattr(self, 'stock_level', None)
+        if annotated is not None:
+            return annotated
+        return self.balances.aggregate(total=Sum('quantity'))['total'] or 0
 
-        return stock_in - stock_out
+    def stock_as_of(self, moment):
+        """Stock across all locations right after the last movement up to ``moment``."""
+        last = (
+            self.transactions.filter(created_at__lte=moment)
+            .order_by('-created_at', '-id').values_list('balance_after', flat=True).first()
+        )
+        if last is not None:
+            return last
+        # No movements yet, or the ledger has not been backfilled
+        totals = self.transactions.filter(created_at__lte=moment).aggregate(
+            stock_in=Sum('quantity', filter=Q(transaction_type='IN')),
+            stock_out=Sum('quantity', filter=Q(transaction_type='OUT')),
+        )
+        return (totals['stock_in'] or 0) - (totals['stock_out'] or 0)
+
+    def stock_at(self, location):
+        """Current stock at a single location."""
+        balance = self.balances.filter(location=location).values_list('quantity', flat=True).first()
+        return balance or 0
 
     @property
     def is_low_stock(self):
@@ -89,8 +331,29 @@ class Product(models.Model):
         return 'IN_STOCK'
 
 
-class StockTransaction(models.Model):
+class ImageBlob(models.Model):
+    """A product image stored once under its content hash.
+
+    Shared by every product (of any tenant) with the same image;
+    ``references`` counts them. Unreferenced images are deleted by
+    ``manage.py prune_images``.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
+
+
+class StockTransaction(TenantModel):
     """Model to track all stock movements."""
+
+    tenant_parent = 'product'
     
     TRANSACTION_TYPE_CHOICES = [
         ('IN', 'Stock In'),
@@ -115,12 +378,21 @@ class StockTransaction(models.Model):
     ]
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='transactions')
+    location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, related_name='transactions',
+        null=True, blank=True, help_text="Defaults to the default location"
+    )
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPE_CHOICES)
     quantity = models.PositiveIntegerField()
     reason = models.CharField(max_length=50, choices=TRANSACTION_REASON_CHOICES)
     
     reference_no = models.CharField(max_length=100, blank=True, null=True, help_text="Invoice/PO number")
     notes = models.TextField(blank=True, null=True)
+    transfer_group = models.UUIDField(null=True, blank=True, editable=False, help_text="Pairs transfer out/in rows")
+    balance_after = models.IntegerField(
+        null=True, blank=True, editable=False,
+        help_text="Product stock across all locations after this movement"
+    )
     
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='stock_transactions')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -129,22 +401,197 @@ class StockTransaction(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['product', 'created_at']),
-            models.Index(fields=['transaction_type']),
-            models.Index(fields=['created_at']),
+            # Covering: per-product IN/OUT sums read only the index
+            models.Index(fields=['product', 'transaction_type', 'quantity'], name='txn_product_type_qty_idx'),
+            # Covering: dashboard IN/OUT totals for a date range
+            models.Index(fields=['tenant', 'transaction_type', 'created_at', 'quantity'], name='txn_type_created_qty_idx'),
+            # Covering: dashboard top products reads only the tenant's slice
+            models.Index(fields=['tenant', 'product', 'quantity'], name='txn_tenant_product_qty_idx'),
+            models.Index(fields=['tenant', 'created_at']),
+            models.Index(fields=['location', 'created_at']),
+            models.Index(fields=['transfer_group']),
         ]
 
     def __str__(self):
         return f"{self.product.sku} - {self.transaction_type} ({self.quantity}) on {self.created_at.date()}"
 
+    @property
+    def signed_quantity(self):
+        """Quantity with sign applied: positive for IN, negative for OUT."""
+        return self.quantity if self.transaction_type == 'IN' else -self.quantity
+
     def save(self, *args, **kwargs):
-        """Validate before saving."""
+        """Validate, save and keep the per-location balance in step."""
         if self.quantity <= 0:
             raise ValueError("Quantity must be positive")
-        super().save(*args, **kwargs)
+        if self.location_id is None:
+            self.location = Location.get_default(self.product.tenant_id)
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding and self.pk:
+                previous = StockTransaction.objects.filter(pk=self.pk).values(
+                    'product_id', 'location_id', 'transaction_type', 'quantity', 'created_at'
+                ).first()
+            product_ids = {self.product_id, previous['product_id']} if previous else {self.product_id}
+            Product.objects.filter(pk__in=product_ids).lock()
+            if previous:
+                delta = previous['quantity'] if previous['transaction_type'] == 'IN' else -previous['quantity']
+                StockBalance.adjust(previous['product_id'], previous['location_id'], -delta)
+            # Balance first, so post_save receivers (alerts, live events)
+            # already see the stock level this row produces
+            StockBalance.adjust(self.product_id, self.location_id, self.signed_quantity)
+            if previous is None:
+                # One read gives the receivers and the scan endpoint both
+                # the product total and this location's quantity
+                balances = dict(
+                    StockBalance.objects.filter(product_id=self.product_id).values_list('location_id', 'quantity')
+                )
+                self.balance_after = sum(balances.values())
+                self.location_balance = balances.get(self.location_id, 0)
+            super().save(*args, **kwargs)
+            if previous:
+                # An edited movement shifts the balance of every later row
+                since = (previous['created_at'], self.pk)
+                StockTransaction.rebuild_balances(self.product_id, since=since)
+                if previous['product_id'] != self.product_id:
+                    StockTransaction.rebuild_balances(previous['product_id'], since=since)
+
+    @classmethod
+    def rebuild_balances(cls, product_id, since=None, batch_size=1000):
+        """Recompute ``balance_after`` for one product's ledger in order.
+
+        With ``since=(created_at, id)`` only rows from that position on are
+        walked, starting from the balance of the row before it. Only rows
+        whose value changes are written. Call inside a transaction holding
+        the product lock. Returns the number of rows updated.
+        """
+        rows = cls.objects.filter(product_id=product_id).order_by('created_at', 'id')
+        balance = 0
+        if since is not None:
+            created_at, pk = since
+            after = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gte=pk)
+            opening = list(
+                rows.exclude(after).order_by('-created_at', '-id').values_list('balance_after', flat=True)[:1]
+            )
+            if opening and opening[0] is None:
+                # Earlier rows were never backfilled; walk the whole ledger
+                return cls.rebuild_balances(product_id, batch_size=batch_size)
+            balance = opening[0] if opening else 0
+            rows = rows.filter(after)
+
+        changed = []
+        updated = 0
+        for pk, transaction_type, quantity, stored in rows.values_list(
+            'id', 'transaction_type', 'quantity', 'balance_after'
+        ).iterator(chunk_size=batch_size):
+            balance += quantity if transaction_type == 'IN' else -quantity
+            if stored != balance:
+                changed.append(cls(pk=pk, balance_after=balance))
+            if len(changed) >= batch_size:
+                updated += cls.objects.bulk_update(changed, ['balance_after'])
+                changed = []
+        if changed:
+            updated += cls.objects.bulk_update(changed, ['balance_after'])
+        return updated
+
+    @classmethod
+    def transfer(cls, product, from_location, to_location, quantity, user=None, reference_no=None, notes=None):
+        """Move stock between locations as a paired, atomic OUT/IN.
+
+        Returns ``(transfer_out, transfer_in)``. Raises ``ValueError`` when the
+        source location does not hold enough stock.
+        """
+        if from_location == to_location:
+            raise ValueError("Source and destination locations must differ")
+
+        group = uuid.uuid4()
+        with transaction.atomic():
+            # Product before balance, the same order save() locks in
+            Product.objects.filter(pk=product.pk).lock()
+            available = StockBalance.objects.select_for_update().filter(
+                product=product, location=from_location
+            ).values_list('quantity', flat=True).first() or 0
+            if available < quantity:
+                raise ValueError(
+                    f"Only {available} {product.unit} of {product.sku} available at {from_location.code}"
+                )
+
+            common = {
+                'product': product,
+                'quantity': quantity,
+                'reference_no': reference_no,
+                'notes': notes,
+                'created_by': user,
+                'transfer_group': group,
+            }
+            transfer_out = cls.objects.create(
+                location=from_location, transaction_type='OUT', reason='transfer_out', **common
+            )
+            transfer_in = cls.objects.create(
+                location=to_location, transaction_type='IN', reason='transfer_in', **common
+            )
+        return transfer_out, transfer_in
+
+
+class StockBalance(TenantModel):
+    """Current quantity of a product at a location.
+
+    Maintained incrementally by ``StockTransaction.save()`` so stock lookups
+    read one row instead of summing the ledger.
+    """
+    tenant_parent = 'product'
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='balances')
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='balances')
+    quantity = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'product'], name='unique_balance_per_location'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'location']),
+            models.Index(fields=['tenant', 'updated_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.location_id}: {self.quantity}"
+
+    @classmethod
+    def adjust(cls, product_id, location_id, delta):
+        """Add ``delta`` to a balance row, creating the row if needed."""
+        if not delta:
+            return
+        now = timezone.now()
+        updated = cls.objects.filter(product_id=product_id, location_id=location_id).update(
+            quantity=F('quantity') + delta, updated_at=now
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(product_id=product_id, location_id=location_id, quantity=delta)
+        except IntegrityError:
+            # Another writer created the row first
+            cls.objects.filter(product_id=product_id, location_id=location_id).update(
+                quantity=F('quantity') + delta, updated_at=now
+            )
+
 
+class AuditLogQuerySet(TenantQuerySet):
+    """Query helpers for audit entries."""
 
-class AuditLog(models.Model):
+    def for_object(self, model_name, object_id):
+        """History of one object, newest first (served by the object index)."""
+        return self.filter(model_name=model_name, object_id=object_id).order_by('-timestamp', '-id')
+
+
+class AuditLog(TenantModel):
     """Model to track all system activities."""
+
+    USER_AGENT_MAX_LENGTH = 255
     
     ACTION_CHOICES = [
         ('create', 'Create'),
@@ -166,23 +613,35 @@ class AuditLog(models.Model):
     new_values = models.JSONField(null=True, blank=True)
     
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True)
+    user_agent = models.CharField(max_length=USER_AGENT_MAX_LENGTH, blank=True)
     
     timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
 
+    objects = AuditLogQuerySet.as_manager()
+
     class Meta:
         ordering = ['-timestamp']
         indexes = [
+            models.Index(fields=['tenant', 'timestamp']),
             models.Index(fields=['user', 'timestamp']),
-            models.Index(fields=['action']),
+            models.Index(fields=['tenant', 'action', 'timestamp']),
+            models.Index(fields=['tenant', 'model_name', 'object_id', 'timestamp']),
         ]
 
     def __str__(self):
         return f"{self.user} - {self.action} - {self.model_name} at {self.timestamp}"
 
+    def save(self, *args, **kwargs):
+        """Truncate the user agent so it always fits the column."""
+        if self.user_agent:
+            self.user_agent = self.user_agent[:self.USER_AGENT_MAX_LENGTH]
+        super().save(*args, **kwargs)
+
 
-class LowStockAlert(models.Model):
+class LowStockAlert(TenantModel):
     """Model to store low stock alert history."""
+
+    tenant_parent = 'product'
     
     STATUS_CHOICES = [
         ('active', 'Active'),
@@ -202,6 +661,362 @@ class LowStockAlert(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Only active alerts are listed and reconciled; resolved ones pile up
+            models.Index(fields=['tenant', '-created_at'], condition=Q(status='active'), name='alert_active_created_idx'),
+            models.Index(fields=['product'], condition=Q(status='active'), name='alert_active_product_idx'),
+            # Digest windows (see inventory.notifications)
+            models.Index(fields=['tenant', 'created_at']),
+            models.Index(fields=['tenant', 'resolved_at']),
+        ]
 
     def __str__(self):
         return f"Alert: {self.product.name} - Stock: {self.current_stock}"
+
+    @classmethod
+    def reconcile(cls, product_ids):
+        """Open or resolve alerts for many products in a few queries.
+
+        Bulk postings skip the per-transaction ``check_low_stock`` signal and
+        call this once instead. Returns ``(created, resolved)`` counts.
+        """
+        from . import events
+
+        product_ids = set(product_ids)
+        if not product_ids:
+            return 0, 0
+
+        products = list(
+            Product.objects.filter(id__in=product_ids).with_stock()
+            .only('id', 'tenant_id', 'name', 'sku', 'unit', 'minimum_stock')
+        )
+        alerted = set(cls.objects.filter(product_id__in=product_ids, status='active').values_list('product_id', flat=True))
+        low = [product for product in products if product.stock_level < product.minimum_stock]
+        low_ids = {product.id for product in low}
+
+        new_alerts = cls.objects.bulk_create([
+            cls(
+                tenant_id=product.tenant_id,
+                product=product,
+                current_stock=max(product.stock_level, 0),
+                minimum_stock=product.minimum_stock,
+                status='active',
+            )
+            for product in low if product.id not in alerted
+        ])
+        resolved_ids = alerted - low_ids
+        if resolved_ids:
+            cls.objects.filter(product_id__in=resolved_ids, status='active').update(
+                status='resolved', resolved_at=timezone.now()
+            )
+
+        for alert in new_alerts:
+            events.publish('alert', {
+                'action': 'created',
+                'id': alert.id,
+                'product_id': alert.product.id,
+                'product_name': alert.product.name,
+                'sku': alert.product.sku,
+                'unit': alert.product.unit,
+                'current_stock': alert.current_stock,
+                'minimum_stock': alert.minimum_stock,
+            }, alert.tenant_id)
+        tenants = {product.id: product.tenant_id for product in products}
+        for product_id in resolved_ids:
+            events.publish('alert', {'action': 'resolved', 'product_id': product_id}, tenants.get(product_id))
+
+        return len(new_alerts), len(resolved_ids)
+
+
+class NotificationSubscription(TenantModel):
+    """A user's subscription to low-stock digests on one channel."""
+
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('webhook', 'Webhook'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_subscriptions')
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, default='email')
+    target = models.CharField(
+        max_length=500, blank=True,
+        help_text="Email address or webhook URL (blank = your account email)",
+    )
+    categories = models.ManyToManyField(
+        Category, blank=True, related_name='notification_subscriptions',
+        help_text="Leave empty to hear about all categories",
+    )
+    include_resolved = models.BooleanField(default=True, help_text="Also report alerts that were resolved")
+    is_active = models.BooleanField(default=True)
+    # End of the last collected digest window
+    last_digest_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['user', 'channel']
+
+    def __str__(self):
+        return f"{self.user.username}: {self.get_channel_display()} {self.target}".strip()
+
+    @property
+    def recipient(self):
+        """Address or URL the digest goes to."""
+        if self.channel == 'email':
+            return self.target or self.user.email
+        return self.target
+
+
+class NotificationDelivery(models.Model):
+    """One digest for one subscription, retried until sent or given up."""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subscription = models.ForeignKey(NotificationSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'Notification deliveries'
+        constraints = [
+            # A window is collected once per subscription
+            models.UniqueConstraint(fields=['subscription', 'window_end'], name='unique_delivery_window'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Digest #{self.pk} to {self.subscription} ({self.status})"
+
+
+class StockTake(TenantModel):
+    """A physical count of one location (optionally one category and its subcategories).
+
+    Opening a stock take snapshots the system quantity of every product in
+    scope. Counters then record what they find, and posting turns all the
+    differences into ``adjustment`` transactions in one go.
+    """
+
+    BATCH_SIZE = 500
+
+    tenant_parent = 'location'
+
+    STATUS_CHOICES = [
+        ('open', 'Counting'),
+        ('posted', 'Posted'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='stock_takes')
+    category = models.ForeignKey(
+        Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_takes',
+        help_text="Limit the count to one category"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    notes = models.TextField(blank=True, null=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='stock_takes')
+    created_at = models.DateTimeField(auto_now_add=True)
+    posted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='posted_stock_takes')
+    posted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Stock take #{self.pk} - {self.location.code} ({self.get_status_display()})"
+
+    @property
+    def reference_no(self):
+        """Reference stamped on the adjustment transactions."""
+        return f"ST-{self.pk}"
+
+    @classmethod
+    def open(cls, location, user=None, category=None, notes=None):
+        """Start a stock take and snapshot system quantities for its scope."""
+        with transaction.atomic():
+            stock_take = cls.objects.create(location=location, category=category, notes=notes, created_by=user)
+            products = Product.objects.scoped(stock_take.tenant_id).filter(is_active=True)
+            if category:
+                products = products.in_category(category)
+            snapshot = products.with_stock(location).values_list('id', 'stock_level').iterator(chunk_size=2000)
+            StockTakeLine.objects.bulk_create(
+                (
+                    StockTakeLine(stock_take=stock_take, product_id=product_id, system_quantity=quantity)
+                    for product_id, quantity in snapshot
+                ),
+                batch_size=1000,
+            )
+        return stock_take
+
+    def record_counts(self, counts, user=None, add=False):
+        """Record counted quantities given as ``{product_id: quantity}``.
+
+        With ``add`` the quantities are added to what is already counted, so
+        several counters can work the same SKU in different aisles. Lines are
+        updated in place by SQL (one statement per distinct quantity), so
+        parallel submissions from different devices never overwrite each
+        other's increments.
+        """
+        by_quantity = {}
+        for product_id, quantity in counts.items():
+            by_quantity.setdefault(quantity, []).append(product_id)
+
+        now = timezone.now()
+        with transaction.atomic():
+            # Holding the stock take row keeps counts from landing after a
+            # concurrent post() has computed its variances
+            if not StockTake.objects.select_for_update().filter(pk=self.pk, status='open').exists():
+                raise ValueError("Counts can only be recorded on an open stock take")
+
+            # Products outside the snapshot (e.g. found on the shelf but
+            # created after the count started) get a line first
+            product_ids = list(counts)
+            for start in range(0, len(product_ids), self.BATCH_SIZE):
+                batch = product_ids[start:start + self.BATCH_SIZE]
+                missing = set(batch) - set(self.lines.filter(product_id__in=batch).values_list('product_id', flat=True))
+                if missing:
+                    system = dict(StockBalance.objects.filter(
+                        location=self.location, product_id__in=missing
+                    ).values_list('product_id', 'quantity'))
+                    StockTakeLine.objects.bulk_create(
+                        [
+                            StockTakeLine(stock_take=self, product_id=product_id, system_quantity=system.get(product_id, 0))
+                            for product_id in missing
+                        ],
+                        ignore_conflicts=True,
+                    )
+
+            for quantity, product_ids in by_quantity.items():
+                counted = Coalesce(F('counted_quantity'), 0) + quantity if add else quantity
+                for start in range(0, len(product_ids), self.BATCH_SIZE):
+                    self.lines.filter(product_id__in=product_ids[start:start + self.BATCH_SIZE]).update(
+                        counted_quantity=counted, counted_by=user, counted_at=now
+                    )
+
+    def post(self, user=None, zero_uncounted=False):
+        """Post every variance as an adjustment and close the stock take.
+
+        Variances are computed in one query and applied with bulk inserts and
+        updates; low stock alerts are reconciled once at the end. Stock moved
+        while counting is preserved because each balance is shifted by
+        ``counted - snapshot`` rather than overwritten. Returns the number of
+        adjustment transactions created.
+        """
+        with transaction.atomic():
+            stock_take = StockTake.objects.select_for_update().get(pk=self.pk)
+            if stock_take.status != 'open':
+                raise ValueError("This stock take is already closed")
+
+            if zero_uncounted:
+                stock_take.lines.filter(counted_quantity__isnull=True).update(counted_quantity=0)
+
+            variance_lines = (
+                stock_take.lines.filter(counted_quantity__isnull=False)
+                .exclude(counted_quantity=F('system_quantity'))
+                .annotate(variance=F('counted_quantity') - F('system_quantity'))
+            )
+            variances = dict(variance_lines.values_list('product_id', 'variance'))
+
+            now = timezone.now()
+            Product.objects.filter(pk__in=variance_lines.values('product_id')).lock()
+            totals = dict(
+                StockBalance.objects.filter(product_id__in=variance_lines.values('product_id'))
+                .values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+            )
+            StockTransaction.objects.bulk_create(
+                (
+                    StockTransaction(
+                        tenant_id=stock_take.tenant_id,
+                        product_id=product_id,
+                        location=stock_take.location,
+                        transaction_type='IN' if variance > 0 else 'OUT',
+                        quantity=abs(variance),
+                        reason='adjustment',
+                        reference_no=stock_take.reference_no,
+                        notes=f"Stock take #{stock_take.pk}",
+                        created_by=user,
+                        balance_after=totals.get(product_id, 0) + variance,
+                    )
+                    for product_id, variance in variances.items()
+                ),
+                batch_size=1000,
+            )
+
+            # Shift every affected balance in one UPDATE ... SET quantity =
+            # quantity + (correlated variance)
+            balances = StockBalance.objects.filter(
+                location=stock_take.location,
+                product_id__in=variance_lines.values('product_id'),
+            )
+            balances.update(
+                quantity=F('quantity') + Subquery(
+                    variance_lines.filter(product_id=OuterRef('product_id')).values('variance')[:1]
+                ),
+                updated_at=now,
+            )
+            existing = set(balances.values_list('product_id', flat=True))
+            StockBalance.objects.bulk_create(
+                [
+                    StockBalance(
+                        tenant_id=stock_take.tenant_id, product_id=product_id,
+                        location=stock_take.location, quantity=variance,
+                    )
+                    for product_id, variance in variances.items()
+                    if product_id not in existing
+                ],
+                batch_size=1000,
+            )
+
+            stock_take.status = 'posted'
+            stock_take.posted_by = user
+            stock_take.posted_at = now
+            stock_take.save(update_fields=['status', 'posted_by', 'posted_at'])
+
+            LowStockAlert.reconcile(variances.keys())
+
+            # Bulk inserts bypass the post_save receivers
+            from .reports import movements_changed, stock_history_changed
+            movements_changed(stock_take.tenant_id)
+            stock_history_changed(variances.keys(), stock_take.tenant_id)
+
+        self.status, self.posted_by, self.posted_at = stock_take.status, user, now
+        return len(variances)
+
+
+class StockTakeLine(models.Model):
+    """System snapshot and counted quantity of one product in a stock take."""
+
+    stock_take = models.ForeignKey(StockTake, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_take_lines')
+    system_quantity = models.IntegerField()
+    counted_quantity = models.IntegerField(null=True, blank=True)
+
+    counted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    counted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['stock_take', 'product'], name='unique_product_per_stock_take'),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_take_id}: {self.product_id} {self.counted_quantity}/{self.system_quantity}"
+
+    @property
+    def variance(self):
+        if self.counted_quantity is None:
+            return None
+        return self.counted_quantity - self.system_quantity
@@ -0,0 +1,233 @@
+"""Batched low-stock notification digests.
+
+Nothing is sent from the request or signal path. ``manage.py
+send_notifications`` (run from cron) does two things:
+
+* ``collect_digests()`` looks at the alerts opened and resolved since each
+  subscription's last digest, keeps the ones in the subscribed categories,
+  collapses them to one entry per product and stores the result as a
+  pending ``NotificationDelivery``. The window end lags the clock by
+  ``NOTIFICATION_SAFETY_SECONDS`` so alerts from transactions still being
+  committed are not skipped. An alert opened and resolved inside the same
+  window is left out as noise.
+* ``send_pending()`` hands pending deliveries to their channel. Failures are
+  retried with exponential backoff up to ``NOTIFICATION_MAX_ATTEMPTS``.
+
+Channels are classes with a ``send(delivery)`` method raising
+``DeliveryError`` on failure, registered by name in
+``NOTIFICATION_CHANNELS``.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import urllib.error
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from accounts.permissions import is_admin
+
+from .models import LowStockAlert, NotificationDelivery, NotificationSubscription
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNELS = {
+    'email': 'inventory.notifications.EmailChannel',
+    'webhook': 'inventory.notifications.WebhookChannel',
+}
+
+
+class DeliveryError(Exception):
+    """A digest could not be delivered; it will be retried."""
+
+
+class EmailChannel:
+    """Send the digest as a plain-text email."""
+
+    def send(self, delivery):
+        recipient = delivery.subscription.recipient
+        if not recipient:
+            raise DeliveryError("No email address for this subscription")
+        payload = delivery.payload
+        subject = f"Low stock digest: {len(payload['new'])} new, {len(payload['resolved'])} resolved"
+        body = render_to_string('inventory/email/low_stock_digest.txt', payload)
+        try:
+            send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient])
+        except Exception as exc:
+            raise DeliveryError(f"Email failed: {exc}") from exc
+
+
+class WebhookChannel:
+    """POST the digest as JSON.
+
+    ``X-Digest-Id`` is stable across retries so receivers can drop
+    duplicates; with ``NOTIFICATION_WEBHOOK_SECRET`` set, ``X-Signature``
+    carries an HMAC-SHA256 of the body. The server makes the request, so only
+    administrators' subscriptions may use webhooks: anyone else could point
+    one at an internal address.
+    """
+
+    def send(self, delivery):
+        url = delivery.subscription.recipient
+        if not url:
+            raise DeliveryError("No webhook URL for this subscription")
+        if not is_admin(delivery.subscription.user):
+            raise DeliveryError("Webhooks are limited to administrators")
+        body = json.dumps(delivery.payload).encode()
+        headers = {'Content-Type': 'application/json', 'X-Digest-Id': str(delivery.pk)}
+        secret = getattr(settings, 'NOTIFICATION_WEBHOOK_SECRET', '')
+        if secret:
+            signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+            headers['X-Signature'] = f'sha256={signature}'
+        request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+        timeout = getattr(settings, 'NOTIFICATION_WEBHOOK_TIMEOUT', 5)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+        except (urllib.error.URLError, OSError) as exc:
+            # HTTPError (non-2xx) is a URLError subclass
+            raise DeliveryError(f"Webhook failed: {exc}") from exc
+
+
+_channels = {}
+
+
+def get_channel(name):
+    """Channel instance registered under ``name``."""
+    if name not in _channels:
+        paths = getattr(settings, 'NOTIFICATION_CHANNELS', DEFAULT_CHANNELS)
+        if name not in paths:
+            raise DeliveryError(f"Unknown notification channel '{name}'")
+        _channels[name] = import_string(paths[name])()
+    return _channels[name]
+
+
+def _alert_entry(alert):
+    product = alert.product
+    return {
+        'product_id': product.id,
+        'sku': product.sku,
+        'name': product.name,
+        'category': product.category.name if product.category else None,
+        'unit': product.unit,
+        'current_stock': alert.current_stock,
+        'minimum_stock': alert.minimum_stock,
+        'alerted_at': alert.created_at.isoformat(),
+    }
+
+
+def build_digest(subscription, start, end):
+    """Digest payload for alerts changed in ``(start, end]``; ``None`` if empty."""
+    alerts = LowStockAlert.objects.filter(tenant_id=subscription.tenant_id).select_related(
+        'product__category'
+    ).order_by('created_at')
+    # A category covers its subcategories: match on the path prefix
+    in_categories = Q()
+    for category in subscription.categories.all():
+        in_categories |= Q(product__category__path__startswith=category.path)
+    if in_categories:
+        alerts = alerts.filter(in_categories)
+
+    # Still-open alerts opened in the window, one per product
+    new = {
+        alert.product_id: _alert_entry(alert)
+        for alert in alerts.filter(status='active', created_at__gt=start, created_at__lte=end)
+    }
+    resolved = {}
+    if subscription.include_resolved:
+        # Only alerts the subscriber could have heard about before
+        for alert in alerts.filter(status='resolved', resolved_at__gt=start, resolved_at__lte=end,
+                                   created_at__lte=start):
+            entry = _alert_entry(alert)
+            entry['resolved_at'] = alert.resolved_at.isoformat()
+            resolved[alert.product_id] = entry
+
+    if not new and not resolved:
+        return None
+    return {
+        'window_start': start.isoformat(),
+        'window_end': end.isoformat(),
+        'new': list(new.values()),
+        'resolved': [entry for product_id, entry in resolved.items() if product_id not in new],
+    }
+
+
+def collect_digests(now=None):
+    """Queue a delivery per subscription with alert changes; return the count."""
+    now = now or timezone.now()
+    end = now - timedelta(seconds=getattr(settings, 'NOTIFICATION_SAFETY_SECONDS', 30))
+    queued = 0
+    subscription_ids = NotificationSubscription.objects.filter(is_active=True).values_list('id', flat=True)
+    for subscription_id in subscription_ids:
+        with transaction.atomic():
+            # Locking the row makes concurrent collectors take turns
+            subscription = (
+                NotificationSubscription.objects.select_for_update()
+                .select_related('user').get(pk=subscription_id)
+            )
+            start = subscription.last_digest_at or subscription.created_at
+            if start >= end:
+                continue
+            payload = build_digest(subscription, start, end)
+            if payload is not None:
+                NotificationDelivery.objects.create(
+                    subscription=subscription, window_start=start, window_end=end, payload=payload,
+                )
+                queued += 1
+            subscription.last_digest_at = end
+            subscription.save(update_fields=['last_digest_at'])
+    return queued
+
+
+def retry_delay(attempts):
+    """Backoff before the next attempt after ``attempts`` failures."""
+    base = getattr(settings, 'NOTIFICATION_RETRY_SECONDS', 60)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def send_pending(now=None, limit=100):
+    """Send due deliveries; return ``(sent, failed_attempts)``."""
+    now = now or timezone.now()
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    lease = timedelta(seconds=getattr(settings, 'NOTIFICATION_WEBHOOK_TIMEOUT', 5) * 4)
+    due = list(
+        NotificationDelivery.objects.filter(status='pending', next_attempt_at__lte=now)
+        .select_related('subscription__user').order_by('next_attempt_at')[:limit]
+    )
+    sent = failed = 0
+    for delivery in due:
+        # Claim it: another sender that read the same row loses this update
+        claimed = NotificationDelivery.objects.filter(
+            pk=delivery.pk, status='pending', next_attempt_at=delivery.next_attempt_at,
+        ).update(next_attempt_at=now + lease)
+        if not claimed:
+            continue
+
+        delivery.attempts += 1
+        try:
+            get_channel(delivery.subscription.channel).send(delivery)
+        except Exception as exc:
+            if not isinstance(exc, DeliveryError):
+                logger.exception("Unexpected error sending digest %s", delivery.pk)
+            failed += 1
+            delivery.last_error = str(exc)[:1000]
+            if delivery.attempts >= max_attempts:
+                delivery.status = 'failed'
+                logger.warning("Giving up on digest %s after %s attempts: %s", delivery.pk, delivery.attempts, exc)
+            else:
+                delivery.next_attempt_at = now + retry_delay(delivery.attempts)
+        else:
+            sent += 1
+            delivery.status = 'sent'
+            delivery.sent_at = timezone.now()
+            delivery.last_error = ''
+        delivery.save(update_fields=['attempts', 'status', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
@@ -0,0 +1,362 @@
+"""Stock movement reports.
+
+A report is a single GROUP BY over ``StockTransaction``: IN and OUT
+quantities are summed with conditional aggregates in the same pass, grouped
+by one dimension and optionally bucketed by day, week or month. Results are
+cached under a key built from the report parameters and the ``movements``
+data version, which every ledger change bumps, so repeated views are served
+from the cache until the data they cover changes.
+
+Category totals (``category_tree()``) are one GROUP BY over active products
+by category, rolled up the tree along each category's materialized path and
+cached under the ``movements`` version as well.
+
+Stock history charts (``stock_history()``) work the same way per product:
+one GROUP BY over the product's ledger rows, bucketed by hour, day or week
+and merged down to a maximum number of points, cached under a version that
+only that product's movements bump.
+"""
+import math
+import csv
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from config.cache import get_or_compute, invalidate_namespace, namespaced_key
+from config.tenancy import CURRENT, current_tenant_id
+from .models import Category, Product, StockTransaction
+
+MOVEMENTS_NAMESPACE = 'movements'
+
+DIMENSIONS = {
+    'category': ('product__category__name', 'Category'),
+    'reason': ('reason', 'Reason'),
+    'user': ('created_by__username', 'User'),
+    'location': ('location__code', 'Location'),
+    'product': ('product__sku', 'Product'),
+}
+
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+REASON_LABELS = dict(StockTransaction.TRANSACTION_REASON_CHOICES)
+
+# Chart buckets, finest first: (truncation, width)
+HISTORY_BUCKETS = {
+    'hour': (TruncHour, timedelta(hours=1)),
+    'day': (TruncDay, timedelta(days=1)),
+    'week': (TruncWeek, timedelta(weeks=1)),
+}
+HISTORY_MAX_POINTS = 1000
+HISTORY_FIELDS = ['t', 'stock', 'in', 'out', 'low', 'high']
+
+
+def movements_changed(tenant=CURRENT):
+    """Retire the tenant's cached reports once the current transaction commits.
+
+    Pass the changed row's tenant when it may differ from the current one
+    (e.g. from signal receivers, which also fire outside requests).
+    """
+    tenant = current_tenant_id() if tenant is CURRENT else tenant
+    transaction.on_commit(lambda: invalidate_namespace(MOVEMENTS_NAMESPACE, tenant))
+
+
+def stock_history_changed(product_ids, tenant=CURRENT):
+    """Retire cached stock charts of these products once the transaction commits."""
+    product_ids = list(product_ids)
+    tenant = current_tenant_id() if tenant is CURRENT else tenant
+
+    def invalidate():
+        for product_id in product_ids:
+            invalidate_namespace(f'stock-history:{product_id}', tenant)
+
+    transaction.on_commit(invalidate)
+
+
+def dashboard_stats():
+    """Dashboard counters and top movers, shared by all workers until stock changes."""
+    today = timezone.now().date()
+
+    def compute():
+        # Range on created_at (not ``__date``) so the covering index is used
+        today_totals = StockTransaction.objects.filter(
+            transaction_type__in=['IN', 'OUT'],
+            created_at__gte=_start_of_day(today),
+            created_at__lt=_start_of_day(today + timedelta(days=1)),
+        ).aggregate(
+            stock_in=Sum('quantity', filter=Q(transaction_type='IN')),
+            stock_out=Sum('quantity', filter=Q(transaction_type='OUT')),
+        )
+        return {
+            'total_products': Product.objects.filter(is_active=True).count(),
+            'low_stock_count': Product.objects.filter(is_active=True).with_stock().with_stock_status('low_stock').count(),
+            'today_stock_in': today_totals['stock_in'] or 0,
+            'today_stock_out': today_totals['stock_out'] or 0,
+            'top_products': list(StockTransaction.objects.values('product__name', 'product__sku').annotate(
+                total_quantity=Sum('quantity'),
+                total_transactions=Count('id')
+            ).order_by('-total_quantity')[:5]),
+        }
+
+    return get_or_compute(namespaced_key(MOVEMENTS_NAMESPACE, 'dashboard', today), compute, namespace='dashboard')
+
+
+def category_tree():
+    """Every category in tree order with its own and subtree totals.
+
+    Each entry holds ``category``, ``depth`` and, for the category alone
+    (``own``) and with all its descendants (``subtree``), the active product
+    count, total stock and low-stock count.
+    """
+    def compute():
+        totals = {
+            row['category_id']: row
+            for row in Product.objects.filter(is_active=True).with_stock().order_by()
+            .values('category_id').annotate(
+                products=Count('id'),
+                stock=Coalesce(Sum('stock_level'), 0),
+                low_stock=Count('id', filter=Q(stock_level__lt=F('minimum_stock'))),
+            )
+        }
+        fields = ('products', 'stock', 'low_stock')
+        entries = {}
+        for category in Category.objects.order_by('path'):
+            own = {field: totals.get(category.id, {}).get(field, 0) for field in fields}
+            entries[category.id] = {
+                'category': category, 'depth': category.depth, 'own': own, 'subtree': dict(own),
+            }
+        # Add each category's own totals to every ancestor on its path
+        for entry in entries.values():
+            for ancestor_id in entry['category'].ancestor_ids:
+                if ancestor_id in entries:
+                    for field in fields:
+                        entries[ancestor_id]['subtree'][field] += entry['own'][field]
+        return list(entries.values())
+
+    return get_or_compute(namespaced_key(MOVEMENTS_NAMESPACE, 'category-tree'), compute, namespace='categories')
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _label(group_by, value):
+    if group_by == 'reason':
+        return REASON_LABELS.get(value, value)
+    if value is None:
+        return 'Uncategorized' if group_by == 'category' else '-'
+    return value
+
+
+def build_report(group_by=None, period=None, start_date=None, end_date=None, location_id=None, category=None):
+    """Run the report query and return plain, cacheable data.
+
+    ``category`` limits the report to products in that category's subtree.
+    """
+    transactions = StockTransaction.objects.all()
+    # Plain range on created_at so the index is usable (``__date`` is not)
+    if start_date:
+        transactions = transactions.filter(created_at__gte=_start_of_day(start_date))
+    if end_date:
+        transactions = transactions.filter(created_at__lt=_start_of_day(end_date + timedelta(days=1)))
+    if location_id:
+        transactions = transactions.filter(location_id=location_id)
+    if category is not None:
+        transactions = transactions.filter(product__category__in=Category.objects.subtree(category).values('pk'))
+
+    keys = []
+    if period:
+        transactions = transactions.annotate(period=PERIODS[period]('created_at'))
+        keys.append('period')
+    if group_by:
+        keys.append(DIMENSIONS[group_by][0])
+
+    aggregates = {
+        'quantity_in': Coalesce(Sum('quantity', filter=Q(transaction_type='IN')), 0),
+        'quantity_out': Coalesce(Sum('quantity', filter=Q(transaction_type='OUT')), 0),
+        'transactions': Count('id'),
+    }
+    if keys:
+        results = transactions.order_by().values(*keys).annotate(**aggregates).order_by(*keys)
+    else:
+        results = [transactions.aggregate(**aggregates)]
+
+    rows = []
+    for result in results:
+        row = {
+            'period': result['period'].date() if result.get('period') else None,
+            'group': _label(group_by, result[DIMENSIONS[group_by][0]]) if group_by else None,
+            'quantity_in': result['quantity_in'],
+            'quantity_out': result['quantity_out'],
+            'transactions': result['transactions'],
+        }
+        row['net'] = row['quantity_in'] - row['quantity_out']
+        rows.append(row)
+
+    # Totals come from the grouped rows, not a second pass over the ledger
+    totals = {
+        field: sum(row[field] for row in rows)
+        for field in ('quantity_in', 'quantity_out', 'net', 'transactions')
+    }
+
+    return {
+        'group_by': group_by,
+        'group_label': DIMENSIONS[group_by][1] if group_by else None,
+        'period': period,
+        'start_date': start_date,
+        'end_date': end_date,
+        'rows': rows,
+        'totals': totals,
+        'generated_at': timezone.now(),
+    }
+
+
+def _history_bucket(requested, start, end, max_points):
+    """Coarsest of the requested bucket and the finest one that fits ``max_points``."""
+    names = list(HISTORY_BUCKETS)
+    span = end - start
+    for name in names[names.index(requested):]:
+        if span / HISTORY_BUCKETS[name][1] <= max_points:
+            return name
+    return names[-1]
+
+
+def build_stock_history(product, bucket='day', start_date=None, end_date=None, max_points=200):
+    """Stock level and IN/OUT volume of ``product`` per time bucket.
+
+    The range covers ``start_date`` to ``end_date`` inclusive (default: the
+    first movement to now). The bucket is widened as needed so that, after merging neighbouring
+    buckets, at most ``max_points`` points are returned. Each point is
+    ``[epoch seconds of the bucket start, closing stock, in, out, lowest,
+    highest]``; lowest/highest come from ``balance_after`` and keep short
+    dips visible after downsampling (``None`` where it was never filled).
+    Buckets without movements are omitted (the stock is unchanged there).
+    """
+    transactions = StockTransaction.objects.filter(product=product)
+    end = timezone.now()
+    if end_date:
+        end = min(end, _start_of_day(end_date + timedelta(days=1)))
+    if start_date:
+        start = _start_of_day(start_date)
+    else:
+        start = transactions.order_by('created_at').values_list('created_at', flat=True).first() or end
+    history = {
+        'bucket': bucket,
+        'step': 1,
+        'start': int(start.timestamp()),
+        'end': int(end.timestamp()),
+        'opening_stock': product.stock_as_of(start - timedelta(microseconds=1)),
+        'fields': HISTORY_FIELDS,
+        'points': [],
+    }
+    if start >= end:
+        return history
+
+    bucket = _history_bucket(bucket, start, end, max_points)
+    trunc, width = HISTORY_BUCKETS[bucket]
+    rows = (
+        transactions.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(bucket=trunc('created_at')).order_by().values('bucket')
+        .annotate(
+            quantity_in=Coalesce(Sum('quantity', filter=Q(transaction_type='IN')), 0),
+            quantity_out=Coalesce(Sum('quantity', filter=Q(transaction_type='OUT')), 0),
+            low=Min('balance_after'),
+            high=Max('balance_after'),
+        ).order_by('bucket')
+    )
+
+    # ``step`` neighbouring buckets, counted from the first one, form a point
+    step = max(1, math.ceil((end - start) / width / max_points))
+    stock = history['opening_stock']
+    points = []
+    origin = None
+    for row in rows:
+        origin = origin or row['bucket']
+        moment = origin + (row['bucket'] - origin) // (width * step) * (width * step)
+        stock += row['quantity_in'] - row['quantity_out']
+        if points and points[-1][0] == moment:
+            point = points[-1]
+            point[1] = stock
+            point[2] += row['quantity_in']
+            point[3] += row['quantity_out']
+            point[4] = _combine(min, point[4], row['low'])
+            point[5] = _combine(max, point[5], row['high'])
+        else:
+            points.append([moment, stock, row['quantity_in'], row['quantity_out'], row['low'], row['high']])
+
+    for point in points:
+        point[0] = int(point[0].timestamp())
+    history.update(bucket=bucket, step=step, points=points)
+    return history
+
+
+def _combine(func, a, b):
+    if a is None or b is None:
+        return b if a is None else a
+    return func(a, b)
+
+
+def stock_history(product, bucket='day', start_date=None, end_date=None, max_points=200):
+    """Cached ``build_stock_history()``, per product and data version.
+
+    An open-ended range is cached as such: no movement can land after "now"
+    without bumping the product's version.
+    """
+    params = {'bucket': bucket, 'start_date': start_date, 'end_date': end_date, 'max_points': max_points}
+    return get_or_compute(
+        namespaced_key(f'stock-history:{product.pk}', params),
+        lambda: build_stock_history(product, **params),
+        timeout=getattr(settings, 'REPORT_CACHE_SECONDS', 3600),
+        namespace='stock_history',
+    )
+
+
+def run_report(group_by=None, period=None, start_date=None, end_date=None, location_id=None, category=None):
+    """Cached ``build_report()``."""
+    params = {
+        'group_by': group_by,
+        'period': period,
+        'start_date': start_date,
+        'end_date': end_date,
+        'location_id': location_id,
+    }
+    # Moving a category bumps the ``movements`` version, so its id is enough
+    key_params = {**params, 'category_id': category.pk if category else None}
+    return get_or_compute(
+        namespaced_key(MOVEMENTS_NAMESPACE, 'report', key_params),
+        lambda: build_report(**params, category=category),
+        timeout=getattr(settings, 'REPORT_CACHE_SECONDS', 3600),
+        namespace='reports',
+    )
+
+
+def write_csv(report, output):
+    """Write a report as CSV to a file-like object (e.g. an HttpResponse)."""
+    writer = csv.writer(output)
+    header = []
+    if report['period']:
+        header.append(report['period'].capitalize())
+    if report['group_by']:
+        header.append(report['group_label'])
+    writer.writerow(header + ['Stock In', 'Stock Out', 'Net', 'Transactions'])
+
+    for row in report['rows']:
+        line = []
+        if report['period']:
+            line.append(row['period'].isoformat() if row['period'] else '')
+        if report['group_by']:
+            line.append(row['group'])
+        writer.writerow(line + [row['quantity_in'], row['quantity_out'], row['net'], row['transactions']])
+
+    totals = report['totals']
+    padding = [''] * (len(header) - 1) if header else []
+    writer.writerow((['Total'] + padding if header else []) + [
+        totals['quantity_in'], totals['quantity_out'], totals['net'], totals['transactions']
+    ])
@@ -1,8 +1,13 @@
 """Signals for Inventory app."""
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
+from django.db.models import F
 from django.utils import timezone
-from .models import StockTransaction, Product, LowStockAlert, AuditLog
+from . import events, images
+from .reports import movements_changed, stock_history_changed
+from .sku_cache import sku_cache
+from .models import StockTransaction, StockBalance, Product, Category, LowStockAlert, AuditLog
 
 
 @receiver(post_save, sender=StockTransaction)
@@ -10,7 +15,8 @@ def check_low_stock(sender, instance, created, **kwargs):
     """Check if product stock falls below minimum after transaction."""
     if created:
         product = instance.product
-        current_stock = product.current_stock
+        # save() has just computed it; no need to sum the balances again
+        current_stock = instance.balance_after if instance.balance_after is not None else product.current_stock
 
         if current_stock < product.minimum_stock:
             # Check if there's already an active alert
@@ -20,21 +26,97 @@ def check_low_stock(sender, instance, created, **kwargs):
             ).first()
 
             if not existing_alert:
-                LowStockAlert.objects.create(
+                alert = LowStockAlert.objects.create(
                     product=product,
-                    current_stock=current_stock,
+                    # The column is unsigned; an oversold product reads 0
+                    current_stock=max(current_stock, 0),
                     minimum_stock=product.minimum_stock,
                     status='active'
                 )
+                events.publish('alert', {
+                    'action': 'created',
+                    'id': alert.id,
+                    'product_id': product.id,
+                    'product_name': product.name,
+                    'sku': product.sku,
+                    'unit': product.unit,
+                    'current_stock': alert.current_stock,
+                    'minimum_stock': product.minimum_stock,
+                }, alert.tenant_id)
         else:
             # Mark any active alerts as resolved
-            LowStockAlert.objects.filter(
+            resolved = LowStockAlert.objects.filter(
                 product=product,
                 status='active'
             ).update(
                 status='resolved',
                 resolved_at=timezone.now()
             )
+            if resolved:
+                events.publish('alert', {
+                    'action': 'resolved',
+                    'product_id': product.id,
+                }, product.tenant_id)
+
+
+@receiver(post_save, sender=StockTransaction)
+def broadcast_transaction(sender, instance, created, **kwargs):
+    """Push the new transaction and the resulting stock levels to live clients."""
+    if not created:
+        return
+
+    # Both set by StockTransaction.save(); raw saves (fixtures) have neither
+    location_stock = getattr(instance, 'location_balance', None)
+    if location_stock is None:
+        location_stock = StockBalance.objects.filter(
+            product_id=instance.product_id,
+            location_id=instance.location_id
+        ).values_list('quantity', flat=True).first() or 0
+    total_stock = instance.balance_after if instance.balance_after is not None else instance.product.current_stock
+    user = instance.created_by
+
+    events.publish('transaction', {
+        'id': instance.id,
+        'product_id': instance.product_id,
+        'product_name': instance.product.name,
+        'sku': instance.product.sku,
+        'location': instance.location.code if instance.location else None,
+        'transaction_type': instance.transaction_type,
+        'quantity': instance.quantity,
+        'reason': instance.get_reason_display(),
+        'user': (user.get_full_name() or user.username) if user else None,
+        'created_at': instance.created_at.isoformat(),
+    }, instance.tenant_id)
+    events.publish('stock', {
+        'product_id': instance.product_id,
+        'location_id': instance.location_id,
+        'location_stock': location_stock,
+        'total_stock': total_stock,
+    }, instance.tenant_id)
+
+
+@receiver(pre_delete, sender=StockTransaction)
+def lock_product_for_delete(sender, instance, **kwargs):
+    """Lock the product before the ledger row goes.
+
+    Runs inside the deletion's transaction, so the row delete, the balance
+    update and the rebuild below all happen under the product lock, taken
+    first as in ``StockTransaction.save()`` and ``transfer()``.
+    """
+    Product.objects.filter(pk=instance.product_id).lock()
+
+
+@receiver(post_delete, sender=StockTransaction)
+def reverse_stock_balance(sender, instance, **kwargs):
+    """Take a deleted transaction back out of its location balance."""
+    # Product before balance (lock_product_for_delete); taking it again is a no-op
+    Product.objects.filter(pk=instance.product_id).lock()
+    StockBalance.objects.filter(
+        product_id=instance.product_id,
+        location_id=instance.location_id
+    ).update(quantity=F('quantity') - instance.signed_quantity, updated_at=timezone.now())
+    # Later movements now end on a different balance
+    StockTransaction.rebuild_balances(instance.product_id, since=(instance.created_at, instance.pk))
 
 
 @receiver(post_save, sender=Product)
@@ -42,6 +124,7 @@ def log_product_changes(sender, instance, created, **kwargs):
     """Log product creation/updates."""
     if created:
         AuditLog.objects.create(
+            tenant_id=instance.tenant_id,
             user=instance.created_by,
             action='create',
             model_name='Product',
@@ -55,4 +138,73 @@ def log_product_changes(sender, instance, created, **kwargs):
         )
 
 
+@receiver(pre_delete, sender=Category)
+def touch_category_products(sender, instance, **kwargs):
+    """Products lose this category via SET_NULL, which skips auto_now; mark
+    them changed so sync clients pick up the cleared category."""
+    Product.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Category)
+def log_category_deletion(sender, instance, **kwargs):
+    """Record the deletion; the sync feed uses it as the category tombstone."""
+    AuditLog.objects.create(
+        tenant_id=instance.tenant_id,
+        action='delete',
+        model_name='Category',
+        object_id=instance.id,
+        object_display=instance.name,
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_sku_cache(sender, instance, **kwargs):
+    """SKU or active flag may have changed; drop cached SKU lookups."""
+    transaction.on_commit(sku_cache.invalidate)
+
+
+@receiver(pre_save, sender=Product)
+def remember_stored_image(sender, instance, update_fields=None, **kwargs):
+    """Note the image the row had, so a replaced one can be released."""
+    if update_fields is not None and 'image' not in update_fields:
+        instance._stored_image = None
+    elif instance._state.adding:
+        instance._stored_image = ''
+    else:
+        instance._stored_image = sender._base_manager.filter(pk=instance.pk).values_list('image', flat=True).first() or ''
+
+
+@receiver(post_save, sender=Product)
+def count_image_references(sender, instance, **kwargs):
+    """Move the reference from the old stored image to the new one."""
+    old_name = getattr(instance, '_stored_image', None)
+    new_name = instance.image.name or ''
+    if old_name is not None and old_name != new_name:
+        images.retain(new_name)
+        images.release(old_name)
+
+
+@receiver(post_delete, sender=Product)
+def release_image(sender, instance, **kwargs):
+    images.release(instance.image.name)
+
+
+@receiver(post_save, sender=StockTransaction)
+@receiver(post_delete, sender=StockTransaction)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_movement_reports(sender, instance, **kwargs):
+    """Ledger rows or the names they are grouped by changed."""
+    movements_changed(instance.tenant_id)
+
+
+@receiver(post_save, sender=StockTransaction)
+@receiver(post_delete, sender=StockTransaction)
+def invalidate_stock_history(sender, instance, **kwargs):
+    """Only the moved product's charts are affected."""
+    stock_history_changed([instance.product_id], instance.tenant_id)
+
+
 __all__ = []
@@ -0,0 +1,102 @@
+"""In-process SKU -> product cache used by the scan endpoint.
+
+Each worker keeps an LRU map of recently scanned SKUs to the few product
+fields a scan needs (``FIELDS``), so a scan resolves its product without a
+query and the ledger signals use that instance instead of fetching the
+row again. Saving or deleting a product bumps a generation
+number in the shared Django cache; workers compare it at most every
+``SKU_CACHE_CHECK_SECONDS`` and drop their map when it has moved. Across
+processes this needs a shared cache backend (Redis); with the default
+per-process cache only the worker that made the change is invalidated.
+Entries are keyed by tenant as well, since each tenant has its own SKUs.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from config.tenancy import current_tenant_id
+from .models import Product
+
+GENERATION_KEY = 'inventory:sku-cache:generation'
+# Everything the scan path reads from the product (tenant stamping, alerts,
+# live events), in model field order as ``Model.from_db`` expects
+FIELDS = ('id', 'tenant_id', 'sku', 'name', 'unit', 'minimum_stock')
+
+
+class SkuCache:
+    """Thread-safe LRU of active SKUs to product field values."""
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._generation = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize or getattr(settings, 'SKU_CACHE_SIZE', 10000)
+
+    def _sync(self):
+        """Drop local entries if another worker changed products."""
+        now = time.monotonic()
+        if now - self._checked_at < getattr(settings, 'SKU_CACHE_CHECK_SECONDS', 1.0):
+            return
+        self._checked_at = now
+        generation = cache.get(GENERATION_KEY, 0)
+        if generation != self._generation:
+            self.clear()
+            self._generation = generation
+
+    def get(self, sku):
+        """The current tenant's active product with this SKU, or None.
+
+        Returns a fresh instance with only ``FIELDS`` loaded on every call, so
+        callers may attach it to new rows without sharing state.
+        """
+        self._sync()
+        key = (current_tenant_id(), sku)
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return Product.from_db(None, FIELDS, values)
+            self.misses += 1
+            epoch = self._epoch
+
+        values = Product.objects.filter(sku=sku, is_active=True).values_list(*FIELDS).first()
+        if values is None:
+            return None
+        with self._lock:
+            # Skip the insert if the cache was cleared while we queried;
+            # the row read may predate the change that cleared it.
+            if epoch == self._epoch:
+                self._entries[key] = values
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return Product.from_db(None, FIELDS, values)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def invalidate(self):
+        """Clear this worker now and every other worker on its next check."""
+        cache.add(GENERATION_KEY, 0, None)
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(GENERATION_KEY, 1, None)
+        self.clear()
+
+
+sku_cache = SkuCache()
@@ -0,0 +1,166 @@
+"""Delta sync feed for offline clients.
+
+Clients send back the opaque cursor from their previous response and get
+only what changed since then: categories, locations, products and balances
+by ``(updated_at, id)``, transactions by id. Deactivated products and
+locations, and deleted categories, come back as tombstones. Rows are sent as
+arrays under a per-section field list to keep payloads small.
+
+Rows younger than ``SYNC_SAFETY_SECONDS`` are held back until the next
+request, so a transaction that commits a little after it stamped its rows
+cannot slip behind a cursor that has already moved past them.
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import AuditLog, Category, Location, Product, StockBalance, StockTransaction
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# (section, cursor key, model, fields, tombstone filter)
+UPDATED_SECTIONS = [
+    ('categories', 'c', Category, ['id', 'name', 'parent_id'], None),
+    ('locations', 'l', Location, ['id', 'code', 'name', 'is_default'], Q(is_active=False)),
+    ('products', 'p', Product,
+     ['id', 'sku', 'name', 'category_id', 'unit', 'minimum_stock', 'reorder_quantity', 'price'],
+     Q(is_active=False)),
+    ('balances', 'b', StockBalance, ['product_id', 'location_id', 'quantity'], None),
+]
+TRANSACTION_FIELDS = ['id', 'product_id', 'location_id', 'transaction_type', 'quantity', 'reason', 'created_at']
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position):
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Position dict from a cursor string; an empty cursor starts from scratch."""
+    if not cursor:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except ValueError as exc:
+        raise InvalidCursor("Malformed cursor") from exc
+    if not isinstance(position, dict):
+        raise InvalidCursor("Malformed cursor")
+    for key, value in position.items():
+        if key in ('t', 'x'):
+            valid = isinstance(value, int)
+        else:
+            valid = isinstance(value, list) and len(value) == 2 and all(isinstance(v, int) for v in value)
+        if not valid:
+            raise InvalidCursor("Malformed cursor")
+    return position
+
+
+def _micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros):
+    return EPOCH + timedelta(microseconds=micros)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    return str(value)  # Decimal prices
+
+
+def _changed_since(model, position, until):
+    rows = model.objects.filter(updated_at__lt=until)
+    if position:
+        micros, last_id = position
+        since = _from_micros(micros)
+        rows = rows.filter(Q(updated_at__gt=since) | Q(updated_at=since, id__gt=last_id))
+    return rows.order_by('updated_at', 'id')
+
+
+def changes_since(cursor, limit):
+    """Build one page of the change feed.
+
+    Returns a JSON-able dict with the next ``cursor`` and ``has_more``; when
+    ``has_more`` is true the client should ask again straight away.
+    """
+    position = decode_cursor(cursor)
+    until = timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_SAFETY_SECONDS', 2))
+    budget = limit
+    has_more = False
+    page = {}
+    deleted = {}
+
+    for section, key, model, fields, tombstone in UPDATED_SECTIONS:
+        if budget <= 0:
+            has_more = True
+            break
+        rows = list(_changed_since(model, position.get(key), until).values(
+            'id', 'updated_at', *[f for f in fields if f != 'id'],
+            *(['is_active'] if tombstone is not None else []),
+        )[:budget + 1])
+        if len(rows) > budget:
+            has_more = True
+            rows = rows[:budget]
+        if not rows:
+            continue
+        budget -= len(rows)
+        position[key] = [_micros(rows[-1]['updated_at']), rows[-1]['id']]
+
+        live = [row for row in rows if tombstone is None or row['is_active']]
+        gone = [row['id'] for row in rows if tombstone is not None and not row['is_active']]
+        if live:
+            page[section] = {
+                'fields': fields + ['updated_at'],
+                'rows': [[_encode_value(row[f]) for f in fields + ['updated_at']] for row in live],
+            }
+        if gone:
+            deleted[section] = gone
+
+    if budget > 0:
+        # Categories are deleted outright; the audit trail is their tombstone
+        removed = list(AuditLog.objects.filter(
+            model_name='Category', action='delete', id__gt=position.get('x', 0), timestamp__lt=until
+        ).order_by('id').values_list('id', 'object_id')[:budget + 1])
+        if len(removed) > budget:
+            has_more = True
+            removed = removed[:budget]
+        if removed:
+            budget -= len(removed)
+            position['x'] = removed[-1][0]
+            deleted.setdefault('categories', []).extend(object_id for _, object_id in removed)
+    else:
+        has_more = True
+
+    if budget > 0:
+        transactions = list(StockTransaction.objects.filter(
+            id__gt=position.get('t', 0), created_at__lt=until
+        ).order_by('id').values_list(*TRANSACTION_FIELDS)[:budget + 1])
+        if len(transactions) > budget:
+            has_more = True
+            transactions = transactions[:budget]
+        if transactions:
+            position['t'] = transactions[-1][0]
+            page['transactions'] = {
+                'fields': TRANSACTION_FIELDS,
+                'rows': [[_encode_value(value) for value in row] for row in transactions],
+            }
+    else:
+        has_more = True
+
+    if deleted:
+        page['deleted'] = deleted
+    page['cursor'] = encode_cursor(position)
+    page['has_more'] = has_more
+    return page
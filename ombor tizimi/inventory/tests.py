@@ -0,0 +1,522 @@
+import gzip
+import hashlib
+import hmac
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Tenant
+from config.tenancy import tenant_context
+
+from .models import (
+    AuditLog, Category, ImageBlob, Location, LowStockAlert, NotificationDelivery, NotificationSubscription, Product, StockBalance,
+    StockTake, StockTransaction,
+)
+from .images import prune_unreferenced
+from .notifications import collect_digests, send_pending
+from .retention import archive_expired, archive_path
+from .sync import InvalidCursor, changes_since
+
+
+class WebhookStub:
+    """Local HTTP server recording the requests it gets and answering with ``statuses`` in turn."""
+
+    def __init__(self, statuses=(200,)):
+        self.statuses = list(statuses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests.append({'headers': dict(self.headers), 'body': body})
+                status = stub.statuses.pop(0) if len(stub.statuses) > 1 else stub.statuses[0]
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/digest'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    NOTIFICATION_SAFETY_SECONDS=0,
+    NOTIFICATION_RETRY_SECONDS=60,
+    NOTIFICATION_WEBHOOK_SECRET='',
+)
+class LowStockDigestTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_user('buyer', email='buyer@example.com', password='x', is_staff=True)
+        self.clerk = User.objects.create_user('clerk', email='clerk@example.com', password='x')
+        self.tools = Category.objects.create(name='Tools')
+        self.drills = Category.objects.create(name='Drills', parent=self.tools)
+        self.food = Category.objects.create(name='Food')
+        self.drill = Product.objects.create(sku='DR-1', name='Drill', category=self.drills, minimum_stock=10)
+        self.rice = Product.objects.create(sku='RC-1', name='Rice', category=self.food, minimum_stock=10)
+        self.since = timezone.now() - timedelta(hours=1)
+
+    def subscribe(self, user=None, **fields):
+        categories = fields.pop('categories', [])
+        subscription = NotificationSubscription.objects.create(
+            user=user or self.admin, last_digest_at=self.since, **fields
+        )
+        subscription.categories.set(categories)
+        return subscription
+
+    def alert(self, product, **fields):
+        return LowStockAlert.objects.create(product=product, current_stock=2, minimum_stock=10, **fields)
+
+    @staticmethod
+    def now():
+        # Just ahead of the clock, so deliveries queued now are already due
+        return timezone.now() + timedelta(seconds=1)
+
+    def run_digests(self, now=None):
+        now = now or self.now()
+        return collect_digests(now=now), send_pending(now=now)
+
+    def test_email_digest_batches_alerts(self):
+        self.subscribe()
+        self.alert(self.drill)
+        self.alert(self.rice)
+
+        queued, (sent, failed) = self.run_digests()
+
+        self.assertEqual((queued, sent, failed), (1, 1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['buyer@example.com'])
+        self.assertIn('2 new', message.subject)
+        self.assertIn('DR-1', message.body)
+        self.assertIn('RC-1', message.body)
+
+    def test_parent_category_covers_subcategories(self):
+        self.subscribe(categories=[self.tools])
+        self.alert(self.drill)
+        self.alert(self.rice)
+
+        self.run_digests()
+
+        payload = NotificationDelivery.objects.get().payload
+        self.assertEqual([entry['sku'] for entry in payload['new']], ['DR-1'])
+
+    def test_nothing_queued_twice_for_the_same_window(self):
+        self.subscribe()
+        self.alert(self.drill)
+        now = self.now()
+
+        self.assertEqual(collect_digests(now=now), 1)
+        self.assertEqual(collect_digests(now=now), 0)
+        self.assertEqual(collect_digests(now=now + timedelta(minutes=5)), 0)
+        self.assertEqual(NotificationDelivery.objects.count(), 1)
+
+    def test_resolved_alert_reported_in_next_digest(self):
+        self.subscribe()
+        alert = self.alert(self.drill)
+        first = self.now()
+        self.run_digests(first)
+
+        LowStockAlert.objects.filter(pk=alert.pk).update(status='resolved', resolved_at=first + timedelta(minutes=1))
+        self.run_digests(first + timedelta(minutes=2))
+
+        self.assertEqual(len(mail.outbox), 2)
+        payload = NotificationDelivery.objects.order_by('window_end').last().payload
+        self.assertEqual(payload['new'], [])
+        self.assertEqual([entry['sku'] for entry in payload['resolved']], ['DR-1'])
+
+    def test_webhook_retried_with_same_digest_id(self):
+        with WebhookStub(statuses=[503, 200]) as stub, \
+                override_settings(NOTIFICATION_WEBHOOK_SECRET='s3cret'):
+            self.subscribe(channel='webhook', target=stub.url)
+            self.alert(self.drill)
+            now = self.now()
+
+            queued, (sent, failed) = self.run_digests(now)
+            self.assertEqual((queued, sent, failed), (1, 0, 1))
+            delivery = NotificationDelivery.objects.get()
+            self.assertEqual((delivery.status, delivery.attempts), ('pending', 1))
+            self.assertEqual(delivery.next_attempt_at, now + timedelta(seconds=60))
+
+            # Not due yet
+            self.assertEqual(send_pending(now=now + timedelta(seconds=30)), (0, 0))
+            self.assertEqual(send_pending(now=now + timedelta(seconds=61)), (1, 0))
+
+        delivery.refresh_from_db()
+        self.assertEqual((delivery.status, delivery.attempts), ('sent', 2))
+        self.assertEqual(len(stub.requests), 2)
+        digest_ids = {request['headers']['X-Digest-Id'] for request in stub.requests}
+        self.assertEqual(digest_ids, {str(delivery.pk)})
+        body = stub.requests[-1]['body']
+        expected = hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+        self.assertEqual(stub.requests[-1]['headers']['X-Signature'], f'sha256={expected}')
+        self.assertEqual(json.loads(body)['new'][0]['sku'], 'DR-1')
+
+    @override_settings(NOTIFICATION_MAX_ATTEMPTS=2)
+    def test_webhook_gives_up_after_max_attempts(self):
+        with WebhookStub(statuses=[500]) as stub:
+            self.subscribe(channel='webhook', target=stub.url)
+            self.alert(self.drill)
+            now = self.now()
+            self.run_digests(now)
+            send_pending(now=now + timedelta(hours=1))
+
+        delivery = NotificationDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempts), ('failed', 2))
+        self.assertIn('500', delivery.last_error)
+
+    def test_webhook_of_non_admin_is_not_called(self):
+        with WebhookStub() as stub:
+            self.subscribe(user=self.clerk, channel='webhook', target=stub.url)
+            self.alert(self.drill)
+            self.run_digests()
+
+        self.assertEqual(stub.requests, [])
+        self.assertIn('administrators', NotificationDelivery.objects.get().last_error)
+
+    def test_only_admins_can_add_webhooks(self):
+        data = {'channel': 'webhook', 'target': 'http://127.0.0.1:6379/', 'include_resolved': 'on'}
+
+        self.client.force_login(self.clerk)
+        response = self.client.post(reverse('notification_settings'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(NotificationSubscription.objects.filter(user=self.clerk).exists())
+        response = self.client.post(reverse('notification_settings'), {**data, 'channel': 'email', 'target': ''})
+        self.assertRedirects(response, reverse('notification_settings'))
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('notification_settings'), {**data, 'target': 'https://hooks.example.com/x'})
+        self.assertRedirects(response, reverse('notification_settings'))
+        self.assertTrue(NotificationSubscription.objects.filter(user=self.admin, channel='webhook').exists())
+
+
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('clerk', password='x'))
+        Product.objects.create(sku='BLT-10', name='Hex bolt')
+        Product.objects.create(sku='HX-2', name='Bolt cutter')
+        Product.objects.create(sku='NT-1', name='Nut', is_active=False)
+        Category.objects.create(name='Bolts')
+
+    def search(self, route, term, **params):
+        response = self.client.get(reverse(route), {'q': term, **params})
+        return [row['text'] for row in response.json()['results']]
+
+    def test_products_match_sku_or_name_prefix_ignoring_case(self):
+        # "Hex bolt" by name, "HX-2" by SKU
+        self.assertEqual(self.search('product_autocomplete', 'h'), ['Bolt cutter (HX-2)', 'Hex bolt (BLT-10)'])
+        self.assertEqual(self.search('product_autocomplete', 'blt'), ['Hex bolt (BLT-10)'])
+        self.assertEqual(self.search('product_autocomplete', 'bOl'), ['Bolt cutter (HX-2)'])
+        self.assertEqual(self.search('product_autocomplete', 'bolt c'), ['Bolt cutter (HX-2)'])
+        self.assertEqual(self.search('product_autocomplete', 'n'), ['Nut (NT-1)'])
+        self.assertEqual(self.search('product_autocomplete', 'n', active='1'), [])
+
+    def test_categories_match_name_prefix(self):
+        self.assertEqual(self.search('category_autocomplete', 'BOL'), ['Bolts'])
+        self.assertEqual(self.search('category_autocomplete', 'olts'), [])
+
+
+class StockTakeTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('counter', password='x')
+        self.location = Location.get_default()
+        self.tools = Category.objects.create(name='Tools')
+        self.drills = Category.objects.create(name='Drills', parent=self.tools)
+        self.hammer = Product.objects.create(sku='HM-1', name='Hammer', category=self.tools)
+        self.drill = Product.objects.create(sku='DR-1', name='Drill', category=self.drills)
+        self.rice = Product.objects.create(sku='RC-1', name='Rice')
+        for product, quantity in ((self.hammer, 10), (self.drill, 4)):
+            StockTransaction.objects.create(
+                product=product, location=self.location, transaction_type='IN', quantity=quantity, reason='purchase',
+            )
+
+    def test_parent_category_includes_subcategories(self):
+        stock_take = StockTake.open(self.location, self.user, category=self.tools)
+        lines = dict(stock_take.lines.values_list('product__sku', 'system_quantity'))
+        self.assertEqual(lines, {'HM-1': 10, 'DR-1': 4})
+
+    def test_post_adjusts_by_counted_variance(self):
+        stock_take = StockTake.open(self.location, self.user)
+        stock_take.record_counts({self.hammer.pk: 7, self.drill.pk: 4}, self.user)
+        # Moved while counting: kept, since the balance is shifted, not overwritten
+        StockTransaction.objects.create(
+            product=self.hammer, location=self.location, transaction_type='OUT', quantity=2, reason='sale',
+        )
+
+        self.assertEqual(stock_take.post(self.user), 1)
+
+        self.assertEqual(StockBalance.objects.get(product=self.hammer).quantity, 5)
+        self.assertEqual(StockBalance.objects.get(product=self.drill).quantity, 4)
+        adjustment = StockTransaction.objects.get(reason='adjustment')
+        self.assertEqual(
+            (adjustment.product, adjustment.transaction_type, adjustment.quantity, adjustment.balance_after),
+            (self.hammer, 'OUT', 3, 5),
+        )
+        self.assertEqual(adjustment.reference_no, stock_take.reference_no)
+        self.assertEqual(StockTake.objects.get().status, 'posted')
+        with self.assertRaises(ValueError):
+            stock_take.post(self.user)
+
+    def test_zero_uncounted(self):
+        stock_take = StockTake.open(self.location, self.user)
+        stock_take.post(self.user, zero_uncounted=True)
+        self.assertEqual(StockBalance.objects.get(product=self.drill).quantity, 0)
+        self.assertFalse(StockBalance.objects.filter(product=self.rice).exists())
+
+
+class AuditRetentionTests(TestCase):
+
+    def test_archive_keeps_each_entrys_tenant(self):
+        other = Tenant.objects.create(name='Other', slug='other')
+        AuditLog.objects.create(action='view', model_name='Product')
+        with tenant_context(other):
+            AuditLog.objects.create(action='view', model_name='Product')
+        old = timezone.now() - timedelta(days=400)
+        AuditLog.objects.update(timestamp=old)
+
+        with tempfile.TemporaryDirectory() as archives, override_settings(AUDIT_LOG_ARCHIVE_DIR=archives):
+            self.assertEqual(archive_expired()['view'], 2)
+            with gzip.open(archive_path(old), 'rt') as archive:
+                rows = [json.loads(line) for line in archive]
+
+        self.assertFalse(AuditLog.objects.exists())
+        self.assertEqual({row['tenant_id'] for row in rows}, {Tenant.objects.get_default().pk, other.pk})
+
+
+class LocationStockTests(TestCase):
+
+    def setUp(self):
+        self.main = Location.get_default()
+        self.shop = Location.objects.create(code='SHOP', name='Shop')
+        self.product = Product.objects.create(sku='BX-1', name='Box')
+
+    def move(self, transaction_type, quantity, location=None):
+        return StockTransaction.objects.create(
+            product=self.product, location=location, transaction_type=transaction_type, quantity=quantity,
+            reason='purchase' if transaction_type == 'IN' else 'sale',
+        )
+
+    def test_balances_are_kept_per_location(self):
+        self.move('IN', 10)
+        self.move('IN', 5, self.shop)
+        self.move('OUT', 2, self.shop)
+
+        self.assertEqual((self.product.stock_at(self.main), self.product.stock_at(self.shop)), (10, 3))
+        self.assertEqual(self.product.current_stock, 13)
+        stock = Product.objects.with_stock(self.shop).values_list('stock_level', flat=True).get()
+        self.assertEqual(stock, 3)
+
+    def test_transfer_moves_stock_as_a_pair(self):
+        self.move('IN', 10)
+
+        transfer_out, transfer_in = StockTransaction.transfer(self.product, self.main, self.shop, 4)
+
+        self.assertEqual((self.product.stock_at(self.main), self.product.stock_at(self.shop)), (6, 4))
+        self.assertEqual(transfer_out.transfer_group, transfer_in.transfer_group)
+        self.assertEqual(
+            [(row.reason, row.location, row.quantity) for row in (transfer_out, transfer_in)],
+            [('transfer_out', self.main, 4), ('transfer_in', self.shop, 4)],
+        )
+        self.assertEqual(self.product.current_stock, 10)
+
+    def test_transfer_refuses_more_than_the_source_holds(self):
+        self.move('IN', 3, self.shop)
+
+        with self.assertRaisesMessage(ValueError, 'Only 3 pcs of BX-1 available at SHOP'):
+            StockTransaction.transfer(self.product, self.shop, self.main, 5)
+        with self.assertRaises(ValueError):
+            StockTransaction.transfer(self.product, self.shop, self.shop, 1)
+
+        self.assertEqual(StockTransaction.objects.count(), 1)
+        self.assertEqual((self.product.stock_at(self.main), self.product.stock_at(self.shop)), (0, 3))
+
+
+class RunningBalanceTests(TestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(sku='BX-1', name='Box')
+        self.rows = [
+            StockTransaction.objects.create(
+                product=self.product, transaction_type=transaction_type, quantity=quantity, reason='adjustment',
+            )
+            for transaction_type, quantity in (('IN', 10), ('OUT', 3), ('IN', 5))
+        ]
+
+    def balances(self, product=None):
+        rows = StockTransaction.objects.filter(product=product or self.product).order_by('created_at', 'id')
+        return list(rows.values_list('balance_after', flat=True))
+
+    def test_each_row_stores_the_stock_after_it(self):
+        self.assertEqual([row.balance_after for row in self.rows], [10, 7, 12])
+        self.assertEqual(self.balances(), [10, 7, 12])
+        self.assertEqual(self.product.stock_as_of(self.rows[1].created_at), 7)
+
+    def test_editing_a_row_shifts_every_later_row(self):
+        first = self.rows[0]
+        first.quantity = 20
+        first.save()
+
+        self.assertEqual(self.balances(), [20, 17, 22])
+        self.assertEqual(self.product.current_stock, 22)
+
+    def test_moving_a_row_to_another_product_rebuilds_both(self):
+        other = Product.objects.create(sku='BX-2', name='Crate')
+        StockTransaction.objects.create(product=other, transaction_type='IN', quantity=1, reason='purchase')
+        row = self.rows[1]
+        row.product = other
+        row.transaction_type = 'IN'
+        row.save()
+
+        self.assertEqual(self.balances(), [10, 15])
+        # The moved row is older than the other product's receipt
+        self.assertEqual(self.balances(other), [3, 4])
+
+    def test_deleting_a_row_rebuilds_later_rows(self):
+        self.rows[1].delete()
+
+        self.assertEqual(self.balances(), [10, 15])
+        self.assertEqual(self.product.current_stock, 15)
+
+    def test_rebuild_repairs_stale_balances(self):
+        StockTransaction.objects.filter(pk=self.rows[0].pk).update(balance_after=None)
+        StockTransaction.objects.filter(pk=self.rows[2].pk).update(balance_after=99)
+
+        self.assertEqual(StockTransaction.rebuild_balances(self.product.pk), 2)
+        self.assertEqual(self.balances(), [10, 7, 12])
+
+
+@override_settings(SYNC_SAFETY_SECONDS=0)
+class SyncFeedTests(TestCase):
+
+    def setUp(self):
+        self.tools = Category.objects.create(name='Tools')
+        self.hammer = Product.objects.create(sku='HM-1', name='Hammer', category=self.tools)
+        self.saw = Product.objects.create(sku='SW-1', name='Saw')
+        StockTransaction.objects.create(product=self.hammer, transaction_type='IN', quantity=5, reason='purchase')
+
+    @staticmethod
+    def ids(page, section):
+        rows = page.get(section, {'fields': ['id'], 'rows': []})
+        index = rows['fields'].index('id') if 'id' in rows['fields'] else rows['fields'].index('product_id')
+        return [row[index] for row in rows['rows']]
+
+    def test_cursor_returns_only_what_changed(self):
+        first = changes_since('', 100)
+        self.assertFalse(first['has_more'])
+        self.assertEqual(self.ids(first, 'products'), [self.hammer.pk, self.saw.pk])
+        self.assertEqual(self.ids(first, 'categories'), [self.tools.pk])
+        self.assertEqual(self.ids(first, 'balances'), [self.hammer.pk])
+        self.assertEqual(len(first['transactions']['rows']), 1)
+
+        nothing = changes_since(first['cursor'], 100)
+        self.assertEqual(set(nothing), {'cursor', 'has_more'})
+
+        self.saw.minimum_stock = 3
+        self.saw.save()
+        StockTransaction.objects.create(product=self.saw, transaction_type='IN', quantity=1, reason='purchase')
+        changed = changes_since(nothing['cursor'], 100)
+        self.assertEqual(self.ids(changed, 'products'), [self.saw.pk])
+        self.assertEqual(self.ids(changed, 'balances'), [self.saw.pk])
+        self.assertEqual(len(changed['transactions']['rows']), 1)
+
+    def test_deactivated_and_deleted_rows_come_back_as_tombstones(self):
+        cursor = changes_since('', 100)['cursor']
+        category_id = self.tools.pk
+        self.hammer.is_active = False
+        self.hammer.save()
+        self.tools.delete()
+
+        page = changes_since(cursor, 100)
+
+        self.assertEqual(page['deleted'], {'products': [self.hammer.pk], 'categories': [category_id]})
+        self.assertNotIn(self.hammer.pk, self.ids(page, 'products'))
+
+    def test_small_pages_add_up_to_the_full_download(self):
+        full = changes_since('', 100)
+        cursor, pages, seen = '', 0, []
+        while True:
+            page = changes_since(cursor, 1)
+            pages += 1
+            seen += self.ids(page, 'products')
+            cursor = page['cursor']
+            if not page['has_more']:
+                break
+        self.assertGreater(pages, 4)
+        self.assertEqual(seen, self.ids(full, 'products'))
+
+    def test_malformed_cursor_is_rejected(self):
+        with self.assertRaises(InvalidCursor):
+            changes_since('not-a-cursor', 10)
+        self.client.force_login(User.objects.create_user('device', password='x'))
+        response = self.client.get(reverse('sync_changes'), {'cursor': 'WzFd'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductImageTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    @staticmethod
+    def upload(content):
+        return SimpleUploadedFile('photo.PNG', content, content_type='image/png')
+
+    def references(self, name):
+        return ImageBlob.objects.filter(name=name).values_list('references', flat=True).first()
+
+    def test_identical_images_are_stored_once_and_counted(self):
+        first = Product.objects.create(sku='A-1', name='A', image=self.upload(b'same bytes'))
+        second = Product.objects.create(sku='A-2', name='B', image=self.upload(b'same bytes'))
+
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        self.assertRegex(name, r'^products/[0-9a-f]{2}/[0-9a-f]{64}\.png$')
+        self.assertEqual(self.references(name), 2)
+        self.assertEqual(first.image.read(), b'same bytes')
+
+    def test_replaced_and_deleted_images_are_released_then_pruned(self):
+        first = Product.objects.create(sku='A-1', name='A', image=self.upload(b'old'))
+        second = Product.objects.create(sku='A-2', name='B', image=self.upload(b'old'))
+        old_name = first.image.name
+
+        first.image = self.upload(b'new')
+        first.save()
+        self.assertEqual((self.references(old_name), self.references(first.image.name)), (1, 1))
+        # Saves that leave the image alone do not count it again
+        first.save(update_fields=['name'])
+        first.save()
+        self.assertEqual(self.references(first.image.name), 1)
+
+        self.assertEqual(prune_unreferenced(grace_seconds=0), (0, 0))
+        second.delete()
+        self.assertEqual(self.references(old_name), 0)
+
+        self.assertEqual(prune_unreferenced(grace_seconds=0), (1, 3))
+        self.assertFalse(first.image.storage.exists(old_name))
+        self.assertIsNone(self.references(old_name))
+        self.assertTrue(first.image.storage.exists(first.image.name))
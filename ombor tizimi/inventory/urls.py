@@ -1,30 +1,55 @@
 """URL Configuration for Inventory app."""
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+# Read-only pages are served by async views when ASYNC_VIEWS is enabled
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     # Dashboard
-    path('', views.dashboard, name='dashboard'),
+    path('', read_views.dashboard, name='dashboard'),
 
     # Products
-    path('products/', views.products_list, name='products_list'),
+    path('products/', read_views.products_list, name='products_list'),
     path('products/create/', views.create_product, name='create_product'),
-    path('products/<int:pk>/', views.product_detail, name='product_detail'),
+    path('products/autocomplete/', views.product_autocomplete, name='product_autocomplete'),
+    path('products/<int:pk>/', read_views.product_detail, name='product_detail'),
     path('products/<int:pk>/edit/', views.edit_product, name='edit_product'),
+    path('products/<int:pk>/history/', views.product_history, name='product_history'),
+    path('products/<int:pk>/stock-history/', views.product_stock_history, name='product_stock_history'),
     path('products/<int:pk>/delete/', views.delete_product, name='delete_product'),
 
     # Stock Transactions
-    path('transactions/', views.transactions_list, name='transactions_list'),
+    path('transactions/', read_views.transactions_list, name='transactions_list'),
     path('transactions/create/', views.stock_transaction, name='stock_transaction'),
+    path('transactions/transfer/', views.stock_transfer, name='stock_transfer'),
+    path('scan/', views.scan, name='scan'),
+    path('sync/changes/', views.sync_changes, name='sync_changes'),
+
+    # Stock takes
+    path('stock-takes/', views.stock_takes, name='stock_takes'),
+    path('stock-takes/<int:pk>/', views.stock_take_detail, name='stock_take_detail'),
+    path('stock-takes/<int:pk>/counts/', views.stock_take_counts, name='stock_take_counts'),
+    path('stock-takes/<int:pk>/post/', views.stock_take_post, name='stock_take_post'),
+    path('stock-takes/<int:pk>/cancel/', views.stock_take_cancel, name='stock_take_cancel'),
 
     # Alerts
-    path('alerts/', views.low_stock_alerts, name='low_stock_alerts'),
+    path('alerts/', read_views.low_stock_alerts, name='low_stock_alerts'),
+    path('notifications/', views.notification_settings, name='notification_settings'),
+
+    # Live updates (ASGI only)
+    path('live/events/', async_views.live_events, name='live_events'),
 
     # Categories
     path('categories/', views.categories, name='categories'),
     path('categories/create/', views.create_category, name='create_category'),
+    path('categories/autocomplete/', views.category_autocomplete, name='category_autocomplete'),
 
     # Export
     path('export/products/', views.export_products, name='export_products'),
     path('export/transactions/', views.export_transactions, name='export_transactions'),
+
+    # Reports
+    path('reports/movements/', views.movement_report, name='movement_report'),
 ]
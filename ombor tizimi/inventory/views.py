@@ -1,63 +1,120 @@
 """Views for Inventory app."""
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.db.models import Q, Sum, Count, F
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date
 from django.template.loader import render_to_string
 import csv
-from datetime import timedelta
-
-from .models import Product, StockTransaction, Category, AuditLog, LowStockAlert
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from accounts.permissions import is_admin, is_staff_or_admin
+from config.db_router import replica_reads, routed_stream
+from .sku_cache import sku_cache
+from .models import (
+    Product, StockTransaction, Category, AuditLog, LowStockAlert, Location, StockTake,
+    NotificationSubscription,
+)
 from .forms import (
-    ProductForm, StockTransactionForm, CategoryForm,
-    ProductFilterForm, TransactionFilterForm
+    ProductForm, StockTransactionForm, StockTransferForm, CategoryForm,
+    ProductFilterForm, TransactionFilterForm, StockTakeForm, StockCountForm, MovementReportForm,
+    NotificationSubscriptionForm,
 )
+from . import columnar
+from .reports import (
+    HISTORY_BUCKETS, HISTORY_MAX_POINTS, category_tree, dashboard_stats, run_report, stock_history, write_csv,
+)
+from .sync import changes_since, InvalidCursor
+
+
+def get_location_filter(request):
+    """Return the active Location selected by the ``location`` GET parameter."""
+    location_id = request.GET.get('location', '')
+    if not location_id.isdigit():
+        return None
+    return Location.objects.filter(pk=location_id, is_active=True).first()
+
+
+def get_page_bounds(request, per_page=50):
+    """Slice bounds for the ``page`` GET parameter (1-based)."""
+    page = request.GET.get('page', '1')
+    page = int(page) if page.isdigit() and int(page) > 0 else 1
+    start = (page - 1) * per_page
+    return start, start + per_page
+
+
+def filter_products(form, is_valid):
+    """Build the product list queryset from a bound ProductFilterForm.
+
+    Returns ``(products, location)``. Shared by the sync and async views.
+    """
+    products = Product.objects.select_related('category').filter(is_active=True)
+    location = None
+    status = None
+
+    if is_valid:
+        if form.cleaned_data.get('category'):
+            products = products.in_category(form.cleaned_data['category'])
+
+        location = form.cleaned_data.get('location')
+        if location:
+            products = products.at_location(location)
+
+        if form.cleaned_data.get('search'):
+            search = form.cleaned_data['search']
+            products = products.filter(
+                Q(name__icontains=search) | Q(sku__icontains=search)
+            )
+
+        status = form.cleaned_data.get('status')
+
+    # Stock comes from one balance subquery; status filters run in SQL
+    return products.with_stock(location).with_stock_status(status), location
+
+
+def filter_transactions(form, is_valid):
+    """Build the transaction list queryset from a bound TransactionFilterForm."""
+    transactions = StockTransaction.objects.select_related(
+        'product', 'created_by', 'location'
+    ).order_by('-created_at')
+
+    if is_valid:
+        if form.cleaned_data.get('product'):
+            transactions = transactions.filter(product=form.cleaned_data['product'])
 
+        if form.cleaned_data.get('location'):
+            transactions = transactions.filter(location=form.cleaned_data['location'])
 
-def is_admin(user):
-    """Check if user is admin."""
-    return user.is_staff or (hasattr(user, 'profile') and user.profile.role == 'admin')
+        if form.cleaned_data.get('transaction_type'):
+            transactions = transactions.filter(
+                transaction_type=form.cleaned_data['transaction_type']
+            )
 
+        if form.cleaned_data.get('start_date'):
+            transactions = transactions.filter(
+                created_at__date__gte=form.cleaned_data['start_date']
+            )
 
-def is_staff_or_admin(user):
-    """Check if user is staff or admin."""
-    if hasattr(user, 'profile'):
-        return user.profile.role in ['admin', 'staff']
-    return user.is_staff
+        if form.cleaned_data.get('end_date'):
+            transactions = transactions.filter(
+                created_at__date__lte=form.cleaned_data['end_date']
+            )
+
+    return transactions
 
 
 @login_required
 @require_http_methods(["GET"])
+@replica_reads
 def dashboard(request):
     """Main dashboard view."""
-    # Calculate statistics
-    total_products = Product.objects.filter(is_active=True).count()
-    low_stock_products = Product.objects.filter(
-        is_active=True
-    ).filter(
-        Q(transactions__transaction_type='IN') | Q(transactions__transaction_type='OUT')
-    ).annotate(
-        stock=Sum(
-            F('transactions__quantity') * 
-            (1 if F('transactions__transaction_type') == 'IN' else -1),
-            output_field=models.IntegerField()
-        )
-    ).filter(stock__lt=F('minimum_stock')).count()
-
-    # Today's transactions
-    today = timezone.now().date()
-    today_stock_in = StockTransaction.objects.filter(
-        transaction_type='IN',
-        created_at__date=today
-    ).aggregate(total=Sum('quantity'))['total'] or 0
-
-    today_stock_out = StockTransaction.objects.filter(
-        transaction_type='OUT',
-        created_at__date=today
-    ).aggregate(total=Sum('quantity'))['total'] or 0
+    # Counters and top movers come from the shared cache
+    stats = dashboard_stats()
 
     # Low stock products for alerts
     low_stock_alerts = LowStockAlert.objects.filter(
@@ -69,21 +126,11 @@ def dashboard(request):
         'product', 'created_by'
     ).order_by('-created_at')[:10]
 
-    # Top products by movement
-    top_products = StockTransaction.objects.values('product__name', 'product__sku').annotate(
-        total_quantity=Sum('quantity'),
-        total_transactions=Count('id')
-    ).order_by('-total_quantity')[:5]
-
     context = {
         'page_title': 'Dashboard',
-        'total_products': total_products,
-        'low_stock_count': low_stock_products,
-        'today_stock_in': today_stock_in,
-        'today_stock_out': today_stock_out,
+        **stats,
         'low_stock_alerts': low_stock_alerts,
         'recent_transactions': recent_transactions,
-        'top_products': top_products,
     }
 
     return render(request, 'inventory/dashboard.html', context)
@@ -91,47 +138,17 @@ def dashboard(request):
 
 @login_required
 @require_http_methods(["GET"])
+@replica_reads
 def products_list(request):
     """List all products."""
-    products = Product.objects.select_related('category').filter(is_active=True)
-
-    # Apply filters
     form = ProductFilterForm(request.GET)
-    if form.is_valid():
-        if form.cleaned_data.get('category'):
-            products = products.filter(category=form.cleaned_data['category'])
-
-        if form.cleaned_data.get('search'):
-            search = form.cleaned_data['search']
-            products = products.filter(
-                Q(name__icontains=search) | Q(sku__icontains=search)
-            )
-
-        status = form.cleaned_data.get('status')
-        if status == 'low_stock':
-            # Filter products with low stock
-            products_list = []
-            for product in products:
-                if product.is_low_stock:
-                    products_list.append(product)
-            products = products_list
-        elif status == 'out_of_stock':
-            products_list = []
-            for product in products:
-                if product.current_stock <= 0:
-                    products_list.append(product)
-            products = products_list
-        elif status == 'in_stock':
-            products_list = []
-            for product in products:
-                if product.current_stock > 0 and not product.is_low_stock:
-                    products_list.append(product)
-            products = products_list
+    products, location = filter_products(form, form.is_valid())
 
     context = {
         'page_title': 'Products',
         'products': products,
         'form': form,
+        'location': location,
         'can_edit': is_admin(request.user),
     }
     return render(request, 'inventory/products_list.html', context)
@@ -173,20 +190,132 @@ def create_product(request):
 
 @login_required
 @require_http_methods(["GET"])
+@replica_reads
 def product_detail(request, pk):
     """Product detail view."""
     product = get_object_or_404(Product, id=pk)
-    transactions = product.transactions.select_related('created_by').order_by('-created_at')
+    transactions = product.transactions.select_related('created_by', 'location').order_by('-created_at', '-id')
+    balances = product.balances.select_related('location').order_by('location__name')
 
     context = {
         'page_title': f'Product: {product.name}',
         'product': product,
         'transactions': transactions,
+        'balances': balances,
         'can_edit': is_admin(request.user),
     }
     return render(request, 'inventory/product_detail.html', context)
 
 
+AUTOCOMPLETE_LIMIT = 20
+
+
+@login_required
+@require_http_methods(["GET"])
+@replica_reads
+def product_autocomplete(request):
+    """Products whose SKU or name starts with ``q``, for the product picker."""
+    term = request.GET.get('q', '').strip()
+    products = Product.objects.only('id', 'sku', 'name')
+    if request.GET.get('active') == '1':
+        products = products.filter(is_active=True)
+    # Prefix matches are index range scans (see models.prefix_search)
+    products = products.search(term, AUTOCOMPLETE_LIMIT) if term else products[:AUTOCOMPLETE_LIMIT]
+
+    return JsonResponse({
+        'results': [{'id': product.id, 'text': str(product)} for product in products],
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+@replica_reads
+def category_autocomplete(request):
+    """Categories whose name starts with ``q``."""
+    term = request.GET.get('q', '').strip()
+    categories = Category.objects.only('id', 'name')
+    categories = categories.search(term, AUTOCOMPLETE_LIMIT) if term else categories[:AUTOCOMPLETE_LIMIT]
+
+    return JsonResponse({
+        'results': [{'id': category.id, 'text': str(category)} for category in categories],
+    })
+
+
+HISTORY_PAGE_SIZE = 50
+
+
+def encode_history_cursor(entry):
+    return f"{int(entry.timestamp.timestamp() * 1_000_000)}-{entry.id}"
+
+
+def decode_history_cursor(cursor):
+    """Return ``(timestamp, id)`` from a history cursor, or None if malformed."""
+    try:
+        micros, entry_id = (int(part) for part in cursor.split('-', 1))
+    except (AttributeError, ValueError):
+        return None
+    return datetime.fromtimestamp(0, tz=dt_timezone.utc) + timedelta(microseconds=micros), entry_id
+
+
+@login_required
+@require_http_methods(["GET"])
+@replica_reads
+def product_stock_history(request, pk):
+    """Stock level and IN/OUT volume over time as compact JSON, for charts.
+
+    Query parameters: ``bucket`` (hour, day or week; widened automatically to
+    fit), ``points`` (maximum points, default 200), ``start_date`` and
+    ``end_date`` (YYYY-MM-DD, inclusive).
+    """
+    product = get_object_or_404(Product.objects.only('id'), id=pk)
+    bucket = request.GET.get('bucket', 'day')
+    if bucket not in HISTORY_BUCKETS:
+        return JsonResponse({'error': f"bucket must be one of {', '.join(HISTORY_BUCKETS)}"}, status=400)
+    points = request.GET.get('points', '200')
+    if not points.isdigit() or not 2 <= int(points) <= HISTORY_MAX_POINTS:
+        return JsonResponse({'error': f'points must be between 2 and {HISTORY_MAX_POINTS}'}, status=400)
+    try:
+        start_date = parse_date(request.GET.get('start_date', ''))
+        end_date = parse_date(request.GET.get('end_date', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date'}, status=400)
+
+    return JsonResponse(stock_history(product, bucket, start_date, end_date, int(points)))
+
+
+@login_required
+@require_http_methods(["GET"])
+@replica_reads
+def product_history(request, pk):
+    """Audit history of one product as JSON, newest first, keyset paginated."""
+    entries = AuditLog.objects.for_object('Product', pk).select_related('user')
+
+    cursor = decode_history_cursor(request.GET.get('before'))
+    if cursor:
+        timestamp, entry_id = cursor
+        entries = entries.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=entry_id))
+
+    page = list(entries[:HISTORY_PAGE_SIZE + 1])
+    has_more = len(page) > HISTORY_PAGE_SIZE
+    page = page[:HISTORY_PAGE_SIZE]
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': entry.id,
+                'action': entry.action,
+                'user': entry.user.username if entry.user else None,
+                'timestamp': entry.timestamp.isoformat(),
+                'object_display': entry.object_display,
+                'old_values': entry.old_values,
+                'new_values': entry.new_values,
+            }
+            for entry in page
+        ],
+        'next': encode_history_cursor(page[-1]) if has_more else None,
+    })
+
+
 @login_required
 @user_passes_test(is_admin)
 @require_http_methods(["GET", "POST"])
@@ -277,34 +406,336 @@ def stock_transaction(request):
 
 @login_required
 @require_http_methods(["GET"])
-def transactions_list(request):
-    """List all transactions."""
-    transactions = StockTransaction.objects.select_related(
-        'product', 'created_by'
-    ).order_by('-created_at')
+@replica_reads
+def sync_changes(request):
+    """Change feed for offline clients: everything modified since ``cursor``.
 
-    form = TransactionFilterForm(request.GET)
-    if form.is_valid():
-        if form.cleaned_data.get('product'):
-            transactions = transactions.filter(product=form.cleaned_data['product'])
+    Start with no cursor for a full download, then keep passing back the
+    returned ``cursor``; repeat immediately while ``has_more`` is true.
+    """
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), settings.SYNC_MAX_PAGE_SIZE) if limit.isdigit() and int(limit) > 0 else settings.SYNC_PAGE_SIZE
+    try:
+        page = changes_since(request.GET.get('cursor', ''), limit)
+    except InvalidCursor as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(page)
 
-        if form.cleaned_data.get('transaction_type'):
-            transactions = transactions.filter(
-                transaction_type=form.cleaned_data['transaction_type']
-            )
 
-        if form.cleaned_data.get('start_date'):
-            transactions = transactions.filter(
-                created_at__date__gte=form.cleaned_data['start_date']
-            )
+SCAN_DEFAULT_REASONS = {'IN': 'purchase', 'OUT': 'sale'}
+SCAN_REASONS = {code for code, label in StockTransaction.TRANSACTION_REASON_CHOICES}
 
-        if form.cleaned_data.get('end_date'):
-            transactions = transactions.filter(
-                created_at__date__lte=form.cleaned_data['end_date']
+
+@login_required
+@user_passes_test(is_staff_or_admin)
+@require_http_methods(["POST"])
+def scan(request):
+    """Record a movement from a barcode scanner and return the new balance.
+
+    JSON body: ``{"sku": "PROD-001", "quantity": 1, "type": "IN", "reason":
+    "purchase", "location": "MAIN"}``; only ``sku`` is required. The SKU is
+    resolved through the in-process SKU cache and nothing is rendered.
+    """
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'Expected a JSON object'}, status=400)
+
+    sku = payload.get('sku')
+    quantity = payload.get('quantity', 1)
+    transaction_type = str(payload.get('type', 'IN')).upper()
+    reason = payload.get('reason') or SCAN_DEFAULT_REASONS.get(transaction_type)
+
+    if not sku or not isinstance(sku, str):
+        return JsonResponse({'error': 'sku is required'}, status=400)
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        return JsonResponse({'error': 'quantity must be a positive integer'}, status=400)
+    if transaction_type not in SCAN_DEFAULT_REASONS:
+        return JsonResponse({'error': 'type must be IN or OUT'}, status=400)
+    if reason not in SCAN_REASONS:
+        return JsonResponse({'error': f'Unknown reason: {reason}'}, status=400)
+
+    product = sku_cache.get(sku)
+    if product is None:
+        return JsonResponse({'error': f'Unknown SKU: {sku}'}, status=404)
+
+    location = None
+    if payload.get('location'):
+        location = Location.objects.filter(code=payload['location'], is_active=True).only('id', 'code').first()
+        if location is None:
+            return JsonResponse({'error': f"Unknown location: {payload['location']}"}, status=404)
+
+    # The cached instance saves the signals a product fetch
+    stock_transaction = StockTransaction.objects.create(
+        product=product,
+        location=location,
+        transaction_type=transaction_type,
+        quantity=quantity,
+        reason=reason,
+        reference_no=payload.get('reference_no') or None,
+        created_by=request.user,
+    )
+    AuditLog.objects.create(
+        user=request.user,
+        action='create',
+        model_name='StockTransaction',
+        object_id=stock_transaction.id,
+        object_display=f"Scan {transaction_type} {quantity} {sku}",
+    )
+
+    return JsonResponse({
+        'id': stock_transaction.id,
+        'sku': sku,
+        'product_id': product.id,
+        'location': stock_transaction.location.code,
+        'location_stock': stock_transaction.location_balance,
+        'total_stock': stock_transaction.balance_after,
+    }, status=201)
+
+
+@login_required
+@user_passes_test(is_staff_or_admin)
+@require_http_methods(["GET", "POST"])
+def stock_transfer(request):
+    """Move stock between locations as a paired OUT/IN."""
+    if request.method == 'POST':
+        form = StockTransferForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            try:
+                transfer_out, transfer_in = StockTransaction.transfer(
+                    product=data['product'],
+                    from_location=data['from_location'],
+                    to_location=data['to_location'],
+                    quantity=data['quantity'],
+                    user=request.user,
+                    reference_no=data['reference_no'] or None,
+                    notes=data['notes'] or None,
+                )
+            except ValueError as exc:
+                form.add_error('quantity', str(exc))
+            else:
+                AuditLog.objects.create(
+                    user=request.user,
+                    action='create',
+                    model_name='StockTransaction',
+                    object_id=transfer_out.id,
+                    object_display=(
+                        f"Transfer {data['quantity']} {data['product'].sku} "
+                        f"{data['from_location'].code} -> {data['to_location'].code}"
+                    ),
+                )
+
+                messages.success(request, 'Stock transfer recorded successfully.')
+                return redirect('transactions_list')
+    else:
+        form = StockTransferForm()
+
+    context = {
+        'page_title': 'Transfer Stock',
+        'form': form,
+    }
+    return render(request, 'inventory/stock_transfer.html', context)
+
+
+@login_required
+@user_passes_test(is_staff_or_admin)
+@require_http_methods(["GET", "POST"])
+def stock_takes(request):
+    """List stock takes and start a new one."""
+    if request.method == 'POST':
+        if not is_admin(request.user):
+            messages.error(request, 'Only administrators can start a stock take.')
+            return redirect('stock_takes')
+        form = StockTakeForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            stock_take = StockTake.open(
+                location=data['location'],
+                category=data['category'],
+                notes=data['notes'] or None,
+                user=request.user,
+            )
+            AuditLog.objects.create(
+                user=request.user,
+                action='create',
+                model_name='StockTake',
+                object_id=stock_take.id,
+                object_display=str(stock_take),
             )
+            messages.success(request, f'Stock take #{stock_take.id} started.')
+            return redirect('stock_take_detail', pk=stock_take.id)
+    else:
+        form = StockTakeForm()
+
+    context = {
+        'page_title': 'Stock Takes',
+        'stock_takes': StockTake.objects.select_related('location', 'category', 'created_by').annotate(
+            line_count=Count('lines'),
+            counted_count=Count('lines__counted_quantity'),
+        )[:50],
+        'form': form,
+        'can_edit': is_admin(request.user),
+    }
+    return render(request, 'inventory/stock_takes.html', context)
+
+
+@login_required
+@user_passes_test(is_staff_or_admin)
+@require_http_methods(["GET"])
+def stock_take_detail(request, pk):
+    """Progress, variances and count entry for one stock take."""
+    stock_take = get_object_or_404(StockTake.objects.select_related('location', 'category'), pk=pk)
+    lines = stock_take.lines.select_related('product', 'counted_by').order_by('product__sku')
+
+    summary = lines.aggregate(
+        total=Count('id'),
+        counted=Count('counted_quantity'),
+        with_variance=Count('id', filter=Q(counted_quantity__isnull=False) & ~Q(counted_quantity=F('system_quantity'))),
+        net_variance=Sum(F('counted_quantity') - F('system_quantity')),
+    )
+
+    show = request.GET.get('show', 'all')
+    if show == 'variances':
+        lines = lines.filter(counted_quantity__isnull=False).exclude(counted_quantity=F('system_quantity'))
+    elif show == 'uncounted':
+        lines = lines.filter(counted_quantity__isnull=True)
+    paginator_from, paginator_to = get_page_bounds(request, per_page=100)
+
+    context = {
+        'page_title': f'Stock Take #{stock_take.id}',
+        'stock_take': stock_take,
+        'lines': lines[paginator_from:paginator_to],
+        'summary': summary,
+        'show': show,
+        'form': StockCountForm(),
+        'can_edit': is_admin(request.user),
+    }
+    return render(request, 'inventory/stock_take_detail.html', context)
+
+
+def parse_counts(payload):
+    """Validate a JSON counts payload into ``({sku: quantity}, errors)``."""
+    counts, errors = {}, []
+    rows = payload.get('counts') if isinstance(payload, dict) else None
+    if not isinstance(rows, list):
+        return counts, ['Expected {"counts": [{"sku": ..., "quantity": ...}]}']
+    for row in rows:
+        sku = row.get('sku') if isinstance(row, dict) else None
+        quantity = row.get('quantity') if isinstance(row, dict) else None
+        if not sku or not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0:
+            errors.append(f'Invalid count: {row!r}')
+            continue
+        counts[str(sku)] = counts.get(str(sku), 0) + quantity
+    return counts, errors
+
+
+@login_required
+@user_passes_test(is_staff_or_admin)
+@require_http_methods(["POST"])
+def stock_take_counts(request, pk):
+    """Record counts from the count form or from scanners posting JSON.
+
+    JSON body: ``{"counts": [{"sku": "A-1", "quantity": 4}, ...], "add": true}``.
+    """
+    stock_take = get_object_or_404(StockTake, pk=pk)
+    is_json = request.content_type == 'application/json'
+
+    if is_json:
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        counts, errors = parse_counts(payload)
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+        add = bool(payload.get('add'))
+    else:
+        form = StockCountForm(request.POST)
+        if not form.is_valid():
+            messages.error(request, 'Enter a SKU and a quantity of zero or more.')
+            return redirect('stock_take_detail', pk=pk)
+        counts = {form.cleaned_data['sku']: form.cleaned_data['quantity']}
+        add = form.cleaned_data['add']
+
+    product_ids = dict(Product.objects.filter(sku__in=counts).values_list('sku', 'id'))
+    unknown = sorted(set(counts) - set(product_ids))
+
+    try:
+        stock_take.record_counts(
+            {product_ids[sku]: quantity for sku, quantity in counts.items() if sku in product_ids},
+            user=request.user,
+            add=add,
+        )
+    except ValueError as exc:
+        if is_json:
+            return JsonResponse({'error': str(exc)}, status=409)
+        messages.error(request, str(exc))
+        return redirect('stock_take_detail', pk=pk)
+
+    if is_json:
+        return JsonResponse({'recorded': len(product_ids), 'unknown': unknown})
+    if unknown:
+        messages.error(request, f'Unknown SKU: {", ".join(unknown)}')
+    else:
+        messages.success(request, 'Count recorded.')
+    return redirect('stock_take_detail', pk=pk)
+
+
+@login_required
+@user_passes_test(is_admin)
+@require_http_methods(["POST"])
+def stock_take_post(request, pk):
+    """Post all variances of a stock take as adjustments."""
+    stock_take = get_object_or_404(StockTake, pk=pk)
+    try:
+        posted = stock_take.post(user=request.user, zero_uncounted=request.POST.get('zero_uncounted') == 'on')
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect('stock_take_detail', pk=pk)
+
+    AuditLog.objects.create(
+        user=request.user,
+        action='update',
+        model_name='StockTake',
+        object_id=stock_take.id,
+        object_display=str(stock_take),
+        new_values={'status': 'posted', 'adjustments': posted},
+    )
+    messages.success(request, f'Stock take posted with {posted} adjustment(s).')
+    return redirect('stock_take_detail', pk=pk)
 
-    paginator_from = (request.GET.get('page', 1) - 1) * 50
-    paginator_to = paginator_from + 50
+
+@login_required
+@user_passes_test(is_admin)
+@require_http_methods(["POST"])
+def stock_take_cancel(request, pk):
+    """Abandon an open stock take without touching stock."""
+    updated = StockTake.objects.filter(pk=pk, status='open').update(status='cancelled')
+    if updated:
+        AuditLog.objects.create(
+            user=request.user,
+            action='update',
+            model_name='StockTake',
+            object_id=pk,
+            new_values={'status': 'cancelled'},
+        )
+        messages.success(request, 'Stock take cancelled.')
+    else:
+        messages.error(request, 'Only open stock takes can be cancelled.')
+    return redirect('stock_take_detail', pk=pk)
+
+
+@login_required
+@require_http_methods(["GET"])
+@replica_reads
+def transactions_list(request):
+    """List all transactions."""
+    form = TransactionFilterForm(request.GET)
+    transactions = filter_transactions(form, form.is_valid())
+    paginator_from, paginator_to = get_page_bounds(request)
 
     context = {
         'page_title': 'Stock Transactions',
@@ -317,26 +748,72 @@ def transactions_list(request):
 
 @login_required
 @require_http_methods(["GET"])
+@replica_reads
 def low_stock_alerts(request):
     """View low stock alerts."""
     alerts = LowStockAlert.objects.select_related('product', 'resolved_by').filter(
         status='active'
     ).order_by('-created_at')
 
+    location = get_location_filter(request)
+    if location:
+        alerts = alerts.filter(product__balances__location=location)
+
     context = {
         'page_title': 'Low Stock Alerts',
         'alerts': alerts,
+        'locations': Location.objects.filter(is_active=True),
+        'location': location,
     }
     return render(request, 'inventory/low_stock_alerts.html', context)
 
 
+@login_required
+@require_http_methods(["GET", "POST"])
+def notification_settings(request):
+    """Manage the current user's low-stock digest subscriptions."""
+    subscriptions = NotificationSubscription.objects.filter(user=request.user).prefetch_related('categories')
+    allow_webhooks = is_admin(request.user)
+    form = NotificationSubscriptionForm(allow_webhooks=allow_webhooks)
+
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'delete':
+            subscription = get_object_or_404(subscriptions, id=request.POST.get('subscription_id'))
+            subscription.delete()
+            messages.success(request, 'Subscription removed.')
+            return redirect('notification_settings')
+        if action == 'toggle':
+            subscription = get_object_or_404(subscriptions, id=request.POST.get('subscription_id'))
+            subscription.is_active = not subscription.is_active
+            subscription.save(update_fields=['is_active'])
+            messages.success(request, f"Subscription {'resumed' if subscription.is_active else 'paused'}.")
+            return redirect('notification_settings')
+
+        form = NotificationSubscriptionForm(request.POST, allow_webhooks=allow_webhooks)
+        if form.is_valid():
+            subscription = form.save(commit=False)
+            subscription.user = request.user
+            # Start from now; earlier alerts are already on the alerts page
+            subscription.last_digest_at = timezone.now()
+            subscription.save()
+            form.save_m2m()
+            messages.success(request, 'Subscribed to low-stock digests.')
+            return redirect('notification_settings')
+
+    context = {
+        'page_title': 'Notifications',
+        'subscriptions': subscriptions,
+        'form': form,
+    }
+    return render(request, 'inventory/notification_settings.html', context)
+
+
 @login_required
 @user_passes_test(is_admin)
 @require_http_methods(["GET", "POST"])
 def categories(request):
-    """Manage categories."""
-    categories_list = Category.objects.all().order_by('name')
-
+    """Manage categories, shown as a tree with per-subtree stock totals."""
     if request.method == 'POST':
         action = request.POST.get('action')
         category_id = request.POST.get('category_id')
@@ -344,13 +821,16 @@ def categories(request):
         if action == 'delete' and category_id:
             category = get_object_or_404(Category, id=category_id)
             category_name = category.name
+            if category.children.exists():
+                messages.error(request, f'Category {category_name} has subcategories; move or delete them first.')
+                return redirect('categories')
             category.delete()
             messages.success(request, f'Category {category_name} deleted.')
             return redirect('categories')
 
     context = {
         'page_title': 'Categories',
-        'categories': categories_list,
+        'categories': category_tree(),
     }
     return render(request, 'inventory/categories.html', context)
 
@@ -378,8 +858,11 @@ def create_category(request):
 
 @login_required
 @require_http_methods(["GET"])
+@replica_reads
 def export_products(request):
     """Export products to CSV."""
+    location = get_location_filter(request)
+
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="products.csv"'
 
@@ -387,7 +870,9 @@ def export_products(request):
     writer.writerow(['SKU', 'Name', 'Category', 'Unit', 'Current Stock', 'Minimum Stock', 'Price', 'Status'])
 
     products = Product.objects.select_related('category').filter(is_active=True)
-    for product in products:
+    if location:
+        products = products.at_location(location)
+    for product in products.with_stock(location):
         writer.writerow([
             product.sku,
             product.name,
@@ -411,19 +896,77 @@ def export_products(request):
 
 @login_required
 @require_http_methods(["GET"])
+@replica_reads
+def movement_report(request):
+    """Stock movement grouped by category, reason, user or location, as HTML or CSV."""
+    today = timezone.now().date()
+    data = request.GET.copy()
+    if not data:
+        data.update({
+            'group_by': 'reason',
+            'period': 'month',
+            'start_date': (today - timedelta(days=89)).isoformat(),
+            'end_date': today.isoformat(),
+        })
+    form = MovementReportForm(data)
+
+    report = None
+    if form.is_valid():
+        params = form.cleaned_data
+        report = run_report(
+            group_by=params['group_by'] or None,
+            period=params['period'] or None,
+            start_date=params['start_date'],
+            end_date=params['end_date'],
+            location_id=params['location'].id if params['location'] else None,
+            category=params['category'],
+        )
+
+        if request.GET.get('format') == 'csv':
+            response = HttpResponse(content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="movement_report.csv"'
+            write_csv(report, response)
+            AuditLog.objects.create(
+                user=request.user,
+                action='export',
+                model_name='MovementReport',
+            )
+            return response
+
+    context = {
+        'page_title': 'Movement Report',
+        'form': form,
+        'report': report,
+        'query': data.urlencode(),
+    }
+    return render(request, 'inventory/movement_report.html', context)
+
+
+@login_required
+@require_http_methods(["GET"])
+@replica_reads
 def export_transactions(request):
-    """Export transactions to CSV."""
+    """Export transactions to CSV, or to Parquet/Arrow with ``?format=``."""
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
 
+    if request.GET.get('format') in columnar.FORMATS:
+        return export_transactions_columnar(request, request.GET['format'], start_date, end_date)
+
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="transactions.csv"'
 
     writer = csv.writer(response)
-    writer.writerow(['Date', 'Product SKU', 'Product Name', 'Type', 'Quantity', 'Reason', 'User', 'Reference'])
+    writer.writerow([
+        'Date', 'Product SKU', 'Product Name', 'Location', 'Type', 'Quantity', 'Balance After', 'Reason', 'User',
+        'Reference',
+    ])
 
-    transactions = StockTransaction.objects.select_related('product', 'created_by')
+    transactions = StockTransaction.objects.select_related('product', 'created_by', 'location')
 
+    location = get_location_filter(request)
+    if location:
+        transactions = transactions.filter(location=location)
     if start_date:
         transactions = transactions.filter(created_at__date__gte=start_date)
     if end_date:
@@ -434,8 +977,10 @@ def export_transactions(request):
             transaction.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             transaction.product.sku,
             transaction.product.name,
+            transaction.location.code if transaction.location else '',
             transaction.transaction_type,
             transaction.quantity,
+            '' if transaction.balance_after is None else transaction.balance_after,
             transaction.get_reason_display(),
             transaction.created_by.get_full_name() or transaction.created_by.username,
             transaction.reference_no or '',
@@ -451,4 +996,31 @@ def export_transactions(request):
     return response
 
 
-from django.db import models
+def export_transactions_columnar(request, fmt, start_date, end_date):
+    """Stream the ledger as Parquet or an Arrow IPC stream, one chunk per row group.
+
+    ``columns`` selects a comma-separated subset of ``columnar.COLUMNS``.
+    """
+    if not columnar.is_available():
+        messages.error(request, 'Columnar export needs the pyarrow package on the server.')
+        return redirect('transactions_list')
+    try:
+        columns = columnar.parse_columns(request.GET.get('columns', ''))
+        start_date = parse_date(start_date) if start_date else None
+        end_date = parse_date(end_date) if end_date else None
+    except ValueError as exc:
+        return HttpResponse(str(exc), status=400, content_type='text/plain')
+
+    transactions = columnar.ledger_rows(start_date, end_date, get_location_filter(request))
+    content_type, extension = columnar.FORMATS[fmt]
+    stream = routed_stream(request, columnar.stream_export(transactions, fmt, columns))
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="transactions.{extension}"'
+
+    AuditLog.objects.create(
+        user=request.user,
+        action='export',
+        model_name='StockTransaction',
+        new_values={'format': fmt, 'columns': columns},
+    )
+    return response
@@ -0,0 +1,48 @@
+"""Form widgets for Inventory app."""
+from django import forms
+from django.urls import reverse
+from django.utils.http import urlencode
+
+
+class AutocompleteSelect(forms.Select):
+    """Select that renders only its current option.
+
+    Other options are fetched as the user types from the JSON endpoint named
+    by ``url_name`` (see the picker script in ``base.html``), so the page no
+    longer grows with the size of the catalog. Validation is unchanged:
+    ``ModelChoiceField`` looks up the single submitted id.
+    """
+
+    def __init__(self, url_name, params=None, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.params = params or {}
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        url = reverse(self.url_name)
+        if self.params:
+            url = f"{url}?{urlencode(self.params)}"
+        context['widget']['attrs']['data-autocomplete-url'] = url
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [str(v) for v in value if v not in (None, '')]
+        field = getattr(self.choices, 'field', None)
+        if field is None:
+            return super().optgroups(name, value, attrs)
+
+        choices = []
+        if field.empty_label is not None:
+            choices.append(('', field.empty_label))
+        if selected:
+            try:
+                objects = list(self.choices.queryset.filter(pk__in=selected))
+            except (ValueError, TypeError):
+                objects = []
+            choices.extend((obj.pk, field.label_from_instance(obj)) for obj in objects)
+
+        return [
+            (None, [self.create_option(name, option_value, label, str(option_value) in selected, index, attrs=attrs)], index)
+            for index, (option_value, label) in enumerate(choices)
+        ]
@@ -22,7 +22,7 @@ pip install -q -r requirements.txt
 
 echo.
 echo Checking database...
-python manage.py migrate --noinput
+python manage.py migrate --noinput --fake-initial --run-syncdb
 
 echo.
 echo Creating admin user...
@@ -39,7 +39,12 @@ echo ========================================
 echo   Setup Complete!
 echo ========================================
 echo.
-echo Starting Django development server...
+if /I "%1"=="prod" (
+    echo Starting uvicorn production server...
+) else (
+    echo Starting Django development server...
+    echo ^(run run.bat prod for the production server^)
+)
 echo.
 echo Access the application at: http://localhost:8000
 echo Admin panel at: http://localhost:8000/admin/
@@ -51,4 +56,14 @@ echo.
 echo Press Ctrl+C to stop the server
 echo.
 
+if /I not "%1"=="prod" goto devserver
+
+REM gunicorn does not run on Windows; uvicorn workers warm up on start
+if not defined WEB_CONCURRENCY set WEB_CONCURRENCY=4
+set WARMUP_ON_START=True
+python manage.py collectstatic --noinput -v 0
+uvicorn config.asgi:application --host 0.0.0.0 --port 8000 --workers %WEB_CONCURRENCY%
+goto :eof
+
+:devserver
 python manage.py runserver
@@ -23,7 +23,7 @@ pip install -q -r requirements.txt
 
 echo ""
 echo "Checking database..."
-python manage.py migrate --noinput
+python manage.py migrate --noinput --fake-initial --run-syncdb
 
 echo ""
 echo "Creating admin user..."
@@ -37,7 +37,12 @@ echo "========================================"
 echo "   Setup Complete!"
 echo "========================================"
 echo ""
-echo "Starting Django development server..."
+if [ "$1" = "prod" ]; then
+    echo "Starting gunicorn (production profile, gunicorn.conf.py)..."
+else
+    echo "Starting Django development server..."
+    echo "(run ./run.sh prod for the production server)"
+fi
 echo ""
 echo "Access the application at: http://localhost:8000"
 echo "Admin panel at: http://localhost:8000/admin/"
@@ -49,4 +54,9 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
+if [ "$1" = "prod" ]; then
+    python manage.py collectstatic --noinput -v 0
+    exec gunicorn -c gunicorn.conf.py
+fi
+
 python manage.py runserver
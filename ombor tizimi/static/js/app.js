@@ -0,0 +1,80 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Auto-hide alerts after 5 seconds
+    setTimeout(function() {
+        const alerts = document.querySelectorAll('.alert');
+        alerts.forEach(function(alert) {
+            const bsAlert = new bootstrap.Alert(alert);
+            bsAlert.close();
+        });
+    }, 5000);
+
+    // Autocomplete pickers: these selects only carry their current
+    // option; matches are fetched from the server as the user types.
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(function(select) {
+        const url = select.dataset.autocompleteUrl;
+        const wrapper = document.createElement('div');
+        const input = document.createElement('input');
+        const menu = document.createElement('div');
+        let timer = null;
+
+        wrapper.className = 'position-relative';
+        input.type = 'search';
+        input.className = 'form-control';
+        input.placeholder = 'Type to search...';
+        input.autocomplete = 'off';
+        input.required = select.required;
+        menu.className = 'dropdown-menu w-100';
+
+        const current = select.options[select.selectedIndex];
+        if (current && current.value) {
+            input.value = current.text;
+        }
+        if (select.id) {
+            input.id = select.id + '_search';
+            const label = document.querySelector('label[for="' + select.id + '"]');
+            if (label) {
+                label.htmlFor = input.id;
+            }
+        }
+
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.append(input, menu, select);
+        select.classList.add('d-none');
+        select.required = false;
+
+        function setValue(id, text) {
+            select.innerHTML = '';
+            select.add(new Option(text, id, true, true));
+        }
+
+        input.addEventListener('input', function() {
+            setValue('', '');
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                const query = (url.indexOf('?') === -1 ? '?' : '&') + 'q=' + encodeURIComponent(input.value);
+                fetch(url + query)
+                    .then(function(r) { return r.json(); })
+                    .then(function(data) {
+                        menu.innerHTML = '';
+                        data.results.forEach(function(item) {
+                            const option = document.createElement('button');
+                            option.type = 'button';
+                            option.className = 'dropdown-item';
+                            option.textContent = item.text;
+                            option.addEventListener('mousedown', function(e) {
+                                e.preventDefault();
+                                setValue(item.id, item.text);
+                                input.value = item.text;
+                                menu.classList.remove('show');
+                            });
+                            menu.appendChild(option);
+                        });
+                        menu.classList.toggle('show', data.results.length > 0);
+                    });
+            }, 200);
+        });
+        input.addEventListener('blur', function() {
+            menu.classList.remove('show');
+        });
+    });
+});